@@ -0,0 +1,50 @@
+'''
+Project : Noz'Num
+Description : Import time of the data layer (noznum.core) compared to the graphical interface (noznum.gui), measured with python -X importtime
+
+Usage : python benchmarks/bench_import_time.py [module ...]
+'''
+import os
+import sys
+import subprocess
+
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# Modules that must not be loaded by the data layer
+DISPLAY_MODULES = ('PyQt5', 'matplotlib', 'folium', 'mplcursors')
+
+
+# Import a module in a fresh interpreter, return (total import time in seconds, heaviest direct dependencies, display modules loaded)
+def import_time(module):
+    code = f"import sys, {module}; print(','.join(sorted({{m.split('.')[0] for m in sys.modules}} & set({DISPLAY_MODULES!r}))))"
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    # lines look like "import time:  self [us] | cumulative | imported package", nested imports are indented by 2 spaces per level
+    total, dependencies = 0, []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            total += int(cumulative)
+        elif depth == 1:
+            dependencies.append((int(cumulative), name.strip()))
+    return total / 1e6, sorted(dependencies, reverse=True), result.stdout.strip()
+
+if __name__ == '__main__':
+    modules = sys.argv[1:] or ['noznum.core', 'noznum.batch', 'noznum.gui']
+    for module in modules:
+        try:
+            total, dependencies, display_modules = import_time(module)
+        except RuntimeError as error:
+            print(f'{module}: import failed ({error})\n')
+            continue
+        print(f'{module}: {total:.3f} s, display modules loaded: {display_modules or "none"}')
+        for cumulative, name in dependencies[:5]:
+            print(f'    {cumulative / 1e6:.3f} s  {name}')
+        print()
@@ -0,0 +1,72 @@
+'''
+Project : Noz'Num
+Description : Memory used by a loaded session (dataframe and Data object), compact layout against the previous one
+
+Usage : python benchmarks/bench_memory.py [n_points ...]
+'''
+import os
+import sys
+import gc
+import tempfile
+import tracemalloc
+import importlib.util
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from noznum.core import tcx_to_df, decode_timestamps, Data
+from synthetic import write_tcx
+from bench_tcx_parse import legacy_tcx_to_df
+
+
+# Data class before the compact layout (float64 columns, per-row strings, points as a list of tuples), kept as the reference
+class LegacyData():
+    def __init__(self, df):
+        self.df = df
+        self.file_name = self.df['file_name']
+        self.dir_name = self.df['dir_name']
+        self.t = self.df['time']
+        self.th = self.df['time_in_hours']
+        self.ts = self.df['time_in_seconds']
+        self.lat = self.df['latitude']
+        self.lon = self.df['longitude']
+        self.alt = self.df['altitude']
+        self.hr = self.df['heart_rate']
+        self.dist = self.df['distance']
+        self.time_utc, self.epoch, _, _ = decode_timestamps(self.t)
+        self.dt = pd.Series(self.epoch - np.nanmin(self.epoch), index=self.df.index)
+        dt_values = self.dt.to_numpy()
+        valid = np.flatnonzero(~np.isnan(dt_values))
+        self.dt_order = valid[np.argsort(dt_values[valid], kind='stable')]
+        self.dt_sorted = dt_values[self.dt_order]
+        self.points = list(zip(self.lat.to_numpy().tolist(), self.lon.to_numpy().tolist()))
+
+
+# Bytes currently allocated by arrow (arrow strings are not seen by tracemalloc)
+def arrow_allocated():
+    if importlib.util.find_spec('pyarrow') is None:
+        return 0
+    import pyarrow
+    return pyarrow.total_allocated_bytes()
+
+# Return (memory kept by the object returned by build, reported size of its dataframe) in bytes
+def measure(build):
+    gc.collect()
+    arrow_before = arrow_allocated()
+    tracemalloc.start()
+    data = build()
+    gc.collect()
+    kept = tracemalloc.get_traced_memory()[0] + arrow_allocated() - arrow_before
+    tracemalloc.stop()
+    return kept, int(data.df.memory_usage(deep=True).sum())
+
+
+if __name__ == '__main__':
+    sizes = [int(n) for n in sys.argv[1:]] or [10000, 100000]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"{'points':>8} {'layout':>8} {'session (MB)':>13} {'bytes/row':>10} {'dataframe (MB)':>15}")
+        for n_points in sizes:
+            path = write_tcx(os.path.join(tmp_dir, f'synthetic_{n_points}.tcx'), n_points)
+            for name, build in [('legacy', lambda: LegacyData(legacy_tcx_to_df(path))), ('compact', lambda: Data(tcx_to_df(path)))]:
+                kept, df_bytes = measure(build)
+                print(f'{n_points:>8} {name:>8} {kept / 2**20:>13.1f} {kept / n_points:>10.0f} {df_bytes / 2**20:>15.1f}')
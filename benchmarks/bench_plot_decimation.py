@@ -0,0 +1,55 @@
+'''
+Project : Noz'Num
+Description : Redraw and picking time of a '-ro' plot against the length of the series, with and without M4 decimation
+
+Usage : python benchmarks/bench_plot_decimation.py [n_points ...]
+'''
+import os
+import sys
+import time
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backend_bases import MouseEvent
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from noznum.decimation import M4Decimator
+
+
+# Return (mean redraw time, mean hit test time) in milliseconds of a plot of x, y (same size as the plots of the application)
+def measure(x, y, repeat=5):
+    fig = Figure(figsize=(5, 4), dpi=100)
+    FigureCanvasAgg(fig)
+    axes = fig.add_subplot(111)
+    line, = axes.plot(x, y, '-ro', picker=5)
+    fig.canvas.draw()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fig.canvas.draw()
+    draw_time = (time.perf_counter() - start) / repeat * 1000
+
+    px, py = axes.transData.transform((x[len(x) // 2], y[len(y) // 2]))
+    event = MouseEvent('button_press_event', fig.canvas, px, py)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        line.contains(event)
+    pick_time = (time.perf_counter() - start) / repeat * 1000
+    return draw_time, pick_time
+
+
+if __name__ == '__main__':
+    sizes = [int(n) for n in sys.argv[1:]] or [10000, 100000, 1000000]
+    rng = np.random.default_rng(0)
+    print(f"{'points':>8} {'drawn':>8} {'draw full (ms)':>15} {'draw M4 (ms)':>13} {'pick full (ms)':>15} {'pick M4 (ms)':>13} {'decimate (ms)':>14}")
+    for n_points in sizes:
+        x = np.arange(n_points, dtype=np.float64)
+        y = 120 + np.cumsum(rng.normal(0, 1, n_points)) * 0.1
+        start = time.perf_counter()
+        indices = M4Decimator(x, y).indices(x[0], x[-1], 400) # width of the plots in pixels
+        decimate_time = (time.perf_counter() - start) * 1000
+        draw_full, pick_full = measure(x, y)
+        draw_m4, pick_m4 = measure(x[indices], y[indices])
+        print(f'{n_points:>8} {len(indices):>8} {draw_full:>15.1f} {draw_m4:>13.1f} {pick_full:>15.2f} {pick_m4:>13.2f} {decimate_time:>14.1f}')
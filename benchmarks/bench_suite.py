@@ -0,0 +1,205 @@
+'''
+Project : Noz'Num
+Description : Benchmarks of the hot paths (parsing of every format, Data, statistics, map rendering, plot annotation) on synthetic sessions,
+with results saved as json so that two commits can be compared
+
+Usage : python benchmarks/bench_suite.py [--sizes N ...] [--output results.json] [--compare baseline.json] [--threshold 0.2]
+
+    git checkout <reference> && python benchmarks/bench_suite.py -o baseline.json
+    git checkout <branch> && python benchmarks/bench_suite.py -o results.json --compare baseline.json
+
+Every case is run on three kinds of sessions : 'regular' (one point per second), 'missing_hr' (heart rate sensor drop outs)
+and 'midnight' (the session crosses midnight). The time of a case is the best of --repeat runs, its peak memory is measured
+in one more run with tracemalloc. With --compare, cases slower (or using more memory) than the baseline by more than
+--threshold are reported as regressions and the exit status is 1.
+The map and annotation cases need folium and Qt, they are skipped when these can't be imported.
+'''
+import os
+import sys
+import gc
+import json
+import time
+import platform
+import argparse
+import subprocess
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from noznum.core import tcx_to_df, csv_to_df, compute_stats, Data
+from noznum.readers import gpx_to_df, fit_to_df
+from synthetic import write_tcx, write_csv, write_gpx, write_fit, DEFAULT_START, MIDNIGHT_START
+
+
+# Sessions benchmarked for each size : name -> parameters of the write_* functions of synthetic
+SCENARIOS = {
+    'regular' : {'start' : DEFAULT_START},
+    'missing_hr' : {'start' : DEFAULT_START, 'missing_hr' : 0.2},
+    'midnight' : {'start' : MIDNIGHT_START},
+}
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+# Number of hover events of the annotation case
+N_HOVER_EVENTS = 200
+
+
+# Return (best wall time in seconds, peak traced memory in MB) of function()
+def measure(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return best, peak
+
+# Current commit of the repository (None outside a git checkout)
+def git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+# Statistics of the middle half of the session, the way the application computes them for a saved segment
+def stats_case(df):
+    n = len(df)
+    segment_df = df.iloc[n // 4:3 * n // 4]
+    dist, ts = segment_df['distance'].to_numpy(), segment_df['time_in_seconds'].to_numpy()
+    segment_df = segment_df.assign(speed=abs(dist[-1] - dist[0]) / abs(ts[-1] - ts[0]))
+    return lambda: compute_stats(segment_df, 'segment', df['file_name'].iloc[0], df['dir_name'].iloc[0], df)
+
+# Html page of the map of a session, None if folium is missing
+def map_case(df):
+    try:
+        from noznum.maps import GenerateMap
+    except ImportError as error:
+        return None, str(error)
+    data = Data(df)
+    return lambda: GenerateMap(data).get_root().render(), None
+
+# N_HOVER_EVENTS hover annotations (mplcursors selections) on the heart rate plot, None if Qt is missing
+def annotation_case(df):
+    try:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        from PyQt5.QtWidgets import QApplication
+        app = QApplication.instance() or QApplication([])
+        from noznum.gui import MplCanvas
+    except ImportError as error:
+        return None, str(error)
+    canvas = MplCanvas(data=Data(df), x='dt', y='hr')
+    x = canvas.x_values[~np.isnan(canvas.x_values)]
+    targets = np.linspace(x.min(), x.max(), N_HOVER_EVENTS)
+
+    # Selection of mplcursors, as received by show_annotation
+    class Selection():
+        def __init__(self, target):
+            self.target = (target, 0.0)
+            self.extras = []
+            self.annotation = canvas.axes.annotate('', (target, 0.0))
+
+    selections = [Selection(target) for target in targets]
+    def hover():
+        for sel in selections:
+            canvas.hover_timer.stop() # every event is handled, not coalesced with the next ones
+            canvas.annotation_position = None
+            canvas.show_annotation(sel)
+            for extra in sel.extras:
+                extra.remove()
+            sel.extras = []
+        canvas.hover_timer.stop()
+        app.processEvents()
+    return hover, None
+
+
+# Run every case on every scenario and size, return the list of results
+def run_suite(sizes, data_dir, repeat, log=sys.stdout):
+    results = []
+    def record(case, scenario, n_points, function, skipped=None):
+        if function is None:
+            print(f'{case:>12} {scenario:>11} {n_points:>8} {"skipped (" + skipped + ")":>22}', file=log)
+            return
+        seconds, peak_mb = measure(function, repeat)
+        results.append({'case' : case, 'scenario' : scenario, 'n_points' : n_points, 'seconds' : seconds, 'peak_mb' : peak_mb})
+        print(f'{case:>12} {scenario:>11} {n_points:>8} {seconds * 1000:>12.1f} {peak_mb:>10.1f}', file=log)
+
+    print(f"{'case':>12} {'scenario':>11} {'points':>8} {'time (ms)':>12} {'peak (MB)':>10}", file=log)
+    for n_points in sizes:
+        for scenario, parameters in SCENARIOS.items():
+            paths = {}
+            for extension, write in [('tcx', write_tcx), ('csv', write_csv), ('gpx', write_gpx), ('fit', write_fit)]:
+                paths[extension] = os.path.join(data_dir, f'{scenario}_{n_points}.{extension}')
+                if not os.path.isfile(paths[extension]): # generated files are kept in --data-dir between runs
+                    write(paths[extension], n_points, **parameters)
+            df = tcx_to_df(paths['tcx'])
+            for reader in (tcx_to_df, csv_to_df, gpx_to_df, fit_to_df):
+                path = paths[reader.__name__[:3]]
+                record(reader.__name__, scenario, n_points, lambda: reader(path))
+            record('Data', scenario, n_points, lambda: Data(df))
+            record('compute_stats', scenario, n_points, stats_case(df))
+            record('map', scenario, n_points, *map_case(df))
+            record('annotation', scenario, n_points, *annotation_case(df))
+    return results
+
+# Compare results with a baseline : return the rows (case, scenario, n_points, time ratio, memory ratio, regression)
+def compare(results, baseline, threshold):
+    reference = {(row['case'], row['scenario'], row['n_points']) : row for row in baseline['results']}
+    rows = []
+    for row in results:
+        key = (row['case'], row['scenario'], row['n_points'])
+        if key not in reference:
+            continue
+        time_ratio = row['seconds'] / reference[key]['seconds']
+        memory_ratio = row['peak_mb'] / reference[key]['peak_mb'] if reference[key]['peak_mb'] else 1.0
+        rows.append(key + (time_ratio, memory_ratio, time_ratio > 1 + threshold or memory_ratio > 1 + threshold))
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks of the hot paths of noznum on synthetic sessions')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='numbers of trackpoints of the sessions')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of each case, the best time is kept')
+    parser.add_argument('-o', '--output', help='json file receiving the results')
+    parser.add_argument('--compare', help='json file of a previous run to compare the results with')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative slowdown reported as a regression (default: 0.2)')
+    parser.add_argument('--data-dir', help='directory keeping the generated sessions between runs (default: temporary)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = args.data_dir or tmp_dir
+        os.makedirs(data_dir, exist_ok=True)
+        results = run_suite(args.sizes, data_dir, args.repeat)
+
+    report = {
+        'commit' : git_commit(),
+        'date' : time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python' : platform.python_version(),
+        'numpy' : np.__version__,
+        'pandas' : pd.__version__,
+        'machine' : platform.platform(),
+        'results' : results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.threshold)
+        print(f"\nCompared with {baseline.get('commit')} ({baseline.get('date')})")
+        print(f"{'case':>12} {'scenario':>11} {'points':>8} {'time':>8} {'memory':>8}")
+        for case, scenario, n_points, time_ratio, memory_ratio, regression in rows:
+            print(f'{case:>12} {scenario:>11} {n_points:>8} {time_ratio:>7.2f}x {memory_ratio:>7.2f}x{"  REGRESSION" if regression else ""}')
+        if any(row[-1] for row in rows):
+            sys.exit(1)
@@ -0,0 +1,70 @@
+'''
+Project : Noz'Num
+Description : Benchmark of the streaming tcx parser against the original full-tree parser (time and peak memory)
+
+Usage : python benchmarks/bench_tcx_parse.py [n_points ...]
+'''
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+from datetime import timedelta
+from xml.etree import ElementTree as ET
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from noznum.core import tcx_to_df
+from synthetic import write_tcx
+
+
+# Original parser (before the streaming parser), kept here as the reference
+def legacy_tcx_to_df(tcx_file_path):
+    def TimeToSeconds(t):
+        t_strip = time.strptime(t.text[11:19].split(',')[0],'%H:%M:%S')
+        return timedelta(hours=t_strip.tm_hour,minutes=t_strip.tm_min,seconds=t_strip.tm_sec).total_seconds()
+
+    all_items = []
+    root = ET.parse(tcx_file_path).getroot()
+    trackTree = root[0][0][1][5]
+    ns = {'TrainingCenterDatabase': 'http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2'}
+    for trackpoint in trackTree.findall('TrainingCenterDatabase:Trackpoint', ns):
+        if(trackpoint):
+            t = trackpoint.find('TrainingCenterDatabase:Time', ns)
+            position = trackpoint.find('TrainingCenterDatabase:Position', ns)
+            latitude = position.find('TrainingCenterDatabase:LatitudeDegrees', ns)
+            longitude = position.find('TrainingCenterDatabase:LongitudeDegrees', ns)
+            altitude = trackpoint.find('TrainingCenterDatabase:AltitudeMeters', ns)
+            distance = trackpoint.find('TrainingCenterDatabase:DistanceMeters', ns)
+            hr_val = trackpoint.find('TrainingCenterDatabase:HeartRateBpm', ns).find('TrainingCenterDatabase:Value', ns)
+            all_items.append([os.path.basename(tcx_file_path), os.path.dirname(tcx_file_path).split('/')[-1], t.text, t.text[11:19], TimeToSeconds(t),
+                              float(latitude.text), float(longitude.text), float(altitude.text), float(distance.text), float(hr_val.text)])
+    return pd.DataFrame(all_items, columns=[
+        'file_name','dir_name','time','time_in_hours','time_in_seconds','latitude','longitude','altitude', 'distance', 'heart_rate'])
+
+
+# Return (best wall time in seconds, peak traced memory in MB) of parser(path)
+def measure(parser, path, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser(path)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    parser(path)
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return best, peak
+
+
+if __name__ == '__main__':
+    sizes = [int(n) for n in sys.argv[1:]] or [10000, 100000, 250000]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"{'points':>8} {'parser':>10} {'time (s)':>10} {'peak (MB)':>10}")
+        for n_points in sizes:
+            path = write_tcx(os.path.join(tmp_dir, f'synthetic_{n_points}.tcx'), n_points)
+            streamed = tcx_to_df(path).astype({column: object for column in ['file_name', 'dir_name', 'time', 'time_in_hours']}) # compact column types
+            pd.testing.assert_frame_equal(streamed, legacy_tcx_to_df(path), check_dtype=False)
+            for name, parser in [('legacy', legacy_tcx_to_df), ('streaming', tcx_to_df)]:
+                best, peak = measure(parser, path)
+                print(f'{n_points:>8} {name:>10} {best:>10.3f} {peak:>10.1f}')
@@ -0,0 +1,211 @@
+'''
+Project : Noz'Num
+Description : Synthetic Fit-bit like .tcx files (and the equivalent .csv files saved by the application) used by the benchmarks
+
+The files only depend on their parameters (fixed seed), so every run and every commit benchmarks the same data.
+'''
+import os
+import math
+import random
+import struct
+from datetime import datetime, timedelta
+
+
+TCX_HEADER = '''<?xml version="1.0" encoding="UTF-8"?>
+<TrainingCenterDatabase xmlns="http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2">
+  <Activities>
+    <Activity Sport="Running">
+      <Id>{start}</Id>
+'''
+
+TCX_LAP_START = '''      <Lap StartTime="{start}">
+        <TotalTimeSeconds>{duration}</TotalTimeSeconds>
+        <DistanceMeters>{distance}</DistanceMeters>
+        <Calories>0</Calories>
+        <Intensity>Active</Intensity>
+        <TriggerMethod>Manual</TriggerMethod>
+        <Track>
+'''
+
+TCX_LAP_END = '''        </Track>
+      </Lap>
+'''
+
+TCX_TRACKPOINT = '''          <Trackpoint>
+            <Time>{time}</Time>
+            <Position>
+              <LatitudeDegrees>{lat:.14f}</LatitudeDegrees>
+              <LongitudeDegrees>{lon:.14f}</LongitudeDegrees>
+            </Position>
+            <AltitudeMeters>{alt:.1f}</AltitudeMeters>
+            <DistanceMeters>{dist:.2f}</DistanceMeters>
+{heart_rate}          </Trackpoint>
+'''
+
+TCX_HEART_RATE = '''            <HeartRateBpm>
+              <Value>{hr}</Value>
+            </HeartRateBpm>
+'''
+
+TCX_FOOTER = '''    </Activity>
+  </Activities>
+</TrainingCenterDatabase>
+'''
+
+
+# Default start of the sessions, and a start 30 minutes before midnight (the session crosses midnight after 1800 points)
+DEFAULT_START = datetime(2023, 3, 10, 10, 0, 0)
+MIDNIGHT_START = datetime(2023, 3, 10, 23, 30, 0)
+
+# Columns of the csv files saved by the application
+CSV_COLUMNS = ['file_name', 'dir_name', 'time', 'time_in_hours', 'time_in_seconds', 'latitude', 'longitude', 'altitude', 'distance', 'heart_rate']
+
+
+# Generate a random walk around Brest, one point per second
+# missing_hr : fraction of the points without heart rate (the sensor drops out for runs of about 30 points, hr is then None)
+def generate_trackpoints(n_points, start=DEFAULT_START, seed=0, missing_hr=0.0):
+    rng = random.Random(seed)
+    dropout = 0
+    lat, lon, alt, dist, hr = 48.3904, -4.4861, 30.0, 0.0, 90.0
+    heading = rng.uniform(0, 2 * math.pi)
+    for i in range(n_points):
+        heading += rng.gauss(0, 0.1)
+        step = rng.uniform(2.0, 3.5) # meters per second
+        lat += step * math.cos(heading) / 111320
+        lon += step * math.sin(heading) / (111320 * math.cos(math.radians(lat)))
+        alt = max(0.0, alt + rng.gauss(0, 0.3))
+        dist += step
+        hr = min(190.0, max(60.0, hr + rng.gauss(0, 1.5)))
+        if dropout == 0 and missing_hr > 0 and rng.random() < missing_hr / 30:
+            dropout = 30
+        t = start + timedelta(seconds=i)
+        yield {'time': t.strftime('%Y-%m-%dT%H:%M:%S.000+01:00'), 'lat': lat, 'lon': lon, 'alt': alt, 'dist': dist,
+               'hr': None if dropout else int(hr)}
+        dropout = max(dropout - 1, 0)
+
+
+# Write a synthetic .tcx file with n_points trackpoints, split in `laps` laps of the same length
+def write_tcx(path, n_points, start=DEFAULT_START, seed=0, missing_hr=0.0, laps=1):
+    lap_points = max(-(-n_points // laps), 1)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(TCX_HEADER.format(start=start.strftime('%Y-%m-%dT%H:%M:%S.000+01:00')))
+        chunk = []
+        for i, point in enumerate(generate_trackpoints(n_points, start=start, seed=seed, missing_hr=missing_hr)):
+            if i % lap_points == 0:
+                if i:
+                    chunk.append(TCX_LAP_END)
+                chunk.append(TCX_LAP_START.format(start=point['time'], duration=lap_points, distance=2.75 * lap_points))
+            heart_rate = '' if point['hr'] is None else TCX_HEART_RATE.format(hr=point['hr'])
+            chunk.append(TCX_TRACKPOINT.format(heart_rate=heart_rate, **point))
+            if len(chunk) >= 10000:
+                f.write(''.join(chunk))
+                chunk = []
+        f.write(''.join(chunk))
+        if n_points:
+            f.write(TCX_LAP_END)
+        f.write(TCX_FOOTER)
+    return path
+
+
+# Write the csv file the application would save for the same session (index column, same columns as tcx_to_df)
+def write_csv(path, n_points, start=DEFAULT_START, seed=0, missing_hr=0.0):
+    file_name, dir_name = os.path.basename(path), os.path.basename(os.path.dirname(os.path.abspath(path)))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(',' + ','.join(CSV_COLUMNS) + '\n')
+        chunk = []
+        for i, point in enumerate(generate_trackpoints(n_points, start=start, seed=seed, missing_hr=missing_hr)):
+            time_in_seconds = start.hour * 3600 + start.minute * 60 + start.second + i # from the midnight before the start, like tcx_to_df
+            heart_rate = '' if point['hr'] is None else f"{point['hr']:.1f}"
+            chunk.append(f"{i},{file_name},{dir_name},{point['time']},{point['time'][11:19]},{time_in_seconds:.1f},{point['lat']:.14f},"
+                         f"{point['lon']:.14f},{point['alt']:.1f},{point['dist']:.2f},{heart_rate}\n")
+            if len(chunk) == 10000:
+                f.write(''.join(chunk))
+                chunk = []
+        f.write(''.join(chunk))
+    return path
+
+
+GPX_HEADER = '''<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="noznum synthetic" xmlns="http://www.topografix.com/GPX/1/1"
+     xmlns:gpxtpx="http://www.garmin.com/xmlschemas/TrackPointExtension/v1">
+  <trk>
+    <name>Synthetic run</name>
+    <trkseg>
+'''
+
+GPX_TRACKPOINT = '''      <trkpt lat="{lat:.14f}" lon="{lon:.14f}">
+        <ele>{alt:.1f}</ele>
+        <time>{time}</time>
+{heart_rate}      </trkpt>
+'''
+
+GPX_HEART_RATE = '''        <extensions>
+          <gpxtpx:TrackPointExtension>
+            <gpxtpx:hr>{hr}</gpxtpx:hr>
+          </gpxtpx:TrackPointExtension>
+        </extensions>
+'''
+
+GPX_FOOTER = '''    </trkseg>
+  </trk>
+</gpx>
+'''
+
+
+# Write the same session as a .gpx file (no distance : gpx_to_df computes it from the coordinates)
+def write_gpx(path, n_points, start=DEFAULT_START, seed=0, missing_hr=0.0):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(GPX_HEADER)
+        chunk = []
+        for point in generate_trackpoints(n_points, start=start, seed=seed, missing_hr=missing_hr):
+            heart_rate = '' if point['hr'] is None else GPX_HEART_RATE.format(hr=point['hr'])
+            chunk.append(GPX_TRACKPOINT.format(heart_rate=heart_rate, **point))
+            if len(chunk) == 10000:
+                f.write(''.join(chunk))
+                chunk = []
+        f.write(''.join(chunk))
+        f.write(GPX_FOOTER)
+    return path
+
+
+# FIT encoding of the records : field number, size, base type (see noznum.readers)
+FIT_RECORD_DEFINITION = [(253, 4, 0x86), (0, 4, 0x85), (1, 4, 0x85), (2, 2, 0x84), (5, 4, 0x86), (3, 1, 0x02)]
+FIT_EPOCH = 631065600
+
+# CRC of the FIT files
+def fit_crc(data, crc=0):
+    table = [0x0000, 0xCC01, 0xD801, 0x1400, 0xF001, 0x3C00, 0x2800, 0xE401, 0xA001, 0x6C00, 0x7800, 0xB401, 0x5000, 0x9C01, 0x8801, 0x4400]
+    for byte in data:
+        tmp = table[crc & 0xF]
+        crc = (crc >> 4) & 0x0FFF
+        crc = crc ^ tmp ^ table[byte & 0xF]
+        tmp = table[crc & 0xF]
+        crc = (crc >> 4) & 0x0FFF
+        crc = crc ^ tmp ^ table[(byte >> 4) & 0xF]
+    return crc
+
+def fit_definition(local_type, global_number, fields):
+    return struct.pack('<BBBHB', 0x40 | local_type, 0, 0, global_number, len(fields)) + b''.join(struct.pack('BBB', *field) for field in fields)
+
+# Write the same session as a binary .fit file : a file_id message, the records (every other one with a compressed timestamp
+# header, like some watches do) and an activity message giving the local time offset
+def write_fit(path, n_points, start=DEFAULT_START, seed=0, missing_hr=0.0, utc_offset=3600):
+    first_timestamp = int((start - datetime(1970, 1, 1)).total_seconds()) - utc_offset - FIT_EPOCH # start is local time
+    messages = [fit_definition(0, 0, [(0, 1, 0x00), (4, 4, 0x86)]), struct.pack('<BBI', 0, 4, first_timestamp),
+                fit_definition(1, 20, FIT_RECORD_DEFINITION), fit_definition(2, 20, FIT_RECORD_DEFINITION[1:])]
+    for i, point in enumerate(generate_trackpoints(n_points, start=start, seed=seed, missing_hr=missing_hr)):
+        timestamp = first_timestamp + i
+        values = (round(point['lat'] * 2**31 / 180), round(point['lon'] * 2**31 / 180), round((point['alt'] + 500) * 5),
+                  round(point['dist'] * 100), 0xFF if point['hr'] is None else point['hr'])
+        if i % 2:
+            messages.append(struct.pack('<BiiHIB', 0x80 | (2 << 5) | (timestamp & 0x1F), *values))
+        else:
+            messages.append(struct.pack('<BIiiHIB', 1, timestamp, *values))
+    messages.append(fit_definition(3, 34, [(253, 4, 0x86), (5, 4, 0x86), (1, 2, 0x84)]))
+    messages.append(struct.pack('<BIIH', 3, first_timestamp + n_points, first_timestamp + n_points + utc_offset, 1))
+    data = b''.join(messages)
+    header = struct.pack('<BBHI4s', 14, 0x20, 2132, len(data), b'.FIT')
+    header += struct.pack('<H', fit_crc(header))
+    with open(path, 'wb') as f:
+        f.write(header + data + struct.pack('<H', fit_crc(header + data)))
+    return path
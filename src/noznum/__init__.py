@@ -0,0 +1,43 @@
+'''
+Project : Noz'Num
+Description : Interactive visualization tool for Fit-bit watch data (.tcx files)
+
+The data layer (noznum.core, noznum.cache, noznum.batch) only needs numpy and pandas.
+The graphical interface (noznum.gui) and the map (noznum.maps) need Qt, matplotlib and folium : they are only imported when
+one of their names is used, so `import noznum` stays fast and works on machines without a display.
+'''
+import importlib
+
+
+# Public names and the module defining them
+LAZY_NAMES = {
+    'Data' : 'noznum.core',
+    'AxesNames' : 'noznum.core',
+    'tcx_to_df' : 'noznum.core',
+    'csv_to_df' : 'noznum.core',
+    'decode_timestamps' : 'noznum.core',
+    'compute_stats' : 'noznum.core',
+    'compute_global_stats' : 'noznum.core',
+    'save_stats' : 'noznum.core',
+    'SessionCache' : 'noznum.cache',
+    'StatsStore' : 'noznum.stats_store',
+    'Workspace' : 'noznum.workspace',
+    'TileStore' : 'noznum.tiles',
+    'SpatialIndex' : 'noznum.geofence',
+    'ReportRenderer' : 'noznum.report',
+    'GenerateMap' : 'noznum.maps',
+    'MapWidget' : 'noznum.gui',
+    'MplCanvas' : 'noznum.gui',
+    'SliderWidget' : 'noznum.gui',
+    'MainWindow' : 'noznum.gui',
+}
+
+
+# Import the module of a public name the first time it is used (PEP 562)
+def __getattr__(name):
+    if name in LAZY_NAMES:
+        return getattr(importlib.import_module(LAZY_NAMES[name]), name)
+    raise AttributeError(f"module 'noznum' has no attribute '{name}'")
+
+def __dir__():
+    return sorted(list(globals()) + list(LAZY_NAMES))
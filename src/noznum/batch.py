@@ -0,0 +1,215 @@
+'''
+Project : Noz'Num
+Description : Headless batch processing of a directory tree of session files (.tcx, .gpx, .fit, no Qt needed)
+
+Usage : python -m noznum.batch DATA_DIR -o OUTPUT_DIR [--jobs N] [--format feather|parquet|csv]
+                               [--gate-start LAT LON --gate-end LAT LON [--gate-radius M] | --polygon POLYGON] [--label LABEL]
+
+Every session file found in DATA_DIR is parsed in a pool of processes and saved in OUTPUT_DIR (same sub-directories, the
+name of the session file followed by the extension of the format : p01/a.tcx -> p01/a.tcx.feather), then the statistics of every session are gathered in OUTPUT_DIR/global_stats.csv (one row per file).
+With gates or a polygon (see noznum.geofence), the matching segments of all the sessions are found with a spatial index and
+their statistics (compute_stats) are written to OUTPUT_DIR/segment_stats.csv (one row per segment).
+'''
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from noznum.core import compute_global_stats, compute_stats, GLOBAL_STATS_COLUMNS
+from noznum.readers import read_session, RECORDING_EXTENSIONS
+from noznum.stats_store import STATS_COLUMNS
+from noznum.geofence import SpatialIndex, Gate, gate_segments, polygon_segments, load_polygon, GATE_RADIUS_M
+
+
+# Columns of the consolidated statistics table
+BATCH_STATS_COLUMNS = ['paricipant_number', 'dataset_number', 'n_points'] + GLOBAL_STATS_COLUMNS
+
+# File extension of each output format
+OUTPUT_EXTENSIONS = {'feather' : '.feather', 'parquet' : '.parquet', 'csv' : '.csv'}
+
+# Statistics files written in the output directory, next to the parsed files
+STATS_FILE_NAMES = ['global_stats.csv', 'segment_stats.csv']
+
+
+# Return the sorted paths of all the session files (RECORDING_EXTENSIONS) of a directory tree
+def find_session_files(data_dir):
+    session_files = []
+    for dir_path, _, file_names in os.walk(data_dir):
+        for file_name in file_names:
+            if os.path.splitext(file_name)[1].lower() in RECORDING_EXTENSIONS:
+                session_files.append(os.path.join(dir_path, file_name))
+    return sorted(session_files)
+
+# Save a dataframe in the requested format
+def write_df(df, output_path, file_format):
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    if file_format == 'feather':
+        df.to_feather(output_path)
+    elif file_format == 'parquet':
+        df.to_parquet(output_path, index=False)
+    else:
+        df.to_csv(output_path, index=False)
+
+# Return the sorted paths of the parsed files (file_format) of an output directory tree, without the statistics files
+def find_parsed_files(output_dir, file_format):
+    parsed_files = []
+    for dir_path, _, file_names in os.walk(output_dir):
+        for file_name in file_names:
+            if file_name.endswith(OUTPUT_EXTENSIONS[file_format]) and file_name not in STATS_FILE_NAMES:
+                parsed_files.append(os.path.join(dir_path, file_name))
+    return sorted(parsed_files)
+
+# Read a dataframe saved by write_df (only some columns if given)
+def read_df(output_path, file_format, columns=None):
+    if file_format == 'feather':
+        return pd.read_feather(output_path, columns=columns)
+    elif file_format == 'parquet':
+        return pd.read_parquet(output_path, columns=columns)
+    else:
+        return pd.read_csv(output_path, usecols=columns)
+
+# Path of the parsed file of a session file, in output_dir. The extension of the session file is kept : a.tcx and a.gpx of the
+# same directory are two sessions.
+def output_path_for(relative_path, output_dir, file_format):
+    return os.path.join(output_dir, relative_path + OUTPUT_EXTENSIONS[file_format])
+
+# Parse one session file, save it and return its statistics (runs in a worker process)
+def process_session(session_file_path, output_path, file_format):
+    df = read_session(session_file_path)
+    write_df(df, output_path, file_format)
+    stats = {
+        'paricipant_number' : df['dir_name'].iloc[0] if len(df) else os.path.basename(os.path.dirname(session_file_path)),
+        'dataset_number' : os.path.basename(session_file_path),
+        'n_points' : len(df)
+    }
+    if len(df):
+        stats.update(compute_global_stats(df))
+    return stats
+
+# Parse every session file of data_dir with `jobs` processes, return the consolidated statistics dataframe and the failed files
+def run_batch(data_dir, output_dir, jobs=None, file_format='feather', log=sys.stderr):
+    session_files = find_session_files(data_dir)
+    total = len(session_files)
+    rows, failed = [], []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {}
+        for session_file_path in session_files:
+            relative_path = os.path.relpath(session_file_path, data_dir)
+            output_path = output_path_for(relative_path, output_dir, file_format)
+            futures[executor.submit(process_session, session_file_path, output_path, file_format)] = relative_path
+        for done, future in enumerate(as_completed(futures), start=1):
+            relative_path = futures[future]
+            try:
+                stats = future.result()
+            except Exception as error: # a broken file must not stop the whole batch
+                failed.append((relative_path, error))
+                print(f'[{done}/{total}] FAILED {relative_path}: {error}', file=log)
+                continue
+            rows.append(stats)
+            print(f'[{done}/{total}] {relative_path} ({stats["n_points"]} points, {time.perf_counter() - start:.1f}s)', file=log)
+
+    stats_df = pd.DataFrame(rows, columns=BATCH_STATS_COLUMNS)
+    stats_df = stats_df.sort_values(['paricipant_number', 'dataset_number']).reset_index(drop=True)
+    return stats_df, failed
+
+# Statistics (compute_stats, one row per segment) of the segments [(label, first, last), ...] of a parsed session (runs in a worker process)
+# Like the segments saved from the application, every row of a segment gets its average speed.
+def process_segments(output_path, file_format, segments):
+    df = read_df(output_path, file_format)
+    global_stats = compute_global_stats(df)
+    dist, ts = df['distance'].to_numpy(), df['time_in_seconds'].to_numpy()
+    stats = []
+    for label, first, last in segments:
+        speed = abs(dist[last] - dist[first]) / abs(ts[last] - ts[first])
+        segment_df = df.iloc[first:last + 1].assign(speed=speed)
+        stats.append(compute_stats(segment_df, label, df['file_name'].iloc[0], df['dir_name'].iloc[0], df, global_stats=global_stats))
+    return stats
+
+# Find the segments of all the parsed sessions between two gates (gates=(start, end)) or inside a polygon
+# The coordinates of every session are read from its parsed file into one spatial index. Segments are labelled `label`, with
+# a number when a session has several of them. Return {output_path: [(label, first, last), ...]}.
+def find_segments(output_paths, file_format, gates=None, polygon=None, label='segment', log=sys.stderr):
+    index = SpatialIndex()
+    for output_path in output_paths:
+        coordinates = read_df(output_path, file_format, columns=['latitude', 'longitude'])
+        index.add(output_path, coordinates['latitude'].to_numpy(), coordinates['longitude'].to_numpy())
+    found = gate_segments(index, *gates) if gates is not None else polygon_segments(index, polygon)
+    print(f'{sum(map(len, found.values()))} segments found in {len(found)} of {len(index)} sessions', file=log)
+    segments = {}
+    for output_path, ranges in found.items():
+        labels = [label] if len(ranges) == 1 else [f'{label}_{number}' for number in range(1, len(ranges) + 1)]
+        segments[output_path] = [(segment_label, first, last) for segment_label, (first, last) in zip(labels, ranges)]
+    return segments
+
+# Find the segments of all the parsed sessions (see find_segments) and compute their statistics with `jobs` processes
+# Return the statistics dataframe.
+def run_segments(output_paths, file_format, gates=None, polygon=None, label='segment', jobs=None, log=sys.stderr):
+    found = find_segments(output_paths, file_format, gates=gates, polygon=polygon, label=label, log=log)
+    stats = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = []
+        for output_path, segments in found.items():
+            futures.append(executor.submit(process_segments, output_path, file_format, segments))
+        for future in as_completed(futures):
+            stats.extend(future.result())
+    if not stats:
+        return pd.DataFrame(columns=STATS_COLUMNS)
+    return pd.concat(stats, ignore_index=True).sort_values(['paricipant_number', 'dataset_number', 'label']).reset_index(drop=True)
+
+
+# Command line options of the segments found in all the sessions (also used by noznum.report)
+def add_segment_arguments(parser):
+    parser.add_argument('--gate-start', type=float, nargs=2, metavar=('LAT', 'LON'), help='center of the gate where the segments start')
+    parser.add_argument('--gate-end', type=float, nargs=2, metavar=('LAT', 'LON'), help='center of the gate where the segments end (can be the start gate : laps)')
+    parser.add_argument('--gate-radius', type=float, default=GATE_RADIUS_M, help=f'radius of the gates in meters (default: {GATE_RADIUS_M:g})')
+    parser.add_argument('--polygon', help='segments inside a polygon : GeoJSON file, or "lat,lon;lat,lon;..."')
+    parser.add_argument('--label', default='segment', help='label of the segments found with the gates or the polygon (default: segment)')
+
+# Gates and polygon of the parsed command line, (None, None) if no segment is requested
+def segment_arguments(parser, args):
+    if (args.gate_start is None) != (args.gate_end is None):
+        parser.error('--gate-start and --gate-end go together')
+    if args.gate_start is not None and args.polygon is not None:
+        parser.error('use either the gates or a polygon')
+    gates = None
+    if args.gate_start is not None:
+        gates = (Gate(*args.gate_start, args.gate_radius), Gate(*args.gate_end, args.gate_radius))
+    polygon = load_polygon(args.polygon) if args.polygon is not None else None
+    return gates, polygon
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m noznum.batch', description='Parse a directory tree of session files (.tcx, .gpx, .fit) and compute the statistics of every session.')
+    parser.add_argument('data_dir', help='directory containing the session files (searched recursively)')
+    parser.add_argument('-o', '--output-dir', required=True, help='directory where the parsed files and global_stats.csv are written')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes (default: number of CPUs)')
+    parser.add_argument('-f', '--format', choices=sorted(OUTPUT_EXTENSIONS), default='feather', help='format of the parsed files (default: feather)')
+    add_segment_arguments(parser)
+    args = parser.parse_args(argv)
+    gates, polygon = segment_arguments(parser, args)
+
+    stats_df, failed = run_batch(args.data_dir, args.output_dir, jobs=args.jobs, file_format=args.format)
+    os.makedirs(args.output_dir, exist_ok=True)
+    stats_file_path = os.path.join(args.output_dir, 'global_stats.csv')
+    stats_df.to_csv(stats_file_path, index=False)
+    print(f'{len(stats_df)} sessions saved, statistics written to {stats_file_path}', file=sys.stderr)
+
+    if gates is not None or polygon is not None:
+        failed_paths = {relative_path for relative_path, _ in failed}
+        output_paths = [output_path_for(os.path.relpath(session_file_path, args.data_dir), args.output_dir, args.format)
+                        for session_file_path in find_session_files(args.data_dir)
+                        if os.path.relpath(session_file_path, args.data_dir) not in failed_paths]
+        segments_df = run_segments(output_paths, args.format, gates=gates, polygon=polygon, label=args.label, jobs=args.jobs)
+        segments_file_path = os.path.join(args.output_dir, 'segment_stats.csv')
+        segments_df.to_csv(segments_file_path, index=False)
+        print(f'{len(segments_df)} segments, statistics written to {segments_file_path}', file=sys.stderr)
+    if failed:
+        print(f'{len(failed)} files could not be parsed', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+'''
+Project : Noz'Num
+Description : On-disk cache of the parsed sessions
+'''
+import os
+import json
+import hashlib
+import tempfile
+import importlib.util
+import pandas as pd
+from noznum.profiling import timed
+
+
+##~##~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ SESSION CACHE ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# Where the parsed sessions are cached, and how much disk space the cache may use
+DEFAULT_CACHE_DIR = os.environ.get('NOZNUM_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.noznum', 'cache'))
+DEFAULT_CACHE_MAX_BYTES = int(float(os.environ.get('NOZNUM_CACHE_MAX_MB', 512)) * 2**20)
+
+# Bump when the parsers change the dataframes they return, old cache entries are then ignored
+CACHE_VERSION = 3
+
+
+# Return the sha1 of a file's content, read by blocks
+def file_hash(file_path, block_size=2**20):
+    sha1 = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+# On-disk cache of parsed sessions, stored as feather (columnar binary) files.
+# An entry is keyed by the path and the content hash of the source file and the reader used to parse it : the dataframes hold the
+# file and directory (participant) names, two copies of a file in different directories have their own entries. The mtime and size
+# of the source files are remembered in an index so an unchanged file is not hashed again. When the cache grows over max_bytes, the least
+# recently used entries are deleted (the mtime of an entry is refreshed each time it is read).
+# Without pyarrow the cache is disabled and files are simply parsed.
+class SessionCache():
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(self.cache_dir, 'index.json')
+        self.enabled = importlib.util.find_spec('pyarrow') is not None and self.max_bytes > 0
+
+    # Return the dataframe of file_path, parsed with reader(file_path, **reader_kwargs) only if it is not cached yet
+    @timed('SessionCache.load')
+    def load(self, file_path, reader, **reader_kwargs):
+        if not self.enabled:
+            return reader(file_path, **reader_kwargs)
+        entry_path = self.entry_path(file_path, reader)
+        if os.path.isfile(entry_path):
+            try:
+                df = pd.read_feather(entry_path)
+                os.utime(entry_path) # most recently used
+                return df
+            except (OSError, ValueError):
+                pass # unreadable entry, parse the file again
+        df = reader(file_path, **reader_kwargs)
+        self.store(entry_path, df)
+        return df
+
+    # Path of the cache entry of file_path for a given reader
+    def entry_path(self, file_path, reader):
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        index = self.read_index()
+        known = index.get(file_path)
+        if known is not None and known['mtime'] == stat.st_mtime and known['size'] == stat.st_size:
+            content_hash = known['hash']
+        else:
+            content_hash = file_hash(file_path)
+            index[file_path] = {'mtime' : stat.st_mtime, 'size' : stat.st_size, 'hash' : content_hash}
+            self.write_index(index)
+        path_hash = hashlib.sha1(file_path.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f'{content_hash}_{path_hash}_{reader.__name__}_v{CACHE_VERSION}.feather')
+
+    # Save a dataframe in the cache then evict old entries if needed
+    def store(self, entry_path, df):
+        try:
+            tmp_path = self.temporary_file()
+            try:
+                df.reset_index(drop=True).to_feather(tmp_path)
+                os.replace(tmp_path, entry_path) # atomic, a reader never sees a half written entry
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        except (OSError, ValueError, TypeError):
+            return # the cache is only an optimization, a failed write is not an error
+        self.evict()
+
+    # New empty file of the cache directory, written then renamed : every writer (thread or batch process) has its own
+    def temporary_file(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix='.tmp', delete=False) as f:
+            return f.name
+
+    # Delete the least recently used entries until the cache fits in max_bytes, and forget the deleted source files
+    def evict(self):
+        self.prune_index()
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.feather'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    # Remove every entry of the cache
+    def clear(self):
+        if os.path.isdir(self.cache_dir):
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith(('.feather', '.json', '.tmp')):
+                    os.remove(entry.path)
+
+    def read_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write_index(self, index):
+        try:
+            tmp_path = self.temporary_file()
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(index, f)
+                os.replace(tmp_path, self.index_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        except OSError:
+            pass
+
+    # Remove the source files that no longer exist from the index
+    def prune_index(self):
+        index = self.read_index()
+        kept = {file_path : known for file_path, known in index.items() if os.path.isfile(file_path)}
+        if len(kept) < len(index):
+            self.write_index(kept)
@@ -0,0 +1,545 @@
+'''
+Project : Noz'Num
+Description : Data layer of the application (tcx/csv parsing and statistics). It only needs numpy and pandas,
+so it can be used without Qt, folium or matplotlib (batch processing, scripts, ...)
+'''
+import os
+import importlib.util
+from functools import cached_property
+from xml.etree import ElementTree as ET
+import numpy as np
+import pandas as pd
+from noznum.route import route_pyramid
+from noznum.metrics import derived_metrics, METRICS_LABELS
+from noznum.filters import smooth, FILTER_CACHE_SIZE
+from noznum.profiling import timed
+from noznum.stats_store import StatsStore, STATS_COLUMNS
+
+
+##~##~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ STATISTICS ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# Columns of the statistics of a whole session (global file)
+GLOBAL_STATS_COLUMNS = ['global_avg_heart_rate','global_std_heart_rate','global_avg_altitude','global_std_altitude', 'global_avg_speed','global_std_speed', 'global_route_duration', 'global_distance']
+
+# Format a duration in seconds as "hh:mm:ss"
+def format_duration(time_s):
+    hours = time_s // 3600
+    minutes = (time_s % 3600) // 60
+    seconds = time_s % 60
+    return "{:02}:{:02}:{:02}".format(int(hours), int(minutes), int(seconds))
+
+# Calculate the statistics of a whole session (global file), returned as a dict with the GLOBAL_STATS_COLUMNS keys
+def compute_global_stats(global_df):
+    # Calculate the average speed of the global file
+    global_total_dist = global_df['distance'].max()
+    global_total_time = global_df['time_in_seconds'].max() - global_df['time_in_seconds'].min()
+    global_avg_speed = global_total_dist / global_total_time
+
+    # The speed column only exists once a segment has been saved from the application
+    global_std_speed = global_df['speed'].std() if 'speed' in global_df else np.nan # écart type
+
+    return {
+        'global_avg_heart_rate' : global_df['heart_rate'].mean(),
+        'global_std_heart_rate' : global_df['heart_rate'].std(), # écart type
+        'global_avg_altitude' : global_df['altitude'].mean(),
+        'global_std_altitude' : global_df['altitude'].std(), # écart type
+        'global_avg_speed' : global_avg_speed,
+        'global_std_speed' : global_std_speed,
+        'global_route_duration' : format_duration(global_total_time),
+        'global_distance' : global_df['distance'].max()
+    }
+
+# Calculate statistics from a dataframe
+# global_stats : statistics of global_df if they are already known (see Data.global_stats), computed otherwise
+def compute_stats(df, label, global_file_name, global_file_dir, global_df, global_stats=None):
+    # Calculate the average heart rate
+    avg_hr = df['heart_rate'].mean()
+
+    # Calculate the standard deviation of the heart rate
+    std_hr = df['heart_rate'].std() # écart type
+
+    # Calculate the average altitude
+    avg_alt = df['altitude'].mean()
+
+    # Calulcate the standard deviation of the altitude
+    std_alt = df['altitude'].std() # écart type
+
+    # Calculate the average speed
+    total_dist = df['distance'].max() - df['distance'].min()
+    total_time = df['time_in_seconds'].max() - df['time_in_seconds'].min()
+    avg_speed = total_dist / total_time # meters/seconds
+
+    # Calculate the standard deviation of the speed
+    std_speed = df['speed'].std() # écart type 
+
+    # Calculate the time of the activity                     
+    route_duration = format_duration(total_time)
+
+    # Calculate the distance of the route
+    distance = df['distance'].max() # We don't use the last value, which would be logically right, because it is sometimes at 0 meters for obscure reasons...
+
+    # Statistics of the global file
+    if global_stats is None:
+        global_stats = compute_global_stats(global_df)
+
+    # create a stats dataframe
+    return stats_to_df(global_file_dir, global_file_name, label, [avg_hr, std_hr, avg_alt, std_alt, avg_speed, std_speed, route_duration, distance], global_stats)
+
+# One row dataframe with the STATS_COLUMNS from the statistics of a segment (in the order of the columns) and of its whole session
+def stats_to_df(global_file_dir, global_file_name, label, segment_stats, global_stats):
+    return pd.DataFrame([[global_file_dir, global_file_name, label] + list(segment_stats) + [global_stats[column] for column in GLOBAL_STATS_COLUMNS]],
+                        columns=STATS_COLUMNS)
+
+
+# Prefix sums of a series : mean and standard deviation of any range of rows in O(1)
+# The values are centered on their mean before being summed, so the sums of squares don't lose precision on long series.
+class PrefixStats():
+    def __init__(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        self.offset = values[valid].mean() if valid.any() else 0.0
+        centered = np.where(valid, values - self.offset, 0.0)
+        self.count = np.concatenate([[0], np.cumsum(valid, dtype=np.int64)])
+        self.sum = np.concatenate([[0.0], np.cumsum(centered)])
+        self.sum2 = np.concatenate([[0.0], np.cumsum(centered * centered)])
+
+    # Mean and standard deviation (ddof=1, like pandas) of the rows first to last (positions, included), NaN are skipped
+    def mean_std(self, first, last):
+        n = self.count[last + 1] - self.count[first]
+        if n == 0:
+            return np.nan, np.nan
+        total = self.sum[last + 1] - self.sum[first]
+        mean = total / n
+        if n == 1:
+            return mean + self.offset, np.nan
+        variance = (self.sum2[last + 1] - self.sum2[first] - total * mean) / (n - 1)
+        return mean + self.offset, np.sqrt(max(variance, 0.0))
+
+    @property
+    def nbytes(self):
+        return self.count.nbytes + self.sum.nbytes + self.sum2.nbytes
+
+# Save statistics in the dedicated stats database (stats.sqlite next to the csv file) and append them to the stats csv file
+# The first time, the rows of an existing stats csv file are imported in the new database (see StatsStore.import_legacy_csv).
+def save_stats(csv_file_path, stats_df):
+    store = StatsStore(os.path.splitext(csv_file_path)[0] + '.sqlite', legacy_csv_path=csv_file_path)
+    store.insert(stats_df, csv_file_path=csv_file_path)
+
+
+
+
+##~##~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ TXC TO DF ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# pd.to_datetime only understands format='ISO8601' since pandas 2.0 (mixed precisions and offsets in one column)
+ISO8601_KWARGS = {'format': 'ISO8601'} if int(pd.__version__.split('.')[0]) >= 2 else {}
+
+# Decode a whole column of tcx timestamps (ex: "2023-03-10T10:12:13.000+01:00") in one vectorized pass
+# Returns :
+#   - the timestamps as UTC datetime64 values
+#   - the epoch time in seconds
+#   - the clock time in seconds, counted from the local midnight of the first sample. Unlike a plain time of day,
+#     it keeps increasing after midnight (86400, 86401, ...) so activities crossing 00:00 stay monotonic
+#   - the clock time as written in the file ("hh:mm:ss")
+# Missing timestamps give NaT / NaN.
+def decode_timestamps(time_strings):
+    time_strings = pd.Series(np.asarray(time_strings, dtype=object))
+    utc = pd.to_datetime(time_strings, utc=True, errors='coerce', **ISO8601_KWARGS)
+    epoch = ((utc - pd.Timestamp(0, tz='UTC')) / pd.Timedelta(seconds=1)).to_numpy(dtype=np.float64)
+    time_in_hours = time_strings.str.slice(11, 19)
+
+    clock = np.full(epoch.size, np.nan)
+    valid = np.flatnonzero(~np.isnan(epoch))
+    if valid.size:
+        first = valid[0]
+        h, m, sec = (int(x) for x in time_in_hours[first].split(':'))
+        first_clock = h * 3600 + m * 60 + sec + (epoch[first] % 1) # time of day of the first sample, in its own timezone
+        clock = first_clock + (epoch - epoch[first])
+    return utc.dt.tz_localize(None).to_numpy(), epoch, clock, time_in_hours.to_numpy(dtype=object)
+
+# Types of the columns of a session dataframe, chosen for memory (see compact_df)
+# Latitude, longitude and times stay float64 (a float32 latitude is only precise to about a meter), the measures fit in
+# float32. The file and directory names are the same on every row : categorical columns store the string once.
+COMPACT_DTYPES = {
+    'latitude' : np.float64, 'longitude' : np.float64, 'time_in_seconds' : np.float64,
+    'altitude' : np.float32, 'distance' : np.float32, 'heart_rate' : np.float32, 'speed' : np.float32,
+    'file_name' : 'category', 'dir_name' : 'category', 'label' : 'category'
+}
+
+# Columns with a different string on every row : stored in arrow buffers when pyarrow is installed (a few bytes per row
+# instead of a python object each)
+TEXT_COLUMNS = ['time', 'time_in_hours']
+TEXT_DTYPE = 'string[pyarrow]' if importlib.util.find_spec('pyarrow') is not None else object
+
+
+# Return df with the compact column types (df itself if its columns already have them)
+def compact_df(df):
+    dtypes = {column: dtype for column, dtype in COMPACT_DTYPES.items() if column in df}
+    dtypes.update({column: TEXT_DTYPE for column in TEXT_COLUMNS if column in df})
+    dtypes = {column: dtype for column, dtype in dtypes.items() if df[column].dtype != dtype}
+    return df.astype(dtypes) if dtypes else df
+
+
+# Garmin TrainingCenterDatabase namespace, as it appears in the tags returned by iterparse
+TCX_NS = '{http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2}'
+
+# Columns of the dataframe returned by tcx_to_df (same order as the original list based parser)
+TCX_COLUMNS = ['file_name','dir_name','time','time_in_hours','time_in_seconds','latitude','longitude','altitude', 'distance', 'heart_rate']
+
+# Trackpoint leaf tags and the numeric column they are written to
+TCX_NUMERIC_TAGS = {
+    TCX_NS + 'LatitudeDegrees' : 'latitude',
+    TCX_NS + 'LongitudeDegrees' : 'longitude',
+    TCX_NS + 'AltitudeMeters' : 'altitude',
+    TCX_NS + 'DistanceMeters' : 'distance',
+    TCX_NS + 'Value' : 'heart_rate' # <HeartRateBpm><Value>
+}
+
+# Rough size of one trackpoint in a tcx file, used to guess how many rows to preallocate
+TCX_BYTES_PER_TRACKPOINT = 300
+
+
+# Preallocated numpy column buffers filled row by row by the streaming tcx parser
+class TrackpointBuffer():
+    def __init__(self, capacity=4096):
+        self.size = 0
+        self.capacity = max(int(capacity), 1)
+        self.numeric = {column: np.full(self.capacity, np.nan, dtype=COMPACT_DTYPES[column]) for column in TCX_NUMERIC_TAGS.values()}
+        self.time = np.empty(self.capacity, dtype=object)
+
+    # Double the capacity of every buffer (amortized O(1) per row)
+    def grow(self):
+        new_capacity = self.capacity * 2
+        for column, values in self.numeric.items():
+            grown = np.full(new_capacity, np.nan, dtype=values.dtype)
+            grown[:self.size] = values[:self.size]
+            self.numeric[column] = grown
+        grown = np.empty(new_capacity, dtype=object)
+        grown[:self.size] = self.time[:self.size]
+        self.time = grown
+        self.capacity = new_capacity
+
+    # Build the dataframe from the filled part of the buffers, the time columns are decoded all at once
+    def to_df(self, file_name, dir_name):
+        n = self.size
+        _, _, time_in_seconds, time_in_hours = decode_timestamps(self.time[:n])
+        columns = {
+            'file_name' : pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), [file_name]),
+            'dir_name' : pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), [dir_name]),
+            'time' : self.time[:n],
+            'time_in_hours' : time_in_hours,
+            'time_in_seconds' : time_in_seconds,
+        }
+        for column, values in self.numeric.items():
+            columns[column] = values[:n]
+        df = pd.DataFrame(columns, columns=TCX_COLUMNS, copy=True) # copied, the buffers may still be filled (partial results)
+        return compact_df(df)
+
+
+# Number of trackpoints (or csv rows) read between two calls of the progress callback of the readers
+PROGRESS_EVERY = 5000
+
+
+# Generate a dataframe from a tcx file
+# The file is streamed with iterparse: every trackpoint is written into preallocated numpy buffers and cleared
+# as soon as it has been read, so the whole xml tree is never held in memory.
+# The trackpoints of every lap (and of every track of a lap) are read, in file order.
+# progress(fraction, partial), if given, is called every PROGRESS_EVERY trackpoints with the fraction of the file read and a
+# function returning the dataframe of the trackpoints read so far. It can stop the parsing by raising an exception.
+@timed('tcx_to_df')
+def tcx_to_df(tcx_file_path, progress=None):
+    file_name = os.path.basename(tcx_file_path)
+    dir_name = os.path.dirname(tcx_file_path).split('/')[-1]
+    file_size = os.path.getsize(tcx_file_path)
+    buffer = TrackpointBuffer(capacity=file_size // TCX_BYTES_PER_TRACKPOINT)
+    with open(tcx_file_path, 'rb') as tcx_file:
+        in_trackpoint = False
+        has_values = False
+        track = None
+        for event, elem in ET.iterparse(tcx_file, events=('start', 'end')):
+            tag = elem.tag
+            if event == 'start':
+                if tag == TCX_NS + 'Trackpoint':
+                    in_trackpoint = True
+                    has_values = False
+                    if buffer.size == buffer.capacity:
+                        buffer.grow()
+                elif tag == TCX_NS + 'Track':
+                    track = elem
+                continue
+
+            if in_trackpoint:
+                if tag == TCX_NS + 'Trackpoint':
+                    in_trackpoint = False
+                    if has_values: # empty trackpoints were skipped by the original parser too
+                        buffer.size += 1
+                        if progress is not None and buffer.size % PROGRESS_EVERY == 0:
+                            progress(tcx_file.tell() / file_size, lambda: buffer.to_df(file_name, dir_name))
+                    elem.clear()
+                    if track is not None:
+                        track.remove(elem) # free the trackpoint, the track only keeps the ones not read yet
+                elif tag == TCX_NS + 'Time':
+                    buffer.time[buffer.size] = elem.text # decoded later, see decode_timestamps
+                    has_values = True
+                elif tag in TCX_NUMERIC_TAGS:
+                    buffer.numeric[TCX_NUMERIC_TAGS[tag]][buffer.size] = float(elem.text)
+                    has_values = True
+
+    return buffer.to_df(file_name, dir_name)
+
+
+# Types of the columns of a csv saved by the application (other columns are left to pandas)
+CSV_DTYPES = {
+    'file_name' : str, 'dir_name' : str, 'time' : str, 'time_in_hours' : str, 'label' : str,
+    'time_in_seconds' : float, 'latitude' : float, 'longitude' : float, 'altitude' : float,
+    'distance' : float, 'heart_rate' : float, 'speed' : float
+}
+
+# Clock times of a csv file decoded again from its time column : the csv files saved by older versions hold the time of day
+# in time_in_seconds, which goes back to 0 at midnight (see decode_timestamps). Rows without time keep their value.
+def csv_clock(df):
+    if 'time' in df and len(df):
+        clock = decode_timestamps(df['time'].to_numpy(dtype=object))[2]
+        df['time_in_seconds'] = np.where(np.isnan(clock), df['time_in_seconds'].to_numpy(dtype=np.float64), clock)
+    return df
+
+# Load a csv file (original data or data saved between two points)
+# progress(fraction, partial) works like in tcx_to_df
+@timed('csv_to_df')
+def csv_to_df(csv_file_path, progress=None):
+    if progress is None:
+        return compact_df(csv_clock(pd.read_csv(csv_file_path, dtype=CSV_DTYPES)))
+    file_size = os.path.getsize(csv_file_path)
+    chunks = []
+    with open(csv_file_path, 'rb') as csv_file:
+        for chunk in pd.read_csv(csv_file, dtype=CSV_DTYPES, chunksize=PROGRESS_EVERY):
+            chunks.append(chunk)
+            progress(csv_file.tell() / file_size, lambda: compact_df(csv_clock(pd.concat(chunks, ignore_index=True))))
+    return compact_df(csv_clock(pd.concat(chunks, ignore_index=True) if chunks else pd.read_csv(csv_file_path, dtype=CSV_DTYPES)))
+
+
+##~##~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ DATA CLASS ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+class Data():
+    @timed('Data')
+    def __init__(self, df):
+        super().__init__()
+        self.df = compact_df(df) # float32 measures, categorical names (see COMPACT_DTYPES)
+        self.filter_cache = {} # (axis name, FilterSettings) -> smoothed series, see filtered
+        if not (self.df.empty):
+            self.file_name = self.df['file_name']
+            self.dir_name = self.df['dir_name']
+            self.t = self.df['time'] # full date time
+            self.th = self.df['time_in_hours']
+            self.ts = self.df['time_in_seconds']
+            self.lat = self.df['latitude']
+            self.lon = self.df['longitude']
+            self.alt = self.df['altitude']
+            self.hr = self.df['heart_rate']
+            self.dist = self.df['distance']
+            # time in seconds that starts at 0 second. The readers decode the timestamps once : time_in_seconds keeps increasing
+            # after midnight (see decode_timestamps and csv_clock), it is only shifted here.
+            ts = self.ts.to_numpy(dtype=np.float64)
+            self.dt = pd.Series(ts - np.nanmin(ts), index=self.df.index)
+            self.dt_values = self.dt.to_numpy()
+
+            # Time index sorted once, the sample closest to a time is then found by binary search (see nearest_position)
+            # Recorded sessions are almost always already sorted : the time column is then used as it is.
+            if not np.isnan(self.dt_values).any() and np.all(self.dt_values[1:] >= self.dt_values[:-1]):
+                self.dt_order = None
+                self.dt_sorted = self.dt_values
+            else:
+                valid = np.flatnonzero(~np.isnan(self.dt_values))
+                self.dt_order = valid[np.argsort(self.dt_values[valid], kind='stable')].astype(np.int32) # row positions sorted by time
+                self.dt_sorted = self.dt_values[self.dt_order]
+            self.start_loc = [self.lat.iloc[0], self.lon.iloc[0]]
+            self.end_loc = [self.lat.iloc[-1], self.lon.iloc[-1]]
+            self.marker_coord = self.start_loc
+            self.route_levels = None # simplified routes for each zoom level, computed when the map needs them
+
+            # Calculate the center of the map (according to the route)
+            self.lon_min, self.lon_max = self.lon.min(), self.lon.max()
+            self.lat_min, self.lat_max = self.lat.min(), self.lat.max()
+            self.map_center = [((self.lat_min+self.lat_max)/2), ((self.lon_min+self.lon_max)/2)]
+
+    # All data latitude and longitude in a (n, 2) array, built the first time it is used
+    @cached_property
+    def points(self):
+        return np.column_stack([self.lat.to_numpy(), self.lon.to_numpy()])
+
+    # Statistics of the whole session (see compute_global_stats), computed the first time they are needed
+    # The speed of the whole session is its average speed : a constant, so its standard deviation is 0 (unless the file has a speed column).
+    @cached_property
+    def global_stats(self):
+        global_stats = compute_global_stats(self.df)
+        if 'speed' not in self.df:
+            global_stats['global_std_speed'] = 0.0
+        return global_stats
+
+    # Prefix sums of the columns whose mean and standard deviation are computed for every saved segment
+    @cached_property
+    def prefix_stats(self):
+        return {column: PrefixStats(self.df[column]) for column in ['heart_rate', 'altitude']}
+
+    # Statistics (one row dataframe, like compute_stats) of the segment of rows first to last (positions, included)
+    # Means and standard deviations come from the prefix sums, the statistics of the whole session are only computed once.
+    def segment_stats(self, first, last, label):
+        avg_hr, std_hr = self.prefix_stats['heart_rate'].mean_std(first, last)
+        avg_alt, std_alt = self.prefix_stats['altitude'].mean_std(first, last)
+        dist = self.dist.to_numpy()[first:last + 1]
+        ts = self.ts.to_numpy()[first:last + 1]
+        total_dist = np.nanmax(dist) - np.nanmin(dist)
+        total_time = np.nanmax(ts) - np.nanmin(ts)
+        avg_speed = total_dist / total_time # meters/seconds
+        std_speed = 0.0 if last > first else np.nan # every row of a saved segment gets the average speed of the segment
+        distance = np.nanmax(dist) # not the last value, see compute_stats
+        return stats_to_df(self.dir_name.iloc[0], self.file_name.iloc[0], label,
+                           [avg_hr, std_hr, avg_alt, std_alt, avg_speed, std_speed, format_duration(total_time), distance], self.global_stats)
+
+    # Derived metrics of the session (gps distance, speed, pace, grade, heart rate zones, see noznum.metrics), as series
+    # aligned with the dataframe. They are computed in time order, all at once, the first time one of them is used.
+    @cached_property
+    @timed('Data.metrics')
+    def metrics(self):
+        columns = [self.dt_values, self.lat.to_numpy(), self.lon.to_numpy(), self.alt.to_numpy(), self.hr.to_numpy()]
+        if self.dt_order is None:
+            values = derived_metrics(*columns)
+        else:
+            values = {}
+            for name, sorted_values in derived_metrics(*(column[self.dt_order] for column in columns)).items():
+                values[name] = np.full(len(self.df), np.nan, dtype=sorted_values.dtype) # samples without time have no metrics
+                values[name][self.dt_order] = sorted_values
+        return {name: pd.Series(values[name], index=self.df.index, name=name) for name in METRICS_LABELS}
+
+    # Series of an axis (see AxesNames) smoothed with a FilterSettings (see noznum.filters.smooth), aligned with the dataframe
+    # Results are kept per axis and parameter set : switching back to filters already used doesn't compute them again.
+    # The least recently used results are dropped beyond FILTER_CACHE_SIZE.
+    @timed('Data.filtered')
+    def filtered(self, ax, settings):
+        key = (ax, settings)
+        series = self.filter_cache.pop(key, None)
+        if series is None:
+            raw = AxesNames(self, ax)
+            values = raw.to_numpy(dtype=np.float64, na_value=np.nan)
+            if self.dt_order is None:
+                smoothed = smooth(self.dt_values, values, settings)
+            else:
+                smoothed = np.full(values.size, np.nan) # samples without time are not smoothed
+                smoothed[self.dt_order] = smooth(self.dt_sorted, values[self.dt_order], settings)
+            series = pd.Series(smoothed.astype(np.float32), index=self.df.index, name=raw.name)
+        self.filter_cache[key] = series # most recently used last
+        while len(self.filter_cache) > FILTER_CACHE_SIZE:
+            self.filter_cache.pop(next(iter(self.filter_cache)))
+        return series
+
+    # Approximate memory used by the session in bytes (dataframe and arrays derived from it)
+    def memory_usage(self):
+        n_bytes = int(self.df.memory_usage(deep=True).sum())
+        if not (self.df.empty):
+            arrays = [self.dt_values, self.dt_sorted, self.dt_order, self.__dict__.get('points')] + list((self.route_levels or {}).values())
+            arrays += list(self.__dict__.get('prefix_stats', {}).values())
+            arrays += [series.to_numpy() for series in self.__dict__.get('metrics', {}).values()]
+            arrays += [series.to_numpy() for series in self.filter_cache.values()]
+            arrays = {id(array): array for array in arrays if array is not None} # shared arrays are counted once
+            n_bytes += sum(array.nbytes for array in arrays.values())
+        return n_bytes
+
+    # First and last row positions of the samples between the times t_min and t_max (in seconds from the start), None if there is none
+    def positions_between(self, t_min, t_max):
+        first = np.searchsorted(self.dt_sorted, t_min, side='left')
+        last = np.searchsorted(self.dt_sorted, t_max, side='right') - 1
+        if last < first:
+            return None
+        if self.dt_order is None:
+            return int(first), int(last)
+        positions = self.dt_order[first:last + 1] # samples not recorded in time order : the range covers all of them
+        return int(positions.min()), int(positions.max())
+
+    # Row position of the sample closest to a time t (in seconds from the start), in O(log n)
+    def nearest_position(self, t):
+        if not self.dt_sorted.size:
+            return None
+        i = np.searchsorted(self.dt_sorted, t)
+        if i == self.dt_sorted.size or (i > 0 and t - self.dt_sorted[i - 1] <= self.dt_sorted[i] - t):
+            i -= 1
+        return int(i if self.dt_order is None else self.dt_order[i])
+
+    # Indices of the route points to draw at a given zoom level of the map
+    def route_indices(self, zoom_level):
+        if self.route_levels is None:
+            self.route_levels = route_pyramid(self.lat.to_numpy(), self.lon.to_numpy())
+        zoom_level = min(max(zoom_level, min(self.route_levels)), max(self.route_levels))
+        return self.route_levels[zoom_level]
+
+    # Route points ([lat, lon] lists) to draw at a given zoom level of the map
+    def route_points(self, zoom_level):
+        indices = self.route_indices(zoom_level)
+        return np.column_stack([self.lat.to_numpy()[indices], self.lon.to_numpy()[indices]]).tolist()
+
+
+# A labelled part of a session : its rows first to last (positions, included)
+# Only the range is kept, the data are read from the session when they are needed (see arrays and export_segments).
+class Segment():
+    def __init__(self, label, first, last):
+        self.label = label
+        self.first, self.last = min(first, last), max(first, last)
+
+    def __len__(self):
+        return self.last - self.first + 1
+
+    # Numeric columns of the session on the rows of the segment, as numpy views (no copy)
+    def arrays(self, data, columns=('time_in_seconds', 'latitude', 'longitude', 'altitude', 'distance', 'heart_rate')):
+        return {column: data.df[column].to_numpy()[self.first:self.last + 1] for column in columns}
+
+
+# Save the segments of a session : one csv file per segment in output_dir (<label>.csv, with the columns of the session plus
+# the average speed of the segment and its label) then the statistics of all the segments, in one batch (see save_stats).
+# Segments with the same label are saved in <label>_2.csv, <label>_3.csv... Returns the paths of the segment files.
+def export_segments(data, segments, output_dir, stats_file_path):
+    file_paths, stats = [], []
+    dist = data.dist.to_numpy()
+    for segment in segments:
+        speed = abs(dist[segment.last] - dist[segment.first]) / abs(data.dt_values[segment.last] - data.dt_values[segment.first])
+        file_name = unique_file_name(segment.label, '.csv', file_paths)
+        file_path = os.path.join(output_dir, file_name)
+        segment_df = data.df.iloc[segment.first:segment.last + 1].assign(speed=speed, label=segment.label, file_name=file_name)
+        segment_df.to_csv(file_path)
+        file_paths.append(file_path)
+        stats.append(data.segment_stats(segment.first, segment.last, segment.label))
+    if stats:
+        save_stats(stats_file_path, pd.concat(stats, ignore_index=True))
+    return file_paths
+
+# <name><extension>, or <name>_2<extension>, <name>_3<extension>... if a path of used_paths already has this file name
+def unique_file_name(name, extension, used_paths):
+    used = {os.path.basename(path) for path in used_paths}
+    file_name, number = name + extension, 1
+    while file_name in used:
+        number += 1
+        file_name = f'{name}_{number}{extension}'
+    return file_name
+
+
+# Return the data series associated to an axis name (recorded columns, or derived metrics : see METRICS_LABELS)
+def AxesNames(data, ax):
+    if not (data.df.empty):
+        if ax in METRICS_LABELS:
+            return data.metrics[ax]
+        axes_dict = {
+            'lat' : data.lat,
+            'lon' : data.lon,
+            'hr' : data.hr,
+            'alt' : data.alt,
+            'dt' : data.dt,
+            't' : data.t,
+            'ts' : data.ts,
+            'th' : data.th
+        }
+        return axes_dict.get(ax, "No info available")
+    else:
+        return 0
@@ -0,0 +1,52 @@
+'''
+Project : Noz'Num
+Description : M4 (min/max) decimation of the plotted series, so long recordings are drawn with a few points per pixel column
+'''
+import numpy as np
+
+
+# Below this number of points per pixel column, a series is drawn without decimation
+M4_POINTS_PER_PIXEL = 4
+
+
+# M4 decimation of a series y(x), for the x range visible on a plot
+# For every pixel column, only the first, last, lowest and highest points are kept : the drawn line is then identical
+# (at the pixel level) to the full series. indices() returns the row positions of the kept points in the original arrays,
+# so picked points can be mapped back to the data.
+class M4Decimator():
+    def __init__(self, x, y):
+        x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        self.index = np.flatnonzero(~(np.isnan(x) | np.isnan(y))) # missing values are not drawn
+        x, y = x[self.index], y[self.index]
+        if np.any(np.diff(x) < 0): # the decimation needs x sorted, it normally already is (time)
+            order = np.argsort(x, kind='stable')
+            self.index, x, y = self.index[order], x[order], y[order]
+        self.x = x
+        self.y = y
+
+    # Row positions of the points to draw for the x range [x_min, x_max] on a plot n_pixels wide
+    def indices(self, x_min, x_max, n_pixels):
+        # visible points, plus one on each side so the line goes to the edges of the plot
+        first = max(np.searchsorted(self.x, x_min, side='left') - 1, 0)
+        last = min(np.searchsorted(self.x, x_max, side='right') + 1, self.x.size)
+        n_pixels = max(int(n_pixels), 1)
+        if last - first <= M4_POINTS_PER_PIXEL * n_pixels or x_max <= x_min:
+            return self.index[first:last]
+
+        x, y = self.x[first:last], self.y[first:last]
+        position = np.arange(first, last)
+        column = np.clip(((x - x_min) / (x_max - x_min) * n_pixels).astype(np.int64), -1, n_pixels) # -1 and n_pixels : points outside of the plot
+        starts = np.flatnonzero(np.r_[True, column[1:] != column[:-1]])
+        ends = np.r_[starts[1:], column.size] - 1
+        sizes = ends - starts + 1
+
+        # first point of each column reaching the column's minimum (resp. maximum)
+        column_id = np.repeat(np.arange(starts.size), sizes)
+        y_min = np.minimum.reduceat(y, starts)
+        y_max = np.maximum.reduceat(y, starts)
+        not_found = position.size
+        arg_min = np.minimum.reduceat(np.where(y == y_min[column_id], np.arange(position.size), not_found), starts)
+        arg_max = np.minimum.reduceat(np.where(y == y_max[column_id], np.arange(position.size), not_found), starts)
+
+        kept = np.unique(np.concatenate([starts, ends, arg_min, arg_max]))
+        return self.index[position[kept]]
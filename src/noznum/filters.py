@@ -0,0 +1,117 @@
+'''
+Project : Noz'Num
+Description : Smoothing of the noisy series (heart rate, altitude, speed...) : resampling to a uniform time grid, gap filling
+and rolling median, exponential moving average or Savitzky-Golay filters
+'''
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+
+# Available filters
+FILTER_METHODS = {
+    'none' : 'No filter',
+    'median' : 'Rolling median',
+    'ema' : 'Exponential moving average',
+    'savgol' : 'Savitzky-Golay',
+}
+
+# Parameters of the smoothing of a series (hashable, used as a cache key, see Data.filtered)
+#   method : one of FILTER_METHODS
+#   window_s : width of the filter window, in seconds (span of the exponential moving average)
+#   resample_s : step of the uniform time grid the filter is applied on (None : the samples are filtered as they are)
+#   max_gap_s : gaps in the recording up to this duration are filled by linear interpolation, longer ones are left empty
+#   polyorder : degree of the Savitzky-Golay polynomials
+FilterSettings = namedtuple('FilterSettings', ['method', 'window_s', 'resample_s', 'max_gap_s', 'polyorder'],
+                            defaults=['none', 15.0, 1.0, 10.0, 2])
+
+# Number of smoothed series kept by a session (see Data.filtered)
+FILTER_CACHE_SIZE = 16
+
+
+# Window width in samples for a duration, on a grid of step `step` seconds (at least 1, odd so it is centered)
+def window_samples(window_s, step):
+    n = max(int(round(window_s / step)), 1)
+    return n if n % 2 else n + 1
+
+# Values of y(t) on a uniform grid of step `step`. Grid points in a gap longer than max_gap_s are NaN, the others are
+# interpolated linearly between the two samples around them. t must be sorted.
+def resample(t, y, step, max_gap_s):
+    valid = ~(np.isnan(t) | np.isnan(y))
+    t, y = t[valid], y[valid]
+    if t.size < 2: # no sample, or a single one : the grid is the sample itself
+        return t, y
+    grid = t[0] + np.arange(int(np.floor((t[-1] - t[0]) / step)) + 1) * step
+    values = np.interp(grid, t, y)
+    after = np.clip(np.searchsorted(t, grid, side='left'), 1, max(t.size - 1, 1))
+    in_gap = t[after] - t[after - 1] > max_gap_s
+    values[in_gap & (grid != t[after]) & (grid != t[after - 1])] = np.nan
+    return grid, values
+
+# Fill the runs of at most max_gap NaN values (surrounded by values) by linear interpolation, longer runs stay NaN
+def fill_gaps(y, max_gap):
+    y = np.asarray(y, dtype=np.float64)
+    filled = pd.Series(y).interpolate(method='linear', limit_area='inside').to_numpy(copy=True)
+    missing = np.isnan(y)
+    edges = np.diff(np.concatenate([[0], missing.astype(np.int8), [0]]))
+    lengths = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1) # length of every run of NaN, in order
+    filled[np.flatnonzero(missing)[np.repeat(lengths > max_gap, lengths)]] = np.nan
+    return filled
+
+def rolling_median(y, window):
+    return pd.Series(y).rolling(window, center=True, min_periods=1).median().to_numpy()
+
+def exponential_moving_average(y, span):
+    return pd.Series(y).ewm(span=span, ignore_na=True).mean().to_numpy()
+
+# Savitzky-Golay filter : least squares fit of a polynomial on a sliding window, as a convolution (O(n) per window sample)
+# NaN values are interpolated for the fit then put back, the ends of the series are padded with their first/last value.
+def savitzky_golay(y, window, polyorder):
+    polyorder = min(polyorder, window - 1)
+    half = window // 2
+    offsets = np.arange(-half, half + 1)
+    coefficients = np.linalg.pinv(np.vander(offsets, polyorder + 1, increasing=True))[0] # value of the fit at the window center
+    missing = np.isnan(y)
+    if missing.all():
+        return y.copy()
+    filled = np.interp(np.arange(y.size), np.flatnonzero(~missing), y[~missing]) if missing.any() else y
+    smoothed = np.convolve(np.pad(filled, half, mode='edge'), coefficients[::-1], mode='valid')
+    smoothed[missing] = np.nan
+    return smoothed
+
+# Apply a filter on a series sampled with a regular step (seconds)
+def apply_filter(y, step, settings):
+    window = window_samples(settings.window_s, step)
+    if settings.method == 'median':
+        return rolling_median(y, window)
+    if settings.method == 'ema':
+        return exponential_moving_average(y, window)
+    if settings.method == 'savgol':
+        return savitzky_golay(y, window, settings.polyorder)
+    return y
+
+# Smooth y(t) with the given settings. The result is aligned with t (one value per sample) : when the series is resampled,
+# the filtered grid is interpolated back at the sample times, so the plots, cursors and segments keep working on rows.
+# t must be sorted (see Data.filtered).
+def smooth(t, y, settings):
+    t, y = np.asarray(t, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    if settings.method == 'none' and settings.resample_s is None:
+        return y
+    if settings.resample_s is None:
+        steps = np.diff(t[~np.isnan(t)])
+        step = np.median(steps) if steps.size else 1.0
+        y = fill_gaps(y, max(int(settings.max_gap_s / step), 0))
+        return apply_filter(y, step, settings)
+
+    grid, values = resample(t, y, settings.resample_s, settings.max_gap_s)
+    if not grid.size:
+        return np.full(t.size, np.nan)
+    filtered = apply_filter(values, settings.resample_s, settings)
+    if grid.size == 1: # a single valid sample : only the samples at its time get a value
+        return np.where(t == grid[0], filtered[0], np.nan)
+    result = np.interp(t, grid, filtered)
+    # samples whose grid neighbours are missing (long gap), or that are outside the grid, stay missing
+    after = np.clip(np.searchsorted(grid, t, side='left'), 1, max(grid.size - 1, 1))
+    missing = np.isnan(filtered[after]) | np.isnan(filtered[after - 1]) | np.isnan(t) | (t < grid[0]) | (t > grid[-1])
+    result[missing & ~np.isin(t, grid)] = np.nan
+    return result
@@ -0,0 +1,205 @@
+'''
+Project : Noz'Num
+Description : Spatial index of the trackpoints of many sessions, and extraction of the segments between two gates or inside
+a polygon (geofences) in all of them at once
+
+The points of all the sessions are projected on a local plane (meters) and sorted by the cell of a regular grid they fall
+in : the points of a rectangle of cells are then found with one binary search per column of cells, and the exact tests
+(distance to a gate, point in polygon) are only made on them, with numpy.
+
+    index = SpatialIndex()
+    for key, data in sessions.items():
+        index.add(key, data.lat, data.lon)
+    gate_segments(index, Gate(48.3904, -4.4861), Gate(48.3950, -4.4790)) # {key: [(first, last), ...]}
+'''
+import os
+import json
+from collections import namedtuple
+import numpy as np
+from noznum.metrics import EARTH_RADIUS
+
+
+# Size of the cells of the grid of the spatial index, in meters
+GEOFENCE_CELL_M = float(os.environ.get('NOZNUM_GEOFENCE_CELL_M', 50))
+
+# Default radius of a gate, in meters (a few GPS errors)
+GATE_RADIUS_M = 25.0
+
+# Points of a session inside a geofence are part of the same passage if their positions are at most this far apart
+# (samples without coordinates, or a single point out of the geofence because of the GPS noise)
+MAX_GAP_POINTS = 10
+
+# A circle that a session passes through : the start or the end of a segment
+Gate = namedtuple('Gate', ['lat', 'lon', 'radius'], defaults=[GATE_RADIUS_M])
+
+
+# Points of all the sessions (latitude and longitude), sorted by grid cell
+# Sessions are added with a key (a file path, a session id...) and the results are given with these keys and the row
+# positions in each session. The grid is built at the first query after the sessions are added.
+class SpatialIndex():
+    def __init__(self, cell_size=GEOFENCE_CELL_M):
+        self.cell_size = cell_size
+        self.keys = [] # keys of the sessions, in the order they were added
+        self.coordinates = [] # (lat, lon) arrays of each session, until the grid is built
+        self.offsets = np.zeros(1, dtype=np.int64) # first global id of each session, then the total number of points
+        self.grid = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    # Add the points of a session. Points without coordinates are never found.
+    def add(self, key, lat, lon):
+        lat, lon = np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+        self.keys.append(key)
+        self.coordinates.append((lat, lon))
+        self.offsets = np.append(self.offsets, self.offsets[-1] + lat.size)
+        self.grid = None
+
+    # Projection of degrees on the plane of the index (meters, equirectangular around the mean latitude of the points)
+    def project(self, lat, lon):
+        lat, lon = np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+        return np.radians(lon) * self.x_scale, np.radians(lat) * EARTH_RADIUS
+
+    def build(self):
+        lat = np.concatenate([part[0] for part in self.coordinates]) if self.coordinates else np.zeros(0)
+        lon = np.concatenate([part[1] for part in self.coordinates]) if self.coordinates else np.zeros(0)
+        ids = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+        self.x_scale = EARTH_RADIUS * np.cos(np.radians(lat[ids].mean())) if ids.size else EARTH_RADIUS
+        x, y = self.project(lat[ids], lon[ids])
+        cells_x, cells_y = self.cells(x, y, origin=True)
+        order = np.lexsort((cells_y, cells_x))
+        self.grid = {
+            'ids' : ids[order], # global ids (offsets[session] + position) of the points, sorted by cell
+            'x' : x[order], 'y' : y[order],
+            'cells' : cells_x[order] * self.n_cells_y + cells_y[order],
+        }
+
+    # Cells of the grid of projected points. With origin=True, the origin and the size of the grid are set from them.
+    def cells(self, x, y, origin=False):
+        cells_x, cells_y = np.floor(x / self.cell_size).astype(np.int64), np.floor(y / self.cell_size).astype(np.int64)
+        if origin:
+            self.origin_x = cells_x.min() if cells_x.size else 0
+            self.origin_y = cells_y.min() if cells_y.size else 0
+            self.n_cells_y = int(cells_y.max() - self.origin_y + 1) if cells_y.size else 1
+        return cells_x - self.origin_x, cells_y - self.origin_y
+
+    # Positions (in the sorted grid) of the points in the cells covering a rectangle of the plane
+    def candidates(self, x_min, x_max, y_min, y_max):
+        if self.grid is None:
+            self.build()
+        (column_min, column_max), (row_min, row_max) = self.cells(np.array([x_min, x_max]), np.array([y_min, y_max]))
+        row_min, row_max = max(row_min, 0), min(row_max, self.n_cells_y - 1)
+        columns = np.arange(max(column_min, 0), column_max + 1)
+        if row_min > row_max or not columns.size:
+            return np.zeros(0, dtype=np.int64)
+        # the cells of a column of the rectangle are contiguous in the sorted grid : one slice per column
+        starts = np.searchsorted(self.grid['cells'], columns * self.n_cells_y + row_min, side='left')
+        ends = np.searchsorted(self.grid['cells'], columns * self.n_cells_y + row_max, side='right')
+        lengths = ends - starts
+        return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+    # Global ids of the points within a gate, sorted, and their distances to its center (meters)
+    def within_gate(self, gate):
+        if self.grid is None:
+            self.build()
+        x, y = self.project(gate.lat, gate.lon)
+        found = self.candidates(x - gate.radius, x + gate.radius, y - gate.radius, y + gate.radius)
+        distance = np.hypot(self.grid['x'][found] - x, self.grid['y'][found] - y)
+        inside = distance <= gate.radius
+        ids, distance = self.grid['ids'][found[inside]], distance[inside]
+        order = np.argsort(ids)
+        return ids[order], distance[order]
+
+    # Global ids of the points inside a polygon ([(lat, lon), ...]), sorted
+    def within_polygon(self, polygon):
+        if self.grid is None:
+            self.build()
+        polygon = np.asarray(polygon, dtype=np.float64)
+        px, py = self.project(polygon[:, 0], polygon[:, 1])
+        found = self.candidates(px.min(), px.max(), py.min(), py.max())
+        x, y = self.grid['x'][found], self.grid['y'][found]
+        # even-odd rule : count the edges crossed by a horizontal ray from every point
+        inside = np.zeros(found.size, dtype=bool)
+        for x_1, y_1, x_2, y_2 in zip(px, py, np.roll(px, -1), np.roll(py, -1)):
+            crosses = (y_1 > y) != (y_2 > y)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                inside ^= crosses & (x < x_1 + (y - y_1) * (x_2 - x_1) / (y_2 - y_1))
+        return np.sort(self.grid['ids'][found[inside]])
+
+    # Session number and row position of global ids
+    def locate(self, ids):
+        sessions = np.searchsorted(self.offsets, ids, side='right') - 1
+        return sessions, ids - self.offsets[sessions]
+
+
+# Passages through a geofence : runs of sorted global ids of the same session at most max_gap positions apart
+# Return the index (in ids) of the first and last point of every run.
+def passages(index, ids, max_gap=MAX_GAP_POINTS):
+    if not ids.size:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    sessions, _ = index.locate(ids)
+    breaks = np.flatnonzero((np.diff(ids) > max_gap) | (np.diff(sessions) != 0)) + 1
+    firsts = np.concatenate([[0], breaks])
+    lasts = np.concatenate([breaks - 1, [ids.size - 1]])
+    return firsts, lasts
+
+# Group (session number, first, last) ranges by session key : {key: [(first, last), ...]}
+def by_session(index, sessions, firsts, lasts):
+    segments = {}
+    for session, first, last in zip(sessions.tolist(), firsts.tolist(), lasts.tolist()):
+        segments.setdefault(index.keys[session], []).append((first, last))
+    return segments
+
+
+# Segments of every session from a passage through the start gate to the next passage through the end gate
+# A segment starts at the point of the start passage closest to the gate center and ends at the point of the end passage
+# closest to its center. When the session passes several times through the start gate before reaching the end gate, the
+# last passage is used. The same gate can be used as start and end : the segments are then the laps of a loop.
+def gate_segments(index, start_gate, end_gate, max_gap=MAX_GAP_POINTS):
+    ends = []
+    for gate in (start_gate, end_gate):
+        ids, distance = index.within_gate(gate)
+        firsts, lasts = passages(index, ids, max_gap)
+        if not firsts.size:
+            return {}
+        # closest point of every passage : the first one reaching the minimum distance of its passage
+        run = np.repeat(np.arange(firsts.size), lasts - firsts + 1)
+        closest = distance == np.minimum.reduceat(distance, firsts)[run]
+        best = ids[closest][np.unique(run[closest], return_index=True)[1]]
+        ends.append((ids[firsts], ids[lasts], best))
+    (start_first, start_last, start_best), (end_first, end_last, end_best) = ends
+
+    # last start passage finishing before every end passage, in the same session ; each start passage is used once
+    starts = np.searchsorted(start_last, end_first, side='left') - 1
+    valid = starts >= 0
+    valid[valid] = index.locate(start_best[starts[valid]])[0] == index.locate(end_best[valid])[0]
+    starts, end_best = starts[valid], end_best[valid]
+    starts, first_end = np.unique(starts, return_index=True)
+    sessions, firsts = index.locate(start_best[starts])
+    _, lasts = index.locate(end_best[first_end])
+    return by_session(index, sessions, firsts, lasts)
+
+# Segments of every session inside a polygon ([(lat, lon), ...]) : every passage spanning at least min_points rows
+def polygon_segments(index, polygon, min_points=2, max_gap=MAX_GAP_POINTS):
+    ids = index.within_polygon(polygon)
+    firsts, lasts = passages(index, ids, max_gap)
+    keep = ids[lasts] - ids[firsts] + 1 >= min_points
+    sessions, firsts = index.locate(ids[firsts[keep]])
+    _, lasts = index.locate(ids[lasts[keep]])
+    return by_session(index, sessions, firsts, lasts)
+
+
+# Polygon of a GeoJSON file (first Polygon, or Feature / FeatureCollection of a Polygon), or of a "lat,lon;lat,lon;..." text
+def load_polygon(value):
+    if not os.path.isfile(value):
+        return [tuple(float(number) for number in point.split(',')) for point in value.split(';') if point.strip()]
+    with open(value) as f:
+        geometry = json.load(f)
+    while geometry.get('type') != 'Polygon':
+        if geometry.get('type') == 'FeatureCollection':
+            geometry = geometry['features'][0]
+        elif geometry.get('type') == 'Feature':
+            geometry = geometry['geometry']
+        else:
+            raise ValueError(f'{value} : no Polygon in the GeoJSON file')
+    return [(lat, lon) for lon, lat, *_ in geometry['coordinates'][0]] # GeoJSON positions are (lon, lat)
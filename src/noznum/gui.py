@@ -0,0 +1,1492 @@
+'''
+Project : Noz'Num
+Description : Graphical interface (Qt window, map widget and plots)
+'''
+import sys
+import os
+import sqlite3
+from PyQt5.QtWidgets import *
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEnginePage, QWebEngineProfile
+from PyQt5.QtWebEngineCore import QWebEngineUrlScheme, QWebEngineUrlSchemeHandler, QWebEngineUrlRequestJob
+import pandas as pd
+import matplotlib
+import matplotlib.pyplot as plt
+matplotlib.use('Qt5Agg')
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+from matplotlib.figure import Figure
+from matplotlib.widgets import SpanSelector
+import numpy as np
+import mplcursors
+import platform
+from noznum.core import AxesNames, Segment, tcx_to_df, csv_to_df, export_segments, format_duration
+from noznum.readers import reader_for, file_dialog_filter
+from noznum.cache import SessionCache
+from noznum.workspace import Workspace
+from noznum.decimation import M4Decimator
+from noznum.metrics import METRICS_LABELS
+from noznum.filters import FilterSettings, FILTER_METHODS
+from noznum.profiling import TIMINGS, Profiler, timer, timed, PROFILE_PATH
+from noznum.geofence import Gate, gate_segments
+from noznum.playback import PlaybackFrames, PLAYBACK_FPS, PLAYBACK_SPEEDS
+from noznum.tiles import TileStore, TileProvider, seed, localize_assets, TILE_SCHEME, LOCAL_TILE_URL, SEED_ZOOM_RANGE
+from noznum.maps import GenerateMap, move_marker_script, set_zoom_script, set_route_script, highlight_segment_script, zoom_from_message
+
+
+# Minimum time between two updates of the hover annotations (about 60 updates per second)
+HOVER_INTERVAL_MS = 16
+
+# Series that can be drawn on the plots (against time) and their labels : recorded data and derived metrics
+PLOT_AXES = {'hr' : 'Heart Rate (bpm)', 'alt' : 'Altitude (meters)', **METRICS_LABELS}
+
+# Refresh period of the Timings panel
+TIMINGS_REFRESH_MS = 1000
+
+# Smoothing filter windows offered in the Filters menu (seconds), and the series that are never smoothed (discrete values)
+FILTER_WINDOWS_S = [5, 15, 30, 60]
+UNFILTERED_AXES = ['hr_zone']
+
+# Colors of the other sessions drawn over the active one (map and plots)
+OVERLAY_COLORS = ['tab:green', 'tab:orange', 'tab:purple', 'tab:brown', 'tab:pink', 'tab:olive', 'tab:cyan']
+
+
+# Return the operating system path separator
+def get_os_separator():
+    if platform.system() == 'Windows':
+        # use "\\" as path separator on Windows
+        os_separator = '\\'
+        return os_separator
+    elif platform.system() == 'Darwin':
+        # use "/" as path separator on macOS
+        os_separator = '/'
+        return os_separator
+    elif platform.system() == 'Linux':
+        # use "/" as path separator on Linux
+        os_separator = '/'
+        return os_separator
+    else:
+        # unrecognized platform
+        raise OSError('Unrecognized operating system')
+
+
+##~##~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ MAP CLASS ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# Page of the map : the zoom levels reported by the page (see MapBridge) are turned into a signal, the other console
+# messages are handled as usual
+class MapPage(QWebEnginePage):
+    zoom_reported = pyqtSignal(int)
+
+    def javaScriptConsoleMessage(self, level, message, line_number, source_id):
+        zoom_level = zoom_from_message(message)
+        if zoom_level is None:
+            super().javaScriptConsoleMessage(level, message, line_number, source_id)
+        else:
+            self.zoom_reported.emit(zoom_level)
+
+# The map page is rendered once per session. Then the marker, the zoom and the highlighted segment are updated through
+# the javascript interface of the page (see MapBridge), so an interaction costs the same whatever the length of the route.
+# With local_tiles, the tiles and the javascript/css files of the page are requested to the application (noznum:// urls,
+# see TileSchemeHandler) : they come from the tile cache and the map also works offline.
+class MapWidget(QWebEngineView):
+    zoom_changed = pyqtSignal(int) # zoom level chosen on the map itself (mouse wheel, +/- buttons...)
+
+    def __init__(self, data=None, zoom_level=13, overlays=(), local_tiles=False):
+        super().__init__()
+        self.map_page = MapPage(self)
+        self.map_page.zoom_reported.connect(self.on_zoom_reported)
+        self.setPage(self.map_page)
+        self.data = data # Data class
+        self.overlays = overlays # (label, data, color) of the other sessions drawn on the map
+        self.local_tiles = local_tiles
+        self.page_loaded = False
+        self.pending_scripts = {} # scripts waiting for the page to be loaded, only the last one of each kind is kept
+        self.marker_busy = False # a marker move of an animation is being run by the page
+        self.next_marker = None # last marker position received meanwhile
+        self.loadFinished.connect(self.on_load_finished)
+        if not (self.data.df.empty):
+            self.load_map(self.data, zoom_level)
+
+    # Render the whole map page (only when a new session is displayed)
+    def load_map(self, data, zoom_level):
+        self.data = data
+        self.page_loaded = False
+        self.route_zoom_level = zoom_level # zoom level of the route drawn on the page
+        map = GenerateMap(self.data, zoom_level=zoom_level, overlays=self.overlays, tile_url=LOCAL_TILE_URL if self.local_tiles else None)
+        with timer('map.render'):
+            map_html = map.get_root().render()
+        with timer('map.setHtml', n_bytes=len(map_html)):
+            if self.local_tiles:
+                self.setHtml(localize_assets(map_html), QUrl(TILE_SCHEME + '://page/')) # same origin as the tiles
+            else:
+                self.setHtml(map_html)
+
+    def update_map(self, new_data, zoom_level):
+        if not (new_data.df.empty):
+            if new_data is not self.data:
+                self.load_map(new_data, zoom_level)
+            else:
+                self.set_zoom(zoom_level)
+                self.move_marker(*self.data.marker_coord)
+
+    def move_marker(self, lat, lon):
+        self.run_script('marker', move_marker_script(lat, lon))
+
+    # Move the marker for an animation (see Playback) : a new move is only sent once the page has run the previous one, the
+    # positions received meanwhile are dropped except the last one. A slow page skips frames instead of lagging behind.
+    def animate_marker(self, lat, lon):
+        if not self.page_loaded:
+            self.move_marker(lat, lon)
+        elif self.marker_busy:
+            self.next_marker = (lat, lon)
+        else:
+            self.marker_busy = True
+            self.page().runJavaScript(move_marker_script(lat, lon), self.on_marker_moved)
+
+    def on_marker_moved(self, result):
+        self.marker_busy = False
+        if self.next_marker is not None:
+            next_marker, self.next_marker = self.next_marker, None
+            self.animate_marker(*next_marker)
+
+    # Zoom the map and draw the route simplified for that zoom level (only sent when the simplified route changes)
+    def set_zoom(self, zoom_level):
+        self.run_script('zoom', set_zoom_script(zoom_level))
+        if self.data.route_indices(zoom_level) is not self.data.route_indices(self.route_zoom_level):
+            self.run_script('route', set_route_script(self.data.route_points(zoom_level)))
+            self.route_zoom_level = zoom_level
+
+    # The map was zoomed by the page : only the route is drawn again, for the new zoom level
+    def on_zoom_reported(self, zoom_level):
+        if self.data is None or self.data.df.empty or not self.page_loaded:
+            return
+        if self.data.route_indices(zoom_level) is not self.data.route_indices(self.route_zoom_level):
+            self.run_script('route', set_route_script(self.data.route_points(zoom_level)))
+        self.route_zoom_level = zoom_level
+        self.zoom_changed.emit(zoom_level)
+
+    # Highlight the route between two rows of the data (in any order), an empty range removes the highlight
+    def highlight_segment(self, id_1=None, id_2=None):
+        points = []
+        if id_1 is not None and id_2 is not None:
+            first, last = min(id_1, id_2), max(id_1, id_2)
+            segment = np.column_stack([self.data.lat.loc[first:last].to_numpy(), self.data.lon.loc[first:last].to_numpy()])
+            points = np.round(segment[~np.isnan(segment).any(axis=1)], 6).tolist()
+        self.run_script('highlight', highlight_segment_script(points))
+
+    def run_script(self, kind, script):
+        if self.page_loaded:
+            self.page().runJavaScript(script)
+        else:
+            self.pending_scripts[kind] = script
+
+    def on_load_finished(self, ok):
+        self.page_loaded = ok
+        self.marker_busy = False
+        if ok:
+            for script in self.pending_scripts.values():
+                self.page().runJavaScript(script)
+            self.pending_scripts = {}
+
+
+# The noznum:// url scheme must be known before the QApplication is created (see main)
+def register_tile_scheme():
+    scheme = QWebEngineUrlScheme(TILE_SCHEME.encode())
+    scheme.setSyntax(QWebEngineUrlScheme.Syntax.Host)
+    scheme.setFlags(QWebEngineUrlScheme.SecureScheme | QWebEngineUrlScheme.LocalAccessAllowed | QWebEngineUrlScheme.CorsEnabled)
+    QWebEngineUrlScheme.registerScheme(scheme)
+
+
+class TileRequestSignals(QObject):
+    finished = pyqtSignal(object, object) # job, (content type, data) or None
+
+
+# Answer a noznum:// request in a thread of the QThreadPool (a missing tile is downloaded)
+class TileRequest(QRunnable):
+    def __init__(self, job, url, provider):
+        super().__init__()
+        self.job = job
+        self.url = url
+        self.provider = provider
+        self.signals = TileRequestSignals()
+
+    def run(self):
+        try:
+            result = self.provider.serve(self.url)
+        except Exception: # a broken tile must not break the page
+            result = None
+        self.signals.finished.emit(self.job, result)
+
+
+# Serve the tiles and the page files of the maps from a TileProvider. Requests are answered in the window thread, once
+# the worker has read or downloaded the data.
+class TileSchemeHandler(QWebEngineUrlSchemeHandler):
+    def __init__(self, provider, parent=None):
+        super().__init__(parent)
+        self.provider = provider
+        self.requests = set() # running requests, kept alive until they are answered
+
+    def requestStarted(self, job):
+        request = TileRequest(job, job.requestUrl().toString(), self.provider)
+        request.signals.finished.connect(lambda job, result, request=request: self.reply(request, job, result))
+        self.requests.add(request)
+        QThreadPool.globalInstance().start(request)
+
+    def reply(self, request, job, result):
+        self.requests.discard(request)
+        try:
+            if result is None:
+                job.fail(QWebEngineUrlRequestJob.UrlNotFound)
+                return
+            content_type, data = result
+            buffer = QBuffer(job) # deleted with the job
+            buffer.setData(data)
+            job.reply(content_type.encode(), buffer)
+        except RuntimeError: # the page was closed in the meantime, the job doesn't exist anymore
+            pass
+
+
+##~##~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ CURSOR CLASS ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# Crosshair and annotation of a plot. The crosshair is drawn with blitting : the static part of the figure is saved after
+# each full draw and a mouse move only redraws the two lines over it, whatever the number of points of the plot.
+# The annotation is a Qt label laid over the canvas : rendering its text with matplotlib would cost more than the rest.
+class HoverCursor():
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.axes = canvas.axes
+        self.vline = self.axes.axvline(0, color='red', ls=':', lw=1, animated=True, visible=False)
+        self.hline = self.axes.axhline(0, color='red', ls=':', lw=1, animated=True, visible=False)
+        self.artists = [self.vline, self.hline]
+        self.annotation = QLabel(self.canvas)
+        self.annotation.setStyleSheet('background-color: lightyellow; border: 1px solid gray; border-radius: 4px; padding: 2px; font-size: 8pt;')
+        self.annotation.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.annotation.hide()
+        self.background = None
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+
+    # Save the new static background after a full draw (resize, zoom, new data...)
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.canvas.fig.bbox)
+        self.draw_artists()
+
+    # Put the crosshair on a data row, with an annotation or not
+    def show(self, position, annotation_text=None):
+        x, y = self.canvas.x_values[position], self.canvas.y_values[position]
+        self.vline.set_xdata([x, x])
+        self.hline.set_ydata([y, y])
+        self.vline.set_visible(True)
+        self.hline.set_visible(not np.isnan(y))
+        self.blit()
+        if annotation_text is None:
+            self.annotation.hide()
+        else:
+            self.show_annotation(x, y, annotation_text)
+
+    # Place the annotation next to the point (x, y), on the side of the plot center
+    def show_annotation(self, x, y, annotation_text):
+        self.annotation.setText(annotation_text)
+        self.annotation.adjustSize()
+        if np.isnan(y):
+            y = sum(self.axes.get_ylim()) / 2
+        x_display, y_display = self.axes.transData.transform((x, y))
+        ratio = self.canvas.device_pixel_ratio # display coordinates are physical pixels from the bottom left corner
+        x_widget, y_widget = x_display / ratio, self.canvas.height() - y_display / ratio
+        x_min, x_max = self.axes.get_xlim()
+        if x > (x_min + x_max) / 2:
+            x_widget -= self.annotation.width() + 15
+        else:
+            x_widget += 15
+        y_widget = min(max(y_widget - self.annotation.height() - 15, 0), self.canvas.height() - self.annotation.height())
+        self.annotation.move(int(x_widget), int(y_widget))
+        self.annotation.show()
+
+    def hide(self):
+        for artist in self.artists:
+            artist.set_visible(False)
+        self.annotation.hide()
+        self.blit()
+
+    def draw_artists(self):
+        for artist in self.artists:
+            if artist.get_visible():
+                self.axes.draw_artist(artist)
+
+    # Redraw the crosshair over the saved background
+    def blit(self):
+        if self.background is None:
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_artists()
+        self.canvas.blit(self.canvas.fig.bbox)
+
+
+# Cursors of all the plots of a session. The hovered plot shows a crosshair and an annotation, the other plots can show
+# a synchronized crosshair on the same sample and the map marker can follow the hovered sample.
+class CursorGroup():
+    def __init__(self, map_instance=None, sync_plots=True, sync_map=False):
+        self.map_instance = map_instance
+        self.sync_plots = sync_plots
+        self.sync_map = sync_map
+        self.canvases = []
+        self.position = None # row position of the hovered sample
+
+    def add(self, canvas):
+        self.canvases.append(canvas)
+
+    # The mouse is over the sample at row `position` of the plot `source`
+    def move(self, source, position):
+        if position == self.position:
+            return
+        self.position = position
+        for canvas in self.canvases:
+            if canvas is source:
+                canvas.hover_cursor.show(position, canvas.annotation_text_at(position))
+            elif self.sync_plots:
+                canvas.hover_cursor.show(position)
+        if self.sync_map and self.map_instance is not None:
+            lat, lon = source.data.lat.iloc[position], source.data.lon.iloc[position]
+            if not (np.isnan(lat) or np.isnan(lon)): # no position fix at this sample : the marker stays where it is
+                self.map_instance.move_marker(lat, lon)
+
+    # The mouse left the plots : hide the crosshairs and put the marker back on the selected point
+    def hide(self):
+        if self.position is None:
+            return
+        self.position = None
+        for canvas in self.canvases:
+            canvas.hover_cursor.hide()
+        if self.sync_map and self.map_instance is not None and self.canvases:
+            self.map_instance.move_marker(*self.canvases[0].data.marker_coord)
+
+
+##~##~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ PLOT CLASS ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+class MplCanvas(FigureCanvasQTAgg):
+    def __init__(self, parent=None, width=5, height=4, dpi=100, map_instance=None, zoom_slider_instance=None, data=None, x='lon',y='lat', x_label='Longitude (degrees °)',
+                  y_label='Latitude (degrees °)', line_color='-ro', tab_name=None, cursor_group=None, label=None, overlays=(), on_span=None,
+                  signal_filter=None):
+        self.fig = Figure(figsize=(width, height), dpi=dpi)
+        self.axes = self.fig.add_subplot(111)
+        super(MplCanvas, self).__init__(self.fig)
+        self.map_instance = map_instance
+        self.zoom_slider_instance = zoom_slider_instance
+        self.data = data
+        self.line_color = line_color
+        self.tab_name = tab_name
+        self.x = AxesNames(self.data, x)
+        self.y = AxesNames(self.data, y)
+        # y series smoothed with a FilterSettings (see noznum.filters), computed once per session and parameters (see Data.filtered)
+        self.signal_filter = signal_filter if y not in UNFILTERED_AXES else None
+        if self.signal_filter is not None:
+            self.y = self.data.filtered(y, self.signal_filter)
+        self.axes.set_xlabel(x_label)
+        self.axes.set_ylabel(y_label)
+
+        # Drag on the plot to select a segment : on_span(first, last) receives the row positions of the selected samples
+        self.on_span = on_span
+        self.segment_artists = []
+        if self.on_span is not None:
+            self.span_selector = SpanSelector(self.axes, self.on_span_selected, 'horizontal', useblit=True, minspan=0,
+                                              props=dict(facecolor='tab:blue', alpha=0.2))
+
+        # Long series are drawn decimated (M4) for the visible x range, line_index gives the data rows of the drawn points
+        self.x_values = np.asarray(self.x, dtype=np.float64)
+        self.y_values = np.asarray(self.y, dtype=np.float64)
+        self.decimator = M4Decimator(self.x_values, self.y_values)
+        self.line_index = self.decimator.index
+        if self.decimator.x.size:
+            self.line_index = self.decimator.indices(self.decimator.x[0], self.decimator.x[-1], self.axes.bbox.width)
+        self.line, = self.axes.plot(self.x_values[self.line_index], self.y_values[self.line_index], self.line_color, picker=5, label=label)
+
+        # Other sessions of the workspace, drawn under the active one (not clickable)
+        self.overlay_lines = [] # (decimator, x values, y values, line)
+        for overlay_label, overlay, color in overlays:
+            if overlay.df.empty:
+                continue
+            x_values = np.asarray(AxesNames(overlay, x), dtype=np.float64)
+            y_values = np.asarray(AxesNames(overlay, y) if self.signal_filter is None else overlay.filtered(y, self.signal_filter), dtype=np.float64)
+            decimator = M4Decimator(x_values, y_values)
+            index = decimator.index
+            if decimator.x.size:
+                index = decimator.indices(decimator.x[0], decimator.x[-1], self.axes.bbox.width)
+            line, = self.axes.plot(x_values[index], y_values[index], '-', color=color, lw=1, alpha=0.7, label=overlay_label, zorder=1)
+            self.overlay_lines.append((decimator, x_values, y_values, line))
+        if self.overlay_lines:
+            self.axes.legend(loc='upper right', fontsize='small')
+        self.axes.callbacks.connect('xlim_changed', self.update_decimation) # zoom and pan
+        self.mpl_connect('resize_event', self.update_decimation)
+
+        #mplcursors.cursor(self.axes, hover=True)
+        self.fig.canvas.mpl_connect('pick_event', self.on_click)
+
+        # Hover : blitting cursor shared with the other plots of the session if a cursor group is given, mplcursors otherwise
+        self.cursor_group = cursor_group
+        if self.cursor_group is not None:
+            self.hover_cursor = HoverCursor(self)
+            self.cursor_group.add(self)
+            self.mpl_connect('motion_notify_event', self.on_mouse_move)
+            self.mpl_connect('axes_leave_event', lambda event: self.cursor_group.hide())
+        else:
+            self.cursor = mplcursors.cursor(self.axes, hover=True)
+            self.cursor.connect('add', self.show_annotation)
+        self.pending_selection = None # last hover event not handled yet
+        self.annotation_position = None # row position of the sample shown in the annotation
+        self.annotation_text = ''
+        self.hover_timer = QTimer(self)
+        self.hover_timer.setSingleShot(True)
+        self.hover_timer.setInterval(HOVER_INTERVAL_MS)
+        self.hover_timer.timeout.connect(self.on_hover_timer)
+        self.clickable_bool = True # Set to False to disable the clickable points
+
+    # Full draw of the figure (draw_idle ends here), timed
+    def draw(self):
+        with timer('canvas.draw'):
+            super().draw()
+
+    # Draw the decimated series again for the visible x range and the current size of the plot
+    def update_decimation(self, *args):
+        x_min, x_max = self.axes.get_xlim()
+        self.line_index = self.decimator.indices(x_min, x_max, self.axes.bbox.width)
+        self.line.set_data(self.x_values[self.line_index], self.y_values[self.line_index])
+        self.set_overlay_data()
+        self.draw_idle()
+
+    def set_overlay_data(self):
+        x_min, x_max = self.axes.get_xlim()
+        for decimator, x_values, y_values, line in self.overlay_lines:
+            index = decimator.indices(x_min, x_max, self.axes.bbox.width)
+            line.set_data(x_values[index], y_values[index])
+
+    # Blitting cursor : move the crosshairs to the sample closest to the mouse
+    @timed('hover.move')
+    def on_mouse_move(self, event):
+        if event.inaxes is not self.axes or event.xdata is None:
+            return
+        position = self.data.nearest_position(event.xdata) # binary search on the sorted time index
+        if position is not None:
+            self.cursor_group.move(self, position)
+
+    # Text of the annotation of the sample at a row position
+    def annotation_text_at(self, position):
+        dt = self.data.dt.iloc[position]
+        closest_y = self.y.iloc[position]
+        t_hours = self.data.th.iloc[position]
+        dist_from_start = round(float(self.data.dist.iloc[position]), 2) # float32 column, rounded as a python float for display
+        # annotation_str = f'{self.axes.get_xlabel()}: {xi}\n{self.axes.get_ylabel()}: {y1}\nTime (hours): {t_hours}' # this one is with interpolation
+        # annotation_str = f'Time: {self.data.dt[xi]} seconds\nHeart rate: {self.data.hr[xi]} bpm\nAltitude: {self.data.alt[xi]} meters'
+        return f'{self.axes.get_xlabel()}: {dt}\n{self.axes.get_ylabel()}: {closest_y}\nTime (hours): {t_hours}\nDistance from start: {dist_from_start} meters'
+
+    # Hover annotation function (mplcursors)
+    # Hover events are throttled : the first one is handled at once, the next ones received within HOVER_INTERVAL_MS
+    # are coalesced and only the last one is handled when the timer expires.
+    def show_annotation(self, sel):
+        xi = sel.target[0]
+        vertical_line = self.axes.axvline(xi, color='red', ls=':', lw=1)
+        sel.extras.append(vertical_line)
+        self.pending_selection = sel
+        if self.hover_timer.isActive():
+            sel.annotation.set_text(self.annotation_text) # updated when the timer expires
+        else:
+            self.update_annotation()
+            self.hover_timer.start()
+
+    # Handle the last hover event received while the timer was running
+    def on_hover_timer(self):
+        if self.pending_selection is not None:
+            self.update_annotation()
+            self.hover_timer.start()
+
+    # Write the data of the sample closest to the hovered point in the annotation
+    @timed('hover.annotation')
+    def update_annotation(self):
+        sel = self.pending_selection
+        self.pending_selection = None
+        closest_position = self.data.nearest_position(sel.target[0]) # binary search on the sorted time index
+        if closest_position is None:
+            return
+        if closest_position != self.annotation_position: # same sample as the last event : the text is already known
+            self.annotation_position = closest_position
+            self.annotation_text = self.annotation_text_at(closest_position)
+        sel.annotation.set_text(self.annotation_text)
+        self.draw_idle()
+
+    # Function to click on a point and get its data
+    def on_click(self, event):
+        if self.clickable_bool:
+            ind = self.data.df.index[self.line_index[event.ind[0]]] # drawn point -> data row
+            self.data.marker_coord = [self.data.lat[ind], self.data.lon[ind]]
+            point_hr = self.data.hr[ind]
+            point_alt = self.data.alt[ind]
+            point_dt = self.data.dt[ind]
+            print(f"Clicked on point {self.data.marker_coord}")
+            print(f"Distance from start: {self.data.dist[ind]} meters")
+            # print(f"Heart rate is {point_hr} bpm at time {point_dt} seconds")
+            # print(f"Altitude is {point_alt} meters at time {point_dt} seconds")
+            self.map_instance.update_map(self.data, zoom_level=self.zoom_slider_instance.slider.value())
+
+    # Span selector callback : x_min and x_max are times (seconds from the start)
+    def on_span_selected(self, x_min, x_max):
+        positions = self.data.positions_between(x_min, x_max)
+        if positions is not None:
+            self.on_span(*positions)
+
+    # Show the segments (noznum.core.Segment) of the session as shaded spans, the highlighted one darker
+    def draw_segments(self, segments, highlighted=None):
+        for artist in self.segment_artists:
+            artist.remove()
+        self.segment_artists = []
+        for segment in segments:
+            x_min, x_max = self.x_values[segment.first], self.x_values[segment.last]
+            alpha = 0.35 if segment is highlighted else 0.15
+            self.segment_artists.append(self.axes.axvspan(x_min, x_max, color='tab:green', alpha=alpha, zorder=0))
+            self.segment_artists.append(self.axes.text((x_min + x_max) / 2, 1.0, segment.label, transform=self.axes.get_xaxis_transform(),
+                                                       ha='center', va='bottom', fontsize='small', clip_on=True))
+        self.draw_idle()
+
+
+##~##~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ SLIDER CLASS ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+class SliderWidget(QWidget):
+    def __init__(self, map_instance=None, data=None):
+        super().__init__()
+        self.data = data
+        self.map_instance = map_instance
+        self.slider = QSlider(Qt.Vertical)
+        self.slider.setMinimum(3)
+        self.slider.setMaximum(18)
+        self.slider.setValue(13)
+        self.slider.setTickPosition(QSlider.TicksBothSides)
+        self.slider.setTickInterval(1)
+        self.slider.valueChanged.connect(self.valuechange)
+        self.zoom_label = QLabel('Zoom')
+        self.max_label = QLabel('18')
+        self.min_label = QLabel('3')
+        self.vbox = QVBoxLayout()
+        self.vbox.addWidget(self.zoom_label)
+        self.vbox.addWidget(self.max_label)
+        self.vbox.addWidget(self.slider)
+        self.vbox.addWidget(self.min_label)
+        self.label = QLabel('13')
+        self.hbox = QHBoxLayout()
+        self.hbox.addLayout(self.vbox)
+        self.hbox.addWidget(self.label)
+        self.setLayout(self.hbox)
+        self.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Expanding)
+    
+    def valuechange(self):
+        size = self.slider.value()
+        self.label.setText(str(size))
+        self.map_instance.update_map(self.data, size)
+
+    # Show a zoom level chosen on the map itself, without zooming the map again
+    def show_zoom(self, zoom_level):
+        self.slider.blockSignals(True)
+        self.slider.setValue(zoom_level)
+        self.slider.blockSignals(False)
+        self.label.setText(str(zoom_level))
+
+
+##~##~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ PLAYBACK CLASS ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# Replay of the active session at a chosen speed : the map marker moves along the route and the plot cursors sweep the plots.
+# The frames are computed beforehand (see PlaybackFrames) and a QTimer ticks at PLAYBACK_FPS. Every tick shows the frame of
+# the current time of the replay (from a clock, not from a frame counter) : when drawing is slower than the timer, frames are
+# skipped and the replay stays on time.
+class Playback(QObject):
+    moved = pyqtSignal(float) # time of the shown frame (seconds from the start of the session)
+    state_changed = pyqtSignal(bool) # playing or not
+
+    def __init__(self, parent=None, fps=PLAYBACK_FPS):
+        super().__init__(parent)
+        self.fps = fps
+        self.speed = PLAYBACK_SPEEDS[0]
+        self.data = None
+        self.cursor_group = None
+        self.map_instance = None
+        self.frames = None
+        self.frame = 0 # shown frame
+        self.time = 0.0 # time of the replay when the clock was started (or of the shown frame when paused)
+        self.dropped_frames = 0
+        self.clock = QElapsedTimer()
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.setInterval(round(1000 / fps))
+        self.timer.timeout.connect(self.tick)
+
+    @property
+    def playing(self):
+        return self.timer.isActive()
+
+    @property
+    def duration(self):
+        return self.frames.duration if self.frames is not None else 0.0
+
+    # Replay another session (or the same one with new plots and map : the replay goes on where it was)
+    def set_session(self, data, cursor_group=None, map_instance=None):
+        if data is not self.data:
+            self.pause()
+            self.data = data
+            self.frames = PlaybackFrames(data, self.speed, self.fps) if data is not None else None
+            self.frame, self.time = 0, 0.0
+        self.cursor_group, self.map_instance = cursor_group, map_instance
+        if self.frames is not None and (self.playing or self.frame > 0):
+            self.show(self.frame)
+
+    def set_speed(self, speed):
+        time = self.current_time()
+        self.speed = speed
+        if self.data is not None:
+            self.frames = PlaybackFrames(self.data, speed, self.fps)
+        self.seek(time)
+
+    def play(self):
+        if self.frames is None or self.playing:
+            return
+        if self.frame >= len(self.frames) - 1: # at the end : replay from the start
+            self.frame, self.time = 0, 0.0
+        self.clock.start()
+        self.timer.start()
+        self.state_changed.emit(True)
+
+    def pause(self):
+        if self.playing:
+            self.time = self.current_time()
+            self.timer.stop()
+            self.state_changed.emit(False)
+
+    def toggle(self):
+        if self.playing:
+            self.pause()
+        else:
+            self.play()
+
+    # Go to a time of the session (seconds from its start), playing or not
+    def seek(self, time):
+        if self.frames is None:
+            return
+        self.time = min(max(time, 0.0), self.duration)
+        if self.playing:
+            self.clock.restart()
+        self.show(self.frames.frame_at(self.frames.start + self.time))
+
+    # Time of the replay (seconds from the start of the session)
+    def current_time(self):
+        if self.playing:
+            return self.time + self.clock.elapsed() / 1000 * self.speed
+        return self.time
+
+    def tick(self):
+        frame = self.frames.frame_at(self.frames.start + self.current_time())
+        if frame == self.frame:
+            return
+        self.dropped_frames += max(frame - self.frame - 1, 0)
+        self.show(frame)
+        if frame == len(self.frames) - 1:
+            self.pause()
+
+    # Move the plot cursors and the map marker to a frame
+    @timed('playback.frame')
+    def show(self, frame):
+        self.frame = frame
+        position = int(self.frames.positions[frame])
+        if self.cursor_group is not None:
+            for canvas in self.cursor_group.canvases:
+                canvas.hover_cursor.show(position)
+        lat, lon = self.frames.lat[frame], self.frames.lon[frame]
+        if self.map_instance is not None and not (np.isnan(lat) or np.isnan(lon)):
+            self.map_instance.animate_marker(lat, lon)
+        self.moved.emit(float(self.frames.times[frame] - self.frames.start))
+
+
+##~##~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ LOADER CLASS ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# Loaded fraction of the file between two partial results sent to the window (the map and plots are rebuilt for each one)
+PARTIAL_RESULT_STEP = 0.25
+
+
+# Raised in the loader thread when the user cancels the loading
+class LoadCancelled(Exception):
+    pass
+
+
+# Signals of a LoaderWorker (a QRunnable can't have signals itself)
+class LoaderSignals(QObject):
+    progress = pyqtSignal(int) # percentage of the file read
+    partial = pyqtSignal(object) # dataframe of the data read so far
+    finished = pyqtSignal(object) # dataframe of the whole file
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+# Load a file in a thread of the QThreadPool, so the window stays responsive during the parsing
+class LoaderWorker(QRunnable):
+    def __init__(self, file_path, reader, session_cache):
+        super().__init__()
+        self.file_path = file_path
+        self.reader = reader
+        self.session_cache = session_cache
+        self.signals = LoaderSignals()
+        self.is_cancelled = False
+        self.next_partial = PARTIAL_RESULT_STEP
+
+    # Called from the window thread, the loader stops at its next progress report
+    def cancel(self):
+        self.is_cancelled = True
+
+    def run(self):
+        try:
+            df = self.session_cache.load(self.file_path, self.reader, progress=self.on_progress)
+        except LoadCancelled:
+            self.signals.cancelled.emit()
+            return
+        except Exception as error: # shown to the user instead of killing the thread silently
+            self.signals.failed.emit(f'{type(error).__name__}: {error}')
+            return
+        if self.is_cancelled:
+            self.signals.cancelled.emit()
+        else:
+            self.signals.finished.emit(df)
+
+    # Progress callback of the readers (runs in the loader thread)
+    def on_progress(self, fraction, partial):
+        if self.is_cancelled:
+            raise LoadCancelled()
+        self.signals.progress.emit(int(fraction * 100))
+        if fraction >= self.next_partial and fraction < 1:
+            self.next_partial = (int(fraction / PARTIAL_RESULT_STEP) + 1) * PARTIAL_RESULT_STEP
+            self.signals.partial.emit(partial())
+
+
+# Signals of a SeedWorker
+class SeedSignals(QObject):
+    progress = pyqtSignal(int, int) # tiles done, tiles to download
+    finished = pyqtSignal(str) # summary shown in the status bar
+
+
+# Download the map tiles around a session in a thread of the QThreadPool (see noznum.tiles.seed)
+class SeedWorker(QRunnable):
+    def __init__(self, provider, data):
+        super().__init__()
+        self.provider = provider
+        self.data = data
+        self.signals = SeedSignals()
+
+    def run(self):
+        try:
+            downloaded, failed = seed(self.provider, self.data, *SEED_ZOOM_RANGE, progress=self.signals.progress.emit)
+        except (ValueError, OSError, sqlite3.Error) as error:
+            self.signals.finished.emit(f'Tiles not downloaded: {error}')
+            return
+        self.signals.finished.emit(f'{downloaded} tiles downloaded' + (f', {failed} failed (no connection?)' if failed else ''))
+
+
+##~##~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ MAIN WINDOW CLASS ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+class MainWindow(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.initUI()
+        self.plot_axes = ['hr', 'alt'] # series drawn on the top and bottom plots
+        self.filter_settings = FilterSettings() # smoothing of the plotted series (Filters menu), 'none' : raw samples
+        self.session_cache = SessionCache() # parsed files are cached, reopening a file is then almost instantaneous
+        self.workspace = Workspace(self.session_cache) # sessions opened in the window
+        self.active_session_id = None # session shown with the marker, clickable plots and hover cursors
+
+        # Map tiles served from the local tile cache (noznum.tiles), the maps are then shown offline too
+        self.tile_handler = None
+        try:
+            self.tile_provider = TileProvider(TileStore())
+        except (OSError, sqlite3.Error) as error:
+            self.statusBar().showMessage(f'Tile cache disabled: {error}', 5000)
+        else:
+            self.tile_handler = TileSchemeHandler(self.tile_provider, parent=self)
+            QWebEngineProfile.defaultProfile().installUrlSchemeHandler(TILE_SCHEME.encode(), self.tile_handler)
+            self.offline_action.setChecked(self.tile_provider.offline)
+        self.download_tiles_action.setEnabled(self.tile_handler is not None)
+        self.offline_action.setEnabled(self.tile_handler is not None)
+
+    def initUI(self):
+        self.setWindowTitle('Noz-Num Interactive Map')
+        self.window_width, self.window_height = 1280, 720
+        self.setMinimumSize(self.window_width, self.window_height)
+        # self.showMaximized()
+
+        # Tab Widget
+        # self.tab_Widget = QTabWidget()
+
+        # central widget
+        self.central_widget = QWidget()
+        self.setCentralWidget(self.central_widget)
+
+        # Layout
+        self.lay_main = QVBoxLayout(self.central_widget)
+        self.lay_map = QHBoxLayout()
+        self.lay_plots = QVBoxLayout()
+        
+        # Add plots layer to the main layer
+        self.lay_main.addLayout(self.lay_map)
+        self.lay_main.addLayout(self.lay_plots)
+   
+        # TCX Load button
+        load_tcx_button_action = QAction("&Load data from .tcx", self)
+        load_tcx_button_action.setShortcut("Ctrl+O")
+        load_tcx_button_action.setStatusTip('Load data from a .tcx file [Ctrl+O]')
+        load_tcx_button_action.triggered.connect(self.dialog_tcx)
+
+        # CSV Load Button
+        load_csv_button_action = QAction("&Load data from .csv", self)
+        load_csv_button_action.setShortcut("Ctrl+P")
+        load_csv_button_action.setStatusTip('Load data from a .csv file [Ctrl+P]')
+        load_csv_button_action.triggered.connect(self.dialog_csv)
+
+        # Any supported format (.tcx, .gpx, .fit, .csv : see noznum.readers)
+        load_session_button_action = QAction("Load data from &any session file", self)
+        load_session_button_action.setShortcut("Ctrl+Shift+O")
+        load_session_button_action.setStatusTip('Load data from a .tcx, .gpx, .fit or .csv file [Ctrl+Shift+O]')
+        load_session_button_action.triggered.connect(self.dialog_session)
+
+        # Main Menu
+        main_menu = self.menuBar()
+        file_menu = main_menu.addMenu('&Load Data')
+        file_menu.addAction(load_tcx_button_action)
+        file_menu.addAction(load_csv_button_action)
+        file_menu.addAction(load_session_button_action)
+
+        # Cursor options
+        self.sync_plots_action = QAction("Synchronize plot cursors", self, checkable=True)
+        self.sync_plots_action.setChecked(True)
+        self.sync_plots_action.setStatusTip('Show the hovered point on both plots')
+        self.sync_plots_action.toggled.connect(self.update_cursor_options)
+        self.sync_map_action = QAction("Show hovered point on the map", self, checkable=True)
+        self.sync_map_action.setChecked(False)
+        self.sync_map_action.setStatusTip('Move the map marker to the hovered point')
+        self.sync_map_action.toggled.connect(self.update_cursor_options)
+        view_menu = main_menu.addMenu('&View')
+        view_menu.addAction(self.sync_plots_action)
+        view_menu.addAction(self.sync_map_action)
+
+        # Sessions of the workspace : the current one is the active session, the checked ones are drawn over it
+        self.session_list = QListWidget()
+        self.session_list.setToolTip('Checked sessions are drawn over the selected one')
+        self.session_list.currentItemChanged.connect(self.on_current_session_changed)
+        self.session_list.itemChanged.connect(self.on_session_item_changed)
+        close_session_button = QPushButton('Close session')
+        close_session_button.clicked.connect(self.close_session)
+        self.memory_label = QLabel()
+        self.memory_label.setWordWrap(True)
+        sessions_widget = QWidget()
+        sessions_layout = QVBoxLayout(sessions_widget)
+        sessions_layout.addWidget(self.session_list)
+        sessions_layout.addWidget(close_session_button)
+        sessions_layout.addWidget(self.memory_label)
+        self.sessions_dock = QDockWidget('Sessions', self)
+        self.sessions_dock.setWidget(sessions_widget)
+        self.addDockWidget(Qt.LeftDockWidgetArea, self.sessions_dock)
+
+        # Segments of the active session (drag on a plot to add one)
+        self.segment_list = QListWidget()
+        self.segment_list.setToolTip('Drag the mouse over a plot to add a segment')
+        self.segment_list.currentRowChanged.connect(self.highlight_segment)
+        delete_segment_button = QPushButton('Delete segment')
+        delete_segment_button.clicked.connect(self.delete_segment)
+        find_segment_button = QPushButton('Find in all sessions')
+        find_segment_button.setStatusTip('Add the same part of the route (between the same start and end points) to every session')
+        find_segment_button.clicked.connect(self.find_segment_in_sessions)
+        self.export_segments_button = QPushButton('Export Segments')
+        self.export_segments_button.setStatusTip('Save every segment of the session in a csv file and their statistics in stats.csv')
+        self.export_segments_button.clicked.connect(self.export_segments)
+        segments_widget = QWidget()
+        segments_layout = QVBoxLayout(segments_widget)
+        segments_layout.addWidget(self.segment_list)
+        segments_layout.addWidget(delete_segment_button)
+        segments_layout.addWidget(find_segment_button)
+        segments_layout.addWidget(self.export_segments_button)
+        self.segments_dock = QDockWidget('Segments', self)
+        self.segments_dock.setWidget(segments_widget)
+        self.addDockWidget(Qt.LeftDockWidgetArea, self.segments_dock)
+
+        # Timings of the load, render and interaction paths (see noznum.profiling), refreshed while the panel is shown
+        self.timings_table = QTableWidget(0, 6)
+        self.timings_table.setHorizontalHeaderLabels(['Name', 'Calls', 'Total (ms)', 'Mean (ms)', 'Max (ms)', 'Last (ms)'])
+        self.timings_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.timings_table.verticalHeader().hide()
+        reset_timings_button = QPushButton('Reset')
+        reset_timings_button.clicked.connect(self.reset_timings)
+        timings_widget = QWidget()
+        timings_layout = QVBoxLayout(timings_widget)
+        timings_layout.addWidget(self.timings_table)
+        timings_layout.addWidget(reset_timings_button)
+        self.timings_dock = QDockWidget('Timings', self)
+        self.timings_dock.setWidget(timings_widget)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.timings_dock)
+        self.timings_dock.hide()
+        self.timings_timer = QTimer(self)
+        self.timings_timer.setInterval(TIMINGS_REFRESH_MS)
+        self.timings_timer.timeout.connect(self.refresh_timings)
+        self.timings_dock.visibilityChanged.connect(lambda visible: self.timings_timer.start() if visible else self.timings_timer.stop())
+
+        # cProfile capture of the window thread, saved to a .prof file when it is stopped
+        self.profiler = Profiler()
+        self.profile_action = QAction('Profile (cProfile)', self, checkable=True)
+        self.profile_action.setStatusTip('Profile the application until unchecked, then save the profile to a file')
+        self.profile_action.toggled.connect(self.toggle_profiling)
+
+        view_menu.addSeparator()
+        view_menu.addAction(self.sessions_dock.toggleViewAction())
+        view_menu.addAction(self.segments_dock.toggleViewAction())
+        view_menu.addAction(self.timings_dock.toggleViewAction())
+        view_menu.addAction(self.profile_action)
+
+        # Series drawn on each plot
+        plots_menu = main_menu.addMenu('&Plots')
+        for plot_number, plot_name in enumerate(['Top plot', 'Bottom plot']):
+            plot_menu = plots_menu.addMenu(plot_name)
+            axes_group = QActionGroup(self)
+            for axis, axis_label in PLOT_AXES.items():
+                axis_action = QAction(axis_label, self, checkable=True)
+                axis_action.setChecked(axis == ['hr', 'alt'][plot_number])
+                axis_action.triggered.connect(lambda checked, plot_number=plot_number, axis=axis: self.set_plot_axis(plot_number, axis))
+                axes_group.addAction(axis_action)
+                plot_menu.addAction(axis_action)
+
+        # Tile cache of the maps
+        self.download_tiles_action = QAction('Download tiles for offline use', self)
+        self.download_tiles_action.setStatusTip(f'Cache the map tiles around the session for the zoom levels {SEED_ZOOM_RANGE[0]} to {SEED_ZOOM_RANGE[1]}')
+        self.download_tiles_action.triggered.connect(self.download_tiles)
+        self.offline_action = QAction('Work offline', self, checkable=True)
+        self.offline_action.setStatusTip('Only show the cached map tiles, never download')
+        self.offline_action.toggled.connect(self.set_offline)
+        map_menu = main_menu.addMenu('&Map')
+        map_menu.addAction(self.download_tiles_action)
+        map_menu.addAction(self.offline_action)
+
+        # Smoothing of the plotted series : filter, window, resampling on a 1 second grid (gaps up to 10 s are filled)
+        filters_menu = main_menu.addMenu('&Filters')
+        methods_group = QActionGroup(self)
+        for method, method_label in FILTER_METHODS.items():
+            method_action = QAction(method_label, self, checkable=True)
+            method_action.setChecked(method == 'none')
+            method_action.triggered.connect(lambda checked, method=method: self.set_filter(method=method))
+            methods_group.addAction(method_action)
+            filters_menu.addAction(method_action)
+        filters_menu.addSeparator()
+        window_menu = filters_menu.addMenu('Window')
+        windows_group = QActionGroup(self)
+        for window_s in FILTER_WINDOWS_S:
+            window_action = QAction(f'{window_s} s', self, checkable=True)
+            window_action.setChecked(window_s == FilterSettings().window_s)
+            window_action.triggered.connect(lambda checked, window_s=window_s: self.set_filter(window_s=float(window_s)))
+            windows_group.addAction(window_action)
+            window_menu.addAction(window_action)
+        resample_action = QAction('Resample to a uniform 1 s grid', self, checkable=True)
+        resample_action.setChecked(True)
+        resample_action.setStatusTip('Filter the series on a regular time grid instead of the recorded samples')
+        resample_action.toggled.connect(lambda checked: self.set_filter(resample_s=1.0 if checked else None))
+        filters_menu.addAction(resample_action)
+
+        # Playback of the active session : the map marker moves along the route while the cursors sweep the plots
+        self.playback = Playback(self)
+        self.play_action = QAction('Play', self, checkable=True)
+        self.play_action.setShortcut('Space')
+        self.play_action.setStatusTip('Replay the session on the map and the plots [Space]')
+        self.play_action.triggered.connect(lambda checked: self.playback.play() if checked else self.playback.pause())
+        self.playback.state_changed.connect(self.play_action.setChecked)
+        self.speed_box = QComboBox()
+        for speed in PLAYBACK_SPEEDS:
+            self.speed_box.addItem(f'{speed}x', speed)
+        self.speed_box.setToolTip('Playback speed')
+        self.speed_box.currentIndexChanged.connect(lambda index: self.playback.set_speed(self.speed_box.itemData(index)))
+        self.playback_slider = QSlider(Qt.Horizontal)
+        self.playback_slider.valueChanged.connect(self.playback.seek) # seconds from the start of the session
+        self.playback_label = QLabel()
+        self.playback.moved.connect(self.on_playback_moved)
+        self.playback_toolbar = QToolBar('Playback', self)
+        self.playback_toolbar.addAction(self.play_action)
+        self.playback_toolbar.addWidget(self.speed_box)
+        self.playback_toolbar.addWidget(self.playback_slider)
+        self.playback_toolbar.addWidget(self.playback_label)
+        self.playback_toolbar.setEnabled(False)
+        self.addToolBar(Qt.BottomToolBarArea, self.playback_toolbar)
+        view_menu.addAction(self.playback_toolbar.toggleViewAction())
+
+        # Loading progress (files are loaded in a background thread)
+        self.loader = None
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setMaximumWidth(200)
+        self.cancel_button = QPushButton('Cancel')
+        self.cancel_button.clicked.connect(self.cancel_loading)
+        self.statusBar().addPermanentWidget(self.progress_bar)
+        self.statusBar().addPermanentWidget(self.cancel_button)
+        self.progress_bar.hide()
+        self.cancel_button.hide()
+
+    """
+    Quick note about the segments:
+
+    Dragging the mouse over a plot selects a part of the active session. The user enters a label for it and the segment is added
+    to the Segments panel (a session can have many segments, they are only kept as row ranges).
+    The 'Export Segments' button saves every segment of the session in its own csv file, and the statistics of all of them in
+    the unique stats.csv file (see export_segments), then a popup shows where the files are.
+    """
+
+    # Popup after saving data from selected points
+    def save_confirm(self, text):
+        popup = QDialog(self)
+        popup.setWindowTitle("Data saved successfully")
+        popup.setGeometry(200, 200, 400, 100)
+
+        layout = QVBoxLayout()
+        
+        current_file = os.path.abspath(sys.argv[0])
+        current_dir = os.path.dirname(current_file)
+
+        # fulltext = "Data saved successfully to " + current_dir + "\ " + text + ".csv."
+        fulltext = "Data saved successfully to " + text + ". \n" + "Data statistics has been saved to " + current_dir + get_os_separator() + "stats.csv."
+        label = QLabel(fulltext, popup)
+        label.setWordWrap(True)
+
+        label_width = label.sizeHint().width()
+        label_height = label.sizeHint().height()
+        max_width = self.frameGeometry().width() - 10
+        if label_width > max_width:
+            label_width = max_width
+        
+        popup.resize(label_width + 20, label_height + 100)
+
+        # Center the popup window
+        x = self.geometry().center().x() - popup.geometry().center().x()
+        y = self.geometry().center().y() - popup.geometry().center().y()
+        popup.move(x,y)
+
+        # Add a confirm button to close the popup
+        confirmButton = QPushButton("Confirm", popup)
+        confirmButton.setGeometry(0, 0, 200, 30)
+        confirmButton.move(label.x(), label.height() + 20)
+        confirmButton.setParent(popup)
+
+        # Confirm button callback function
+        confirmButton.clicked.connect(lambda: popup.close())
+
+        layout.addWidget(label)
+        layout.addWidget(confirmButton)
+        layout.setAlignment(Qt.AlignCenter)
+        popup.setLayout(layout)
+        popup.exec_()
+    
+    # Open a dialog window to load .tcx data file
+    def dialog_tcx(self): # technically updates Data class
+        # tcx_file_path , check = QFileDialog.getOpenFileName(None, "QFileDialog.getOpenFileName()",
+        #                                         "", "tcx Files (*.tcx);;All Files (*);;Python Files (*.py);;Text Files (*.txt)")
+        tcx_file_path , check = QFileDialog.getOpenFileName(None, "QFileDialog.getOpenFileName()",
+                                                            "", "tcx Files (*.tcx)")
+        if check:
+            self.start_loading(tcx_file_path, tcx_to_df)
+    
+    # Open a dialog window to load .csv data file
+    def dialog_csv(self): # technically updates Data class
+        csv_file_path , check = QFileDialog.getOpenFileName(None, "QFileDialog.getOpenFileName()",
+                                                            "", "csv files (*.csv)")
+        if check:
+            self.start_loading(csv_file_path, csv_to_df)
+
+    # Open a dialog window to load a file of any supported format, its reader is chosen from its extension
+    def dialog_session(self):
+        file_path, check = QFileDialog.getOpenFileName(None, "QFileDialog.getOpenFileName()", "", file_dialog_filter())
+        if check:
+            try:
+                reader = reader_for(file_path)
+            except ValueError as error:
+                QMessageBox.warning(self, 'Unsupported file', str(error))
+                return
+            self.start_loading(file_path, reader)
+
+    # Load a file in a background thread, the map and plots are shown (and updated) as the data arrives
+    def start_loading(self, file_path, reader):
+        self.cancel_loading()
+        self.loader = LoaderWorker(file_path, reader, self.session_cache)
+        self.loader.signals.progress.connect(self.progress_bar.setValue)
+        self.loader.signals.partial.connect(lambda df, loader=self.loader: self.on_loader_partial(loader, df))
+        self.loader.signals.finished.connect(lambda df, loader=self.loader: self.on_loader_finished(loader, df))
+        self.loader.signals.failed.connect(lambda error, loader=self.loader: self.on_loader_failed(loader, error))
+        self.loader.signals.cancelled.connect(lambda loader=self.loader: self.on_loader_stopped(loader))
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.cancel_button.show()
+        self.statusBar().showMessage('Loading ' + os.path.basename(file_path) + '...')
+        QThreadPool.globalInstance().start(self.loader)
+
+    def cancel_loading(self):
+        if self.loader is not None:
+            self.loader.cancel()
+            self.on_loader_stopped(self.loader)
+
+    # The signals of a cancelled or replaced loader are ignored
+    def on_loader_partial(self, loader, df):
+        if loader is self.loader and not df.empty:
+            self.add_session(loader.file_path, loader.reader, df)
+            if self.active_session_id == os.path.abspath(loader.file_path):
+                self.export_segments_button.setEnabled(False) # wait for the whole file
+
+    def on_loader_finished(self, loader, df):
+        if loader is not self.loader:
+            return
+        self.on_loader_stopped(loader)
+        if df.empty:
+            self.statusBar().showMessage('No data found in the file', 5000)
+        else:
+            self.add_session(loader.file_path, loader.reader, df)
+
+    def on_loader_failed(self, loader, error):
+        if loader is self.loader:
+            self.on_loader_stopped(loader)
+            QMessageBox.warning(self, 'Loading failed', 'The file could not be loaded:\n' + error)
+
+    def on_loader_stopped(self, loader):
+        if loader is self.loader:
+            self.loader = None
+            self.export_segments_button.setEnabled(True)
+            self.progress_bar.hide()
+            self.cancel_button.hide()
+            self.statusBar().clearMessage()
+
+    # Add (or update) the session of a file in the workspace and show it. A new session becomes the active one.
+    def add_session(self, file_path, reader, df):
+        session = self.workspace.add(file_path, reader, df)
+        if self.find_session_item(session.session_id) is None:
+            item = QListWidgetItem(session.label)
+            item.setData(Qt.UserRole, session.session_id)
+            item.setToolTip(session.file_path)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked)
+            self.session_list.blockSignals(True)
+            self.session_list.addItem(item)
+            self.session_list.setCurrentItem(item)
+            self.session_list.blockSignals(False)
+            self.active_session_id = session.session_id
+        if session.session_id == self.active_session_id or session.visible:
+            self.show_sessions()
+
+    def find_session_item(self, session_id):
+        for row in range(self.session_list.count()):
+            item = self.session_list.item(row)
+            if item.data(Qt.UserRole) == session_id:
+                return item
+        return None
+
+    # Show the active session with the other checked sessions drawn over it, then free the memory of the hidden sessions if needed
+    def show_sessions(self):
+        if self.active_session_id is None:
+            self.remove_widgets_from_layout(layout=self.lay_map)
+            self.remove_widgets_from_layout(layout=self.lay_plots)
+            self.data = None
+            self.update_segments()
+            self.update_memory_label()
+            self.update_playback()
+            return
+        active = self.workspace[self.active_session_id]
+        data = self.workspace.data(active.session_id)
+        overlays = []
+        for session in self.workspace:
+            if session is not active and session.visible:
+                overlays.append((session.label, self.workspace.data(session.session_id), OVERLAY_COLORS[len(overlays) % len(OVERLAY_COLORS)]))
+        self.load_data(data, layout_map=self.lay_map, layout_plot=self.lay_plots, label=active.label, overlays=overlays)
+        displayed = {session.session_id for session in self.workspace if session is active or session.visible}
+        self.workspace.evict(keep=displayed)
+        self.update_memory_label()
+
+    def update_memory_label(self):
+        loaded = sum(session.loaded for session in self.workspace)
+        self.memory_label.setText(f'{loaded}/{len(self.workspace)} sessions in memory, '
+                                  f'{self.workspace.memory_usage() / 2**20:.0f} MB of {self.workspace.max_bytes / 2**20:.0f} MB')
+        self.session_list.blockSignals(True)
+        for row in range(self.session_list.count()):
+            item = self.session_list.item(row)
+            font = item.font()
+            font.setItalic(not self.workspace[item.data(Qt.UserRole)].loaded) # evicted sessions are read again from disk when shown
+            item.setFont(font)
+        self.session_list.blockSignals(False)
+
+    def on_current_session_changed(self, current, previous):
+        if current is not None and current.data(Qt.UserRole) != self.active_session_id:
+            self.active_session_id = current.data(Qt.UserRole)
+            self.show_sessions()
+
+    def on_session_item_changed(self, item):
+        session = self.workspace[item.data(Qt.UserRole)]
+        visible = item.checkState() == Qt.Checked
+        if session.visible != visible:
+            session.visible = visible
+            if session.session_id != self.active_session_id:
+                self.show_sessions()
+
+    # Remove the selected session from the workspace (the next one becomes active)
+    def close_session(self):
+        item = self.session_list.currentItem()
+        if item is None:
+            return
+        session_id = item.data(Qt.UserRole)
+        if self.loader is not None and os.path.abspath(self.loader.file_path) == session_id:
+            self.cancel_loading()
+        self.workspace.remove(session_id)
+        self.session_list.blockSignals(True)
+        self.session_list.takeItem(self.session_list.row(item))
+        current = self.session_list.currentItem()
+        self.session_list.blockSignals(False)
+        self.active_session_id = current.data(Qt.UserRole) if current is not None else None
+        self.show_sessions()
+
+    # Remove old widgets and create new map and plots widgets for data, with the overlays (label, data, color) drawn under it
+    def load_data(self, data, layout_map, layout_plot, label=None, overlays=()):
+        self.remove_widgets_from_layout(layout=layout_map)
+        self.remove_widgets_from_layout(layout=layout_plot)
+        self.data = data
+        self.data_label, self.data_overlays = label, overlays
+        self.create_map_from_data(data=self.data, layout=layout_map, overlays=overlays)
+        self.plot_data(data=self.data, layout=layout_plot, web_view=self.web_view, zoom_slider=self.zoom_slider, label=label, overlays=overlays)
+
+    # Generate a MapWidget object called web_view and add it to its layout
+    def create_map_from_data(self, data, layout, zoom_level=13, overlays=()):
+        self.web_view = MapWidget(data, zoom_level=zoom_level, overlays=overlays, local_tiles=self.tile_handler is not None)
+        self.zoom_slider = SliderWidget(map_instance=self.web_view, data=data)
+        self.web_view.zoom_changed.connect(self.zoom_slider.show_zoom)
+        self.web_view.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.zoom_slider.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Minimum)
+        layout.addWidget(self.web_view) # main layout
+        layout.addWidget(self.zoom_slider) # main layout
+        return self.web_view, self.zoom_slider
+    
+    # Generate two plots objects and add them to their layout
+    def plot_data(self, data, layout, web_view, zoom_slider, label=None, overlays=()):
+        self.cursor_group = CursorGroup(map_instance=web_view, sync_plots=self.sync_plots_action.isChecked(), sync_map=self.sync_map_action.isChecked())
+        self.plot_hr = MplCanvas(self, width=5, height=4, dpi=100, map_instance=web_view, data=data, zoom_slider_instance=zoom_slider, x='dt', y=self.plot_axes[0], x_label='Time (seconds)', y_label=PLOT_AXES[self.plot_axes[0]],
+                                  line_color='-ro', cursor_group=self.cursor_group, label=label, overlays=overlays, on_span=self.add_segment,
+                                  signal_filter=self.plot_filter())
+        self.plot_alt = MplCanvas(self, width=5, height=4, dpi=100, map_instance=web_view, data=data, zoom_slider_instance=zoom_slider, x='dt', y=self.plot_axes[1], x_label='Time (seconds)', y_label=PLOT_AXES[self.plot_axes[1]],
+                                   line_color='-bo', cursor_group=self.cursor_group, label=label, overlays=overlays, on_span=self.add_segment,
+                                   signal_filter=self.plot_filter())
+
+        sub_layout = QVBoxLayout()
+        sub_layout.addWidget(self.plot_hr)
+        sub_layout.addWidget(self.plot_alt)
+        layout.addLayout(sub_layout)
+        self.update_segments()
+        self.update_playback(data, web_view)
+
+        return self.plot_hr, self.plot_alt
+
+    # Replay the displayed session with the current plots and map (None : no session, the playback is disabled)
+    def update_playback(self, data=None, web_view=None):
+        self.playback.set_session(data, getattr(self, 'cursor_group', None) if data is not None else None, web_view)
+        self.playback_slider.blockSignals(True)
+        self.playback_slider.setRange(0, int(np.ceil(self.playback.duration)))
+        self.playback_slider.blockSignals(False)
+        self.playback_toolbar.setEnabled(data is not None)
+        self.on_playback_moved(self.playback.current_time())
+
+    def on_playback_moved(self, time):
+        self.playback_slider.blockSignals(True)
+        self.playback_slider.setValue(int(time))
+        self.playback_slider.blockSignals(False)
+        self.playback_label.setText(f'{format_duration(time)} / {format_duration(self.playback.duration)}')
+
+    # Segments of the active session (empty list without session)
+    def active_segments(self):
+        if self.active_session_id is None:
+            return []
+        return self.workspace[self.active_session_id].segments
+
+    # Ask a label for the rows first to last selected on a plot and add them as a segment of the active session
+    def add_segment(self, first, last):
+        segments = self.active_segments()
+        label, ok = QInputDialog.getText(self, 'Enter Data Label', 'Label of the selected segment:', text=f'segment_{len(segments) + 1}')
+        if ok and label:
+            segments.append(Segment(label, first, last))
+            self.update_segments(current_row=len(segments) - 1)
+
+    def delete_segment(self):
+        row = self.segment_list.currentRow()
+        segments = self.active_segments()
+        if 0 <= row < len(segments):
+            del segments[row]
+            self.update_segments(current_row=min(row, len(segments) - 1))
+
+    # Add the selected segment to every session of the workspace : the parts of the sessions going from its start point to its
+    # end point (gates of GATE_RADIUS_M, see noznum.geofence) get the same label, unless they overlap a segment with this label
+    def find_segment_in_sessions(self):
+        row = self.segment_list.currentRow()
+        segments = self.active_segments()
+        if not 0 <= row < len(segments):
+            QMessageBox.information(self, 'No segment', 'Select a segment in the list first.')
+            return
+        segment = segments[row]
+        lat, lon = segment.arrays(self.data, columns=('latitude', 'longitude')).values()
+        valid = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+        if valid.size < 2:
+            QMessageBox.warning(self, 'No position', 'The segment has no GPS position.')
+            return
+        start_gate, end_gate = Gate(lat[valid[0]], lon[valid[0]]), Gate(lat[valid[-1]], lon[valid[-1]])
+        displayed = {session.session_id for session in self.workspace if session.session_id == self.active_session_id or session.visible}
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            found = gate_segments(self.workspace.spatial_index(keep=displayed), start_gate, end_gate)
+        finally:
+            QApplication.restoreOverrideCursor()
+        added = 0
+        for session_id, ranges in found.items():
+            session_segments = self.workspace[session_id].segments
+            known = [(known_segment.first, known_segment.last) for known_segment in session_segments if known_segment.label == segment.label]
+            for first, last in ranges:
+                if not any(first <= known_last and last >= known_first for known_first, known_last in known): # not already labelled
+                    session_segments.append(Segment(segment.label, first, last))
+                    added += 1
+        self.update_segments(current_row=row)
+        self.update_memory_label()
+        QMessageBox.information(self, 'Segments found', f'{added} segments "{segment.label}" added in {len(found)} sessions.')
+
+    # Refresh the segment list and the spans drawn on the plots
+    def update_segments(self, current_row=-1):
+        self.segment_list.blockSignals(True)
+        self.segment_list.clear()
+        for segment in self.active_segments():
+            t_first, t_last = self.data.dt_values[segment.first], self.data.dt_values[segment.last]
+            self.segment_list.addItem(f'{segment.label}  ({t_first:.0f} s - {t_last:.0f} s, {len(segment)} points)')
+        self.segment_list.setCurrentRow(current_row)
+        self.segment_list.blockSignals(False)
+        self.highlight_segment(current_row)
+
+    # Highlight a segment on the plots and on the map (-1 : none)
+    def highlight_segment(self, row):
+        segments = self.active_segments()
+        highlighted = segments[row] if 0 <= row < len(segments) else None
+        if getattr(self, 'data', None) is None:
+            return
+        for canvas in (self.plot_hr, self.plot_alt):
+            canvas.draw_segments(segments, highlighted)
+        if highlighted is None:
+            self.web_view.highlight_segment()
+        else:
+            self.web_view.highlight_segment(id_1=self.data.df.index[highlighted.first], id_2=self.data.df.index[highlighted.last])
+
+    # Save all the segments of the active session and their statistics at once
+    def export_segments(self):
+        segments = self.active_segments()
+        if not segments:
+            QMessageBox.information(self, 'No segment', 'Drag the mouse over a plot to select a segment first.')
+            return
+        current_dir = os.path.dirname(os.path.abspath(sys.argv[0]))
+        stats_file_path = os.path.join(current_dir, 'stats.csv')
+        file_paths = export_segments(self.data, segments, current_dir, stats_file_path)
+        self.save_confirm(text=', '.join(file_paths))
+    
+    # Draw another series on a plot (0 : top, 1 : bottom), only the plots are rebuilt
+    def set_plot_axis(self, plot_number, axis):
+        self.plot_axes[plot_number] = axis
+        if getattr(self, 'data', None) is not None:
+            self.remove_widgets_from_layout(layout=self.lay_plots)
+            self.plot_data(data=self.data, layout=self.lay_plots, web_view=self.web_view, zoom_slider=self.zoom_slider, label=self.data_label, overlays=self.data_overlays)
+
+    # Filter settings given to the plots (None : the raw samples are drawn)
+    def plot_filter(self):
+        return None if self.filter_settings.method == 'none' else self.filter_settings
+
+    # Change the smoothing of the plots (Filters menu). The plots are rebuilt, the smoothed series are cached by the sessions
+    # so going back to previous settings is immediate.
+    def set_filter(self, **changes):
+        self.filter_settings = self.filter_settings._replace(**changes)
+        if getattr(self, 'data', None) is not None:
+            self.remove_widgets_from_layout(layout=self.lay_plots)
+            self.plot_data(data=self.data, layout=self.lay_plots, web_view=self.web_view, zoom_slider=self.zoom_slider, label=self.data_label, overlays=self.data_overlays)
+
+    # Cache the map tiles around the active session, in the background
+    def download_tiles(self):
+        if getattr(self, 'data', None) is None:
+            QMessageBox.information(self, 'No session', 'Load a session first.')
+            return
+        self.seeder = SeedWorker(self.tile_provider, self.data)
+        self.seeder.signals.progress.connect(lambda done, total: self.statusBar().showMessage(f'Downloading tiles {done}/{total}...'))
+        self.seeder.signals.finished.connect(lambda text: self.statusBar().showMessage(text, 5000))
+        self.download_tiles_action.setEnabled(False)
+        self.seeder.signals.finished.connect(lambda text: self.download_tiles_action.setEnabled(True))
+        QThreadPool.globalInstance().start(self.seeder)
+
+    def set_offline(self, checked):
+        self.tile_provider.offline = checked
+
+    # Show the TIMINGS table in the Timings panel
+    def refresh_timings(self):
+        rows = TIMINGS.summary()
+        self.timings_table.setRowCount(len(rows))
+        for row_number, (name, count, total, mean, maximum, last) in enumerate(rows):
+            cells = [name, str(count)] + [f'{seconds * 1000:.1f}' for seconds in (total, mean, maximum, last)]
+            for column, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                if column:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.timings_table.setItem(row_number, column, item)
+        self.timings_table.resizeColumnsToContents()
+
+    def reset_timings(self):
+        TIMINGS.reset()
+        self.refresh_timings()
+
+    # Start the cProfile capture, or stop it and ask where to save it
+    def toggle_profiling(self, checked):
+        if checked:
+            self.profiler.start()
+            self.statusBar().showMessage('Profiling...')
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self, 'Save the profile', 'noznum.prof', 'cProfile files (*.prof)')
+        self.profiler.stop(file_path or None)
+        self.statusBar().showMessage(f'Profile saved to {file_path}' if file_path else 'Profile discarded', 5000)
+
+    # Apply the cursor options of the View menu to the current plots
+    def update_cursor_options(self):
+        if getattr(self, 'cursor_group', None) is not None:
+            self.cursor_group.hide()
+            self.cursor_group.sync_plots = self.sync_plots_action.isChecked()
+            self.cursor_group.sync_map = self.sync_map_action.isChecked()
+
+    # Removes widgets from a layout. Used to clear old widgets when we load new data
+    def remove_widgets_from_layout(self, layout):
+        if layout is not None:
+            while layout.count():
+                item = layout.takeAt(0)
+                widget = item.widget()
+                if widget is not None:
+                    widget.deleteLater()
+                else:
+                    self.remove_widgets_from_layout(item.layout()) # ex: the sub layout of the plots
+
+
+##~##~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ MAIN FUNCTION ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# Launch the application
+# With NOZNUM_PROFILE=<path>, the whole run is profiled and saved to <path> when the window is closed
+def main():
+    profiler = Profiler()
+    if PROFILE_PATH:
+        profiler.start()
+    register_tile_scheme()
+    app = QApplication([])
+    window = MainWindow()
+    window.show()
+    app.exec_()
+    if profiler.active:
+        profiler.stop(PROFILE_PATH)
@@ -0,0 +1,113 @@
+'''
+Project : Noz'Num
+Description : Folium map of a session's route
+'''
+import json
+import math
+import folium
+from branca.element import MacroElement
+from jinja2 import Template
+from noznum.profiling import timed
+from noznum.tiles import TILE_ATTRIBUTION
+
+
+# Prefix of the console messages with which the page reports a zoom done on the map itself (mouse wheel, +/- buttons...)
+ZOOM_MESSAGE = 'noznum:zoomend:'
+
+##~##~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ GENERATE MAP ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# Javascript interface added to the generated map page. MapWidget drives the map through it (runJavaScript) instead of
+# rendering a new page, so the page and its tiles are only loaded once. The page reports the zoom level after every zoom
+# in a console message (ZOOM_MESSAGE, see zoom_from_message), so the route can follow a zoom done with the mouse.
+class MapBridge(MacroElement):
+    _template = Template(u"""
+        {% macro script(this, kwargs) %}
+            var noznum = {
+                map: {{ this._parent.get_name() }},
+                marker: {{ this.marker.get_name() }},
+                route: {{ this.route.get_name() }},
+                highlight: null,
+                moveMarker: function(lat, lon) {
+                    this.marker.setLatLng([lat, lon]);
+                },
+                setZoom: function(zoom) {
+                    this.map.setZoom(zoom);
+                },
+                setRoute: function(points) {
+                    this.route.setLatLngs(points);
+                },
+                highlightSegment: function(points) {
+                    if (this.highlight !== null) {
+                        this.map.removeLayer(this.highlight);
+                        this.highlight = null;
+                    }
+                    if (points.length > 0) {
+                        this.highlight = L.polyline(points, {color: 'blue', weight: 7, opacity: 0.8}).addTo(this.map);
+                    }
+                }
+            };
+            noznum.map.on('zoomend', function() {
+                console.log('{{ this.zoom_message }}' + noznum.map.getZoom());
+            });
+        {% endmacro %}
+        """)
+
+    def __init__(self, marker, route):
+        super().__init__()
+        self._name = 'MapBridge'
+        self.marker = marker
+        self.route = route
+        self.zoom_message = ZOOM_MESSAGE
+
+
+# Generate a folium map with a specific marker
+# overlays : (label, data, color) of other sessions whose routes are drawn under the route of data_object
+# tile_url : url template of the tiles ({z}/{x}/{y}), e.g. the local tile cache (see noznum.tiles), OpenStreetMap by default
+@timed('GenerateMap')
+def GenerateMap(data_object, zoom_level=13, overlays=(), tile_url=None):
+    # Update the folium map with new data or changes
+    if not (data_object.df.empty):
+        map = folium.Map(location=data_object.map_center, zoom_start=zoom_level, tiles=None)
+        if tile_url is None:
+            folium.TileLayer('openstreetmap', name='OpenStreetMap').add_to(map)
+        else:
+            folium.TileLayer(tiles=tile_url, attr=TILE_ATTRIBUTION, name='OpenStreetMap', max_zoom=19).add_to(map)
+        for label, overlay, color in overlays:
+            if not (overlay.df.empty):
+                folium.PolyLine(overlay.route_points(zoom_level), color=color, weight=3, opacity=0.7, tooltip=label).add_to(map)
+        # Only the points visible at this zoom level are drawn (see Data.route_points)
+        route = folium.PolyLine(data_object.route_points(zoom_level), color='red', weight=5, opacity=0.7).add_to(map)
+        marker = folium.Marker(location=data_object.marker_coord).add_to(map)
+        MapBridge(marker, route).add_to(map) # must be added last, it refers to the map, the marker and the route
+        return map
+    else:
+        pass
+
+
+# Javascript calls of the MapBridge interface
+# NaN and infinities are not valid javascript literals and would break the marker : the callers skip the samples without fix
+def move_marker_script(lat, lon):
+    lat, lon = float(lat), float(lon)
+    if not (math.isfinite(lat) and math.isfinite(lon)):
+        raise ValueError(f'Invalid marker position: {lat}, {lon}')
+    return f'noznum.moveMarker({lat!r}, {lon!r});'
+
+def set_zoom_script(zoom_level):
+    return f'noznum.setZoom({int(zoom_level)});'
+
+def set_route_script(points):
+    return f'noznum.setRoute({json.dumps(points)});'
+
+def highlight_segment_script(points):
+    return f'noznum.highlightSegment({json.dumps(points)});'
+
+# Zoom level reported by a console message of the page (see MapBridge), None for the other messages
+def zoom_from_message(message):
+    if not message.startswith(ZOOM_MESSAGE):
+        return None
+    try:
+        return int(round(float(message[len(ZOOM_MESSAGE):])))
+    except ValueError:
+        return None
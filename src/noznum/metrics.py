@@ -0,0 +1,105 @@
+'''
+Project : Noz'Num
+Description : Metrics derived from the recorded samples (gps distance, speed, pace, grade, heart rate zones), computed on
+whole arrays with numpy
+'''
+import numpy as np
+
+
+# Mean radius of the Earth, in meters
+EARTH_RADIUS = 6371008.8
+
+# Width of the time window (seconds, centered on each sample) of the smoothed speed and of the grade
+METRICS_WINDOW_S = 10.0
+
+# Below this speed (m/s) the pace is not defined (stops)
+MIN_PACE_SPEED = 0.5
+
+# Minimum distance (meters) covered in the window to compute a grade, GPS noise gives absurd grades when standing still
+MIN_GRADE_DISTANCE = 5.0
+
+# Lower bounds of the heart rate zones 1 to 5, as fractions of the maximum heart rate (below : zone 0)
+HR_ZONE_BOUNDS = [0.5, 0.6, 0.7, 0.8, 0.9]
+
+# Derived metrics, as they are named in AxesNames, and their plot labels
+METRICS_LABELS = {
+    'gps_dist' : 'GPS distance (meters)',
+    'speed' : 'Speed (m/s)',
+    'smooth_speed' : 'Smoothed speed (m/s)',
+    'pace' : 'Pace (min/km)',
+    'grade' : 'Grade (%)',
+    'hr_zone' : 'Heart rate zone',
+}
+
+
+# Great circle distance in meters between two arrays of points (degrees)
+def haversine(lat_1, lon_1, lat_2, lon_2):
+    lat_1, lon_1, lat_2, lon_2 = (np.radians(np.asarray(values, dtype=np.float64)) for values in (lat_1, lon_1, lat_2, lon_2))
+    a = np.sin((lat_2 - lat_1) / 2)**2 + np.cos(lat_1) * np.cos(lat_2) * np.sin((lon_2 - lon_1) / 2)**2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+# Distance from the start along the route, from the coordinates. Samples without coordinates keep the distance of the
+# last sample that had some (NaN before the first one).
+def cumulative_distance(lat, lon):
+    lat, lon = np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+    positions = np.flatnonzero(valid)
+    distance = np.full(lat.size, np.nan)
+    if positions.size:
+        steps = haversine(lat[positions[:-1]], lon[positions[:-1]], lat[positions[1:]], lon[positions[1:]])
+        distance[positions] = np.concatenate([[0.0], np.cumsum(steps)])
+        last_valid = np.maximum.accumulate(np.where(valid, np.arange(lat.size), 0))
+        distance = np.where(np.arange(lat.size) >= positions[0], distance[last_valid], np.nan)
+    return distance
+
+# Change of `values` per second between consecutive samples (NaN for the first sample and when the time doesn't increase)
+def rate(values, t):
+    rates = np.full(len(values), np.nan)
+    dt = np.diff(t)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rates[1:] = np.where(dt > 0, np.diff(values) / dt, np.nan)
+    return rates
+
+# First and last sample of the time window centered on each sample (t sorted)
+def window_bounds(t, window_s):
+    first = np.searchsorted(t, t - window_s / 2, side='left')
+    last = np.searchsorted(t, t + window_s / 2, side='right') - 1
+    return first, last
+
+# Heart rate zone of each sample (0 to 5, NaN without heart rate). The maximum heart rate is the session's if not given.
+def heart_rate_zones(hr, max_heart_rate=None):
+    hr = np.asarray(hr, dtype=np.float64)
+    zones = np.full(hr.size, np.nan)
+    valid = ~np.isnan(hr)
+    if valid.any():
+        if max_heart_rate is None:
+            max_heart_rate = hr[valid].max()
+        zones[valid] = np.digitize(hr[valid] / max_heart_rate, HR_ZONE_BOUNDS)
+    return zones
+
+# All the derived metrics of a session, {name : float32 array} (names of METRICS_LABELS)
+# t : time in seconds, sorted (see Data.metrics for sessions whose samples are not in time order)
+def derived_metrics(t, lat, lon, alt, hr, window_s=METRICS_WINDOW_S, max_heart_rate=None):
+    t = np.asarray(t, dtype=np.float64)
+    alt = np.asarray(alt, dtype=np.float64)
+    distance = cumulative_distance(lat, lon)
+    speed = rate(distance, t)
+
+    # Smoothed speed and grade : distance and altitude differences over a time window, not per sample (GPS noise)
+    first, last = window_bounds(t, window_s)
+    window_distance = distance[last] - distance[first]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        window_time = t[last] - t[first]
+        smooth_speed = np.where(window_time > 0, window_distance / window_time, np.nan)
+        pace = np.where(smooth_speed >= MIN_PACE_SPEED, 1000 / 60 / smooth_speed, np.nan)
+        grade = np.where(window_distance >= MIN_GRADE_DISTANCE, (alt[last] - alt[first]) / window_distance * 100, np.nan)
+
+    metrics = {
+        'gps_dist' : distance,
+        'speed' : speed,
+        'smooth_speed' : smooth_speed,
+        'pace' : pace,
+        'grade' : grade,
+        'hr_zone' : heart_rate_zones(hr, max_heart_rate),
+    }
+    return {name: values.astype(np.float32) for name, values in metrics.items()}
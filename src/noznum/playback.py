@@ -0,0 +1,55 @@
+'''
+Project : Noz'Num
+Description : Frames of the replay of a session (timeline playback) : position of the map marker and row shown by the plot
+cursors at every frame, computed at once with numpy for a playback speed
+'''
+import os
+import numpy as np
+
+
+# Frames per second of the playback
+PLAYBACK_FPS = int(os.environ.get('NOZNUM_PLAYBACK_FPS', 30))
+
+# Playback speeds offered in the application (session seconds per second)
+PLAYBACK_SPEEDS = [1, 2, 5, 10, 20, 50, 100]
+
+
+# Replay of a session at `speed` : frame k shows the session at the time start + k * speed / fps (seconds from its start)
+# The marker coordinates are interpolated between the GPS samples (samples without coordinates are skipped), the plot cursors
+# are put on the sample closest in time.
+class PlaybackFrames():
+    def __init__(self, data, speed, fps=PLAYBACK_FPS):
+        self.speed = speed
+        self.fps = fps
+        self.step = speed / fps # session seconds between two frames
+        t = data.dt_sorted
+        self.start = t[0] if t.size else 0.0
+        self.duration = t[-1] - t[0] if t.size else 0.0
+        self.times = self.start + np.arange(int(self.duration / self.step) + 1) * self.step
+        if t.size and self.times[-1] < t[-1]:
+            self.times = np.append(self.times, t[-1]) # the last frame shows the end of the session
+
+        # closest sample of every frame, as a row position
+        positions = np.clip(np.searchsorted(t, self.times), 1, max(t.size - 1, 1))
+        if t.size > 1:
+            positions -= self.times - t[positions - 1] <= t[positions] - self.times
+        else:
+            positions[:] = 0
+        self.positions = (positions if data.dt_order is None else data.dt_order[positions]).astype(np.int32)
+
+        # marker coordinates, interpolated in time
+        order = np.arange(t.size) if data.dt_order is None else data.dt_order
+        lat, lon = data.lat.to_numpy(dtype=np.float64)[order], data.lon.to_numpy(dtype=np.float64)[order]
+        valid = ~(np.isnan(lat) | np.isnan(lon))
+        if valid.any():
+            self.lat = np.interp(self.times, t[valid], lat[valid])
+            self.lon = np.interp(self.times, t[valid], lon[valid])
+        else:
+            self.lat = self.lon = np.full(self.times.size, np.nan)
+
+    def __len__(self):
+        return self.times.size
+
+    # Frame showing the session at a time (seconds from the start of the session)
+    def frame_at(self, time):
+        return int(min(max(round((time - self.start) / self.step), 0), self.times.size - 1))
@@ -0,0 +1,119 @@
+'''
+Project : Noz'Num
+Description : Timing of the load, render and interaction paths (parsing, Data, map rendering, plot draws, hover), and an
+optional cProfile capture
+
+Every timed call is added to the TIMINGS table (count, total, max, last), shown in the Timings panel of the application.
+Set NOZNUM_TIMING_LOG=<path> to also append every call to a JSON lines file, e.g.
+    {"name": "tcx_to_df", "seconds": 0.8123, "time": 1697800000.0, "thread": "MainThread", "pid": 1234}
+Set NOZNUM_PROFILE=<path> to profile the whole run of the application with cProfile (see main in noznum.gui).
+'''
+import os
+import json
+import time
+import threading
+import functools
+import cProfile
+import pstats
+import io
+from contextlib import contextmanager
+
+
+# JSON lines file receiving every timed call (None : timings are only kept in memory)
+TIMING_LOG_PATH = os.environ.get('NOZNUM_TIMING_LOG')
+
+# cProfile output (.prof, readable with pstats or snakeviz) of a whole run of the application (None : no profiling)
+PROFILE_PATH = os.environ.get('NOZNUM_PROFILE')
+
+
+# Durations of the calls of one timed name, in seconds
+class TimingStats():
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+
+
+# Table of the timed calls, shared by all the threads (the loader threads time the parsing)
+class Timings():
+    def __init__(self, log_path=None):
+        self.log_path = log_path
+        self.log_file = None # opened at the first record
+        self.lock = threading.Lock()
+        self.stats = {} # name -> TimingStats
+
+    # Add a call of `seconds` to the table (and to the log file). Extra fields are only written to the log.
+    def record(self, name, seconds, **fields):
+        with self.lock:
+            self.stats.setdefault(name, TimingStats()).add(seconds)
+            if self.log_path is not None:
+                if self.log_file is None:
+                    self.log_file = open(self.log_path, 'a', buffering=1) # line buffered, appends of several processes don't mix
+                event = {'name': name, 'seconds': round(seconds, 6), 'time': time.time(),
+                         'thread': threading.current_thread().name, 'pid': os.getpid(), **fields}
+                self.log_file.write(json.dumps(event, default=str) + '\n')
+
+    # Time the body of a `with` block
+    @contextmanager
+    def timer(self, name, **fields):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, **fields)
+
+    # Decorator timing every call of a function
+    def timed(self, name):
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # Rows (name, count, total, mean, max, last) in seconds, the most expensive names first
+    def summary(self):
+        with self.lock:
+            rows = [(name, stats.count, stats.total, stats.total / stats.count, stats.max, stats.last) for name, stats in self.stats.items()]
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+    def reset(self):
+        with self.lock:
+            self.stats = {}
+
+
+# cProfile capture started and stopped on demand (View menu of the application). Only the thread that starts it is profiled.
+class Profiler():
+    def __init__(self):
+        self.profile = None
+
+    @property
+    def active(self):
+        return self.profile is not None
+
+    def start(self):
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    # Stop the capture, save it to file_path (if given) and return the `limit` most expensive functions as text
+    def stop(self, file_path=None, limit=30):
+        self.profile.disable()
+        profile, self.profile = self.profile, None
+        if file_path:
+            profile.dump_stats(file_path)
+        text = io.StringIO()
+        pstats.Stats(profile, stream=text).sort_stats('cumulative').print_stats(limit)
+        return text.getvalue()
+
+
+TIMINGS = Timings(TIMING_LOG_PATH)
+timer = TIMINGS.timer
+timed = TIMINGS.timed
@@ -0,0 +1,311 @@
+'''
+Project : Noz'Num
+Description : Readers of the session files (.tcx, .gpx, .fit, .csv) and the registry choosing the reader of a file
+
+Every reader has the interface of tcx_to_df : reader(file_path, progress=None) returns a dataframe with the TCX_COLUMNS
+columns (see noznum.core), and calls progress(fraction, partial) every PROGRESS_EVERY trackpoints while it streams the file.
+'''
+import os
+import struct
+from xml.etree import ElementTree as ET
+import numpy as np
+from noznum.core import tcx_to_df, csv_to_df, TrackpointBuffer, PROGRESS_EVERY
+from noznum.metrics import cumulative_distance
+from noznum.profiling import timed
+
+
+##~##~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ GPX READER ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# Rough size of one track point in a gpx file (no distance, shorter tags than tcx)
+GPX_BYTES_PER_TRACKPOINT = 200
+
+
+# Tag without its namespace ('{http://www.topografix.com/GPX/1/1}trkpt' -> 'trkpt'), gpx 1.0 and 1.1 use different namespaces
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+# Dataframe of the filled part of a buffer without distance column : the distance is computed along the route
+def buffer_to_df_with_distance(buffer, file_name, dir_name):
+    n = buffer.size
+    buffer.numeric['distance'][:n] = cumulative_distance(buffer.numeric['latitude'][:n], buffer.numeric['longitude'][:n])
+    return buffer.to_df(file_name, dir_name)
+
+# Generate a dataframe from a gpx file (every track point of every track and segment, streamed like tcx_to_df)
+# The heart rate is read from the Garmin TrackPointExtension (<gpxtpx:hr>), the distance is computed from the coordinates.
+@timed('gpx_to_df')
+def gpx_to_df(gpx_file_path, progress=None):
+    file_name = os.path.basename(gpx_file_path)
+    dir_name = os.path.dirname(gpx_file_path).split('/')[-1]
+    file_size = os.path.getsize(gpx_file_path)
+    buffer = TrackpointBuffer(capacity=file_size // GPX_BYTES_PER_TRACKPOINT)
+    with open(gpx_file_path, 'rb') as gpx_file:
+        in_trkpt = False # <time> and <ele> are also children of <metadata> and of the waypoints (<wpt>), which are ignored
+        segment = None
+        for event, elem in ET.iterparse(gpx_file, events=('start', 'end')):
+            name = local_name(elem.tag)
+            if event == 'start':
+                if name == 'trkpt':
+                    in_trkpt = True
+                    if buffer.size == buffer.capacity:
+                        buffer.grow()
+                    buffer.numeric['latitude'][buffer.size] = float(elem.get('lat'))
+                    buffer.numeric['longitude'][buffer.size] = float(elem.get('lon'))
+                elif name == 'trkseg':
+                    segment = elem
+                continue
+
+            if not in_trkpt:
+                continue
+            if name == 'trkpt':
+                in_trkpt = False
+                buffer.size += 1
+                if progress is not None and buffer.size % PROGRESS_EVERY == 0:
+                    progress(gpx_file.tell() / file_size, lambda: buffer_to_df_with_distance(buffer, file_name, dir_name))
+                elem.clear()
+                if segment is not None:
+                    segment.remove(elem) # free the point, the segment only keeps the ones not read yet
+            elif name == 'time' and elem.text:
+                buffer.time[buffer.size] = elem.text.strip()
+            elif name == 'ele' and elem.text:
+                buffer.numeric['altitude'][buffer.size] = float(elem.text)
+            elif name == 'hr' and elem.text:
+                buffer.numeric['heart_rate'][buffer.size] = float(elem.text)
+
+    return buffer_to_df_with_distance(buffer, file_name, dir_name)
+
+
+##~##~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ FIT READER ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# FIT timestamps count the seconds from 1989-12-31 00:00 UTC
+FIT_EPOCH = 631065600
+
+# Global message numbers and field numbers of the FIT profile that are read
+FIT_RECORD = 20
+FIT_ACTIVITY = 34
+FIT_TIMESTAMP = 253
+FIT_ACTIVITY_LOCAL_TIMESTAMP = 5
+FIT_RECORD_FIELDS = {'position_lat' : 0, 'position_long' : 1, 'altitude' : 2, 'heart_rate' : 3, 'distance' : 5, 'enhanced_altitude' : 78}
+
+# Base types : numpy type and invalid value ('z' types use 0 as invalid value)
+FIT_BASE_TYPES = {
+    0x00 : ('u1', 0xFF), 0x01 : ('i1', 0x7F), 0x02 : ('u1', 0xFF), 0x83 : ('i2', 0x7FFF), 0x84 : ('u2', 0xFFFF),
+    0x85 : ('i4', 0x7FFFFFFF), 0x86 : ('u4', 0xFFFFFFFF), 0x88 : ('f4', None), 0x89 : ('f8', None), 0x0A : ('u1', 0),
+    0x8B : ('u2', 0), 0x8C : ('u4', 0), 0x8E : ('i8', 0x7FFFFFFFFFFFFFFF), 0x8F : ('u8', 0xFFFFFFFFFFFFFFFF), 0x90 : ('u8', 0),
+}
+
+
+# Definition message of a FIT file : layout of the data messages of a local message type
+class FitDefinition():
+    def __init__(self, global_number, fields, big_endian, size):
+        self.global_number = global_number
+        self.fields = fields # [(field number, size, base type)]
+        self.size = size # bytes of a data message (developer fields included)
+        endian = '>' if big_endian else '<'
+        names, formats, offsets, offset = [], [], [], 0
+        self.invalid = {}
+        for number, field_size, base_type in fields:
+            numpy_type, invalid = FIT_BASE_TYPES.get(base_type, (None, None))
+            if numpy_type is not None and np.dtype(numpy_type).itemsize == field_size: # arrays and strings are skipped
+                names.append(number)
+                formats.append(endian + numpy_type)
+                offsets.append(offset)
+                self.invalid[number] = invalid
+            offset += field_size
+        self.dtype = np.dtype({'names' : [f'f{number}' for number in names], 'formats' : formats, 'offsets' : offsets, 'itemsize' : size})
+        self.numbers = names
+        self.timestamp = struct.Struct(endian + 'I') if FIT_TIMESTAMP in names else None
+        self.timestamp_offset = offsets[names.index(FIT_TIMESTAMP)] if FIT_TIMESTAMP in names else None
+
+    # Values of the data messages starting at `offsets` in content, {field number : float64 array with NaN for invalid values}
+    def decode(self, content, offsets):
+        rows = np.frombuffer(content, dtype=np.uint8)[np.asarray(offsets)[:, None] + np.arange(self.size)]
+        values = np.ascontiguousarray(rows).view(self.dtype).ravel()
+        columns = {}
+        for number in self.numbers:
+            column = values[f'f{number}'].astype(np.float64)
+            if self.invalid[number] is not None:
+                column[values[f'f{number}'] == self.invalid[number]] = np.nan
+            else:
+                column[~np.isfinite(column)] = np.nan
+            columns[number] = column
+        return columns
+
+
+# Record messages of a FIT file, gathered while the messages are walked through and decoded all at once (numpy) per definition
+class FitRecords():
+    def __init__(self, content):
+        self.content = content
+        self.definitions = [] # definitions used by the records, in order of appearance
+        self.offsets = {} # id(definition) -> offsets of its record messages in content
+        self.rows = {} # id(definition) -> row numbers of its record messages
+        self.timestamps = [] # timestamp of every record (FIT seconds), from the message or its compressed header
+        self.utc_offset = None # local time - utc time (seconds), from the activity message
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def add(self, definition, offset, timestamp):
+        if id(definition) not in self.offsets:
+            self.definitions.append(definition)
+            self.offsets[id(definition)], self.rows[id(definition)] = [], []
+        self.offsets[id(definition)].append(offset)
+        self.rows[id(definition)].append(len(self.timestamps))
+        self.timestamps.append(timestamp)
+
+    # Dataframe (TCX_COLUMNS) of the records gathered so far
+    def to_df(self, file_name, dir_name):
+        n = len(self.timestamps)
+        buffer = TrackpointBuffer(capacity=n)
+        buffer.size = n
+        numeric = buffer.numeric
+        altitude = np.full(n, np.nan)
+        enhanced_altitude = np.full(n, np.nan)
+        has_distance = False
+        for definition in self.definitions:
+            rows = np.asarray(self.rows[id(definition)], dtype=np.int64)
+            columns = definition.decode(self.content, self.offsets[id(definition)])
+            semicircles = 180.0 / 2**31
+            for name, number in FIT_RECORD_FIELDS.items():
+                if number not in columns:
+                    continue
+                values = columns[number]
+                if name == 'position_lat':
+                    numeric['latitude'][rows] = values * semicircles
+                elif name == 'position_long':
+                    numeric['longitude'][rows] = values * semicircles
+                elif name == 'altitude':
+                    altitude[rows] = values / 5 - 500
+                elif name == 'enhanced_altitude':
+                    enhanced_altitude[rows] = values / 5 - 500
+                elif name == 'heart_rate':
+                    numeric['heart_rate'][rows] = values
+                elif name == 'distance':
+                    numeric['distance'][rows] = values / 100
+                    has_distance = True
+        numeric['altitude'][:n] = np.where(np.isnan(enhanced_altitude), altitude, enhanced_altitude)
+        if not has_distance:
+            numeric['distance'][:n] = cumulative_distance(numeric['latitude'][:n], numeric['longitude'][:n])
+        buffer.time[:n] = fit_time_strings(np.asarray(self.timestamps, dtype=np.float64), self.utc_offset or 0)
+        return buffer.to_df(file_name, dir_name)
+
+
+# ISO 8601 times in local time ('2023-03-10T10:00:00.000+01:00', like the tcx files) of FIT timestamps, None if missing
+def fit_time_strings(timestamps, utc_offset):
+    valid = ~np.isnan(timestamps)
+    local = (timestamps[valid] + FIT_EPOCH + utc_offset).astype(np.int64).astype('datetime64[s]')
+    sign = '-' if utc_offset < 0 else '+'
+    suffix = f'.000{sign}{abs(int(utc_offset)) // 3600:02d}:{abs(int(utc_offset)) % 3600 // 60:02d}'
+    times = np.full(timestamps.size, None, dtype=object)
+    times[valid] = np.char.add(np.datetime_as_string(local, unit='s'), suffix).astype(object)
+    return times
+
+# Generate a dataframe from a binary .fit file (Garmin Flexible and Interoperable data Transfer protocol)
+# The messages are walked through once, only the record messages (one per trackpoint) are kept. Their fields are decoded
+# with numpy, all the records of a definition at once. The local time offset comes from the activity message (UTC otherwise).
+# Chained fit files are read one after the other, the CRCs are not checked.
+# The file is read whole : the records are decoded per definition at the end (FitDefinition.decode gathers them by offset),
+# which needs them in one buffer. A record takes a few dozen bytes, so even a long session at 1 Hz is only a few MB.
+@timed('fit_to_df')
+def fit_to_df(fit_file_path, progress=None):
+    file_name = os.path.basename(fit_file_path)
+    dir_name = os.path.dirname(fit_file_path).split('/')[-1]
+    with open(fit_file_path, 'rb') as fit_file:
+        content = fit_file.read()
+    records = FitRecords(content)
+    position = 0
+    while position + 12 <= len(content):
+        header_size = content[position]
+        data_size = struct.unpack_from('<I', content, position + 4)[0]
+        if content[position + 8:position + 12] != b'.FIT':
+            raise ValueError(f'{fit_file_path} is not a FIT file')
+        position = read_fit_messages(content, position + header_size, position + header_size + data_size, records, file_name, dir_name, progress)
+        position += 2 # crc of the file
+    return records.to_df(file_name, dir_name)
+
+# Walk through the messages between start and end, add the record messages to `records`. Return the end position.
+def read_fit_messages(content, start, end, records, file_name, dir_name, progress):
+    definitions = {} # local message type -> FitDefinition
+    last_timestamp = 0
+    position = start
+    while position < end:
+        header = content[position]
+        position += 1
+        if header & 0x80: # compressed timestamp header : data message with a 5 bit time offset
+            definition = definitions[(header >> 5) & 0x03]
+            time_offset = header & 0x1F
+            last_timestamp += (time_offset - last_timestamp) & 0x1F
+            timestamp = last_timestamp
+        elif header & 0x40: # definition message
+            big_endian = content[position + 1] == 1
+            global_number = struct.unpack_from('>H' if big_endian else '<H', content, position + 2)[0]
+            n_fields = content[position + 4]
+            fields = [tuple(content[position + 5 + 3 * i:position + 8 + 3 * i]) for i in range(n_fields)]
+            position += 5 + 3 * n_fields
+            size = sum(field[1] for field in fields)
+            if header & 0x20: # developer data fields : only their size matters
+                n_developer_fields = content[position]
+                size += sum(content[position + 2 + 3 * i] for i in range(n_developer_fields))
+                position += 1 + 3 * n_developer_fields
+            definitions[header & 0x0F] = FitDefinition(global_number, fields, big_endian, size)
+            continue
+        else: # data message
+            definition = definitions[header & 0x0F]
+            timestamp = None
+            if definition.timestamp is not None:
+                timestamp = definition.timestamp.unpack_from(content, position + definition.timestamp_offset)[0]
+                if timestamp != 0xFFFFFFFF:
+                    last_timestamp = timestamp
+                else:
+                    timestamp = None
+
+        if definition.global_number == FIT_RECORD:
+            records.add(definition, position, np.nan if timestamp is None else timestamp)
+            if progress is not None and len(records) % PROGRESS_EVERY == 0:
+                progress(position / len(content), lambda: records.to_df(file_name, dir_name))
+        elif definition.global_number == FIT_ACTIVITY and timestamp is not None:
+            columns = definition.decode(content, [position])
+            local_timestamp = columns.get(FIT_ACTIVITY_LOCAL_TIMESTAMP, [np.nan])[0]
+            if not np.isnan(local_timestamp):
+                records.utc_offset = local_timestamp - timestamp
+        position += definition.size
+    return position
+
+
+##~##~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ READER REGISTRY ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# File extension (lower case) -> reader. Add a format with register_reader.
+READERS = {
+    '.tcx' : tcx_to_df,
+    '.gpx' : gpx_to_df,
+    '.fit' : fit_to_df,
+    '.csv' : csv_to_df,
+}
+
+# Formats recorded by the watches (the csv files are saved by the application)
+RECORDING_EXTENSIONS = ['.tcx', '.gpx', '.fit']
+
+
+def register_reader(extension, reader):
+    READERS[extension.lower()] = reader
+
+# Reader of a file, from its extension
+def reader_for(file_path):
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension not in READERS:
+        raise ValueError(f'Unsupported file format: {extension or os.path.basename(file_path)} (supported: {", ".join(READERS)})')
+    return READERS[extension]
+
+# Dataframe of a session file, read with the reader of its format
+def read_session(file_path, progress=None):
+    return reader_for(file_path)(file_path, progress=progress)
+
+# Filter of the file dialogs listing the supported formats
+def file_dialog_filter():
+    patterns = ' '.join('*' + extension for extension in READERS)
+    return f'Session files ({patterns});;' + ';;'.join(f'{extension[1:].upper()} files (*{extension})' for extension in READERS)
@@ -0,0 +1,290 @@
+'''
+Project : Noz'Num
+Description : Headless reports (no Qt, no display) of the sessions parsed by the batch processing : heart rate and altitude
+plots, static route maps and interactive html maps of every session and of its segments
+
+Usage : python -m noznum.report PARSED_DIR -o REPORT_DIR [--format feather|parquet|csv] [--image-format png|svg] [--jobs N]
+                                [--no-html] [--tiles] [--gate-start LAT LON --gate-end LAT LON | --polygon POLYGON] [--label LABEL]
+
+PARSED_DIR is the output directory of noznum.batch. For every parsed session, REPORT_DIR gets a directory (same
+sub-directories) with session.png (plots), session_map.png (static map) and session_map.html (folium map), and the same
+files for each segment found with the gates or the polygon (see noznum.geofence). REPORT_DIR/index.html links all of them.
+The sessions are rendered in a pool of processes with the Agg backend of matplotlib. Every process creates its figures once
+and only updates their data for each session and segment.
+'''
+import os
+import io
+import sys
+import html
+import time
+import argparse
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import matplotlib.image
+from noznum.core import Data
+from noznum.decimation import M4Decimator
+from noznum.batch import read_df, find_parsed_files, find_segments, add_segment_arguments, segment_arguments, OUTPUT_EXTENSIONS
+from noznum.tiles import TileStore, TileProvider
+
+
+# Size of the figures (inches) and resolution of the png files
+PLOTS_FIGSIZE = (10, 6)
+MAP_FIGSIZE = (8, 8)
+REPORT_DPI = 100
+
+# Zoom levels of the static maps : the highest one showing the whole route in the figure
+MAP_ZOOM_RANGE = (3, 18)
+
+# Tile size of the web mercator maps, in pixels
+TILE_SIZE = 256
+
+# Renderer of the worker process (see init_worker)
+RENDERER = None
+
+
+# Web mercator coordinates of points at a zoom level, in tiles (x to the east, y to the south)
+def mercator(lat, lon, zoom_level):
+    n = 2.0**zoom_level
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -85.0511, 85.0511)
+    return (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0 * n, (1.0 - np.arcsinh(np.tan(np.radians(lat))) / np.pi) / 2.0 * n
+
+
+# Plots and map figures of a worker process, reused for every session and segment : only the data of their artists change
+# tile_provider : background tiles of the static maps (see noznum.tiles), None for a plain background
+class ReportRenderer():
+    def __init__(self, image_format='png', dpi=REPORT_DPI, tile_provider=None, html_maps=True):
+        self.image_format = image_format
+        self.dpi = dpi
+        self.tile_provider = tile_provider
+        self.html_maps = html_maps
+
+        # heart rate and altitude against time, like the plots of the application
+        self.plots = Figure(figsize=PLOTS_FIGSIZE, dpi=dpi)
+        FigureCanvasAgg(self.plots)
+        self.hr_axes, self.alt_axes = self.plots.subplots(2, 1, sharex=True)
+        self.hr_line, = self.hr_axes.plot([], [], '-', color='tab:red', lw=1)
+        self.alt_line, = self.alt_axes.plot([], [], '-', color='tab:blue', lw=1)
+        self.hr_axes.set_ylabel('Heart Rate (bpm)')
+        self.alt_axes.set_ylabel('Altitude (meters)')
+        self.alt_axes.set_xlabel('Time (seconds)')
+        self.span_artists = []
+
+        # route on the web mercator plane (tile units at the zoom level of the map), over the tiles
+        self.map = Figure(figsize=MAP_FIGSIZE, dpi=dpi)
+        FigureCanvasAgg(self.map)
+        self.map_axes = self.map.add_axes([0, 0, 1, 1])
+        self.map_axes.set_axis_off()
+        self.tiles_image = self.map_axes.imshow(np.zeros((1, 1, 3)), zorder=0, interpolation='bilinear', visible=False)
+        self.route_line, = self.map_axes.plot([], [], '-', color='red', lw=2, alpha=0.7)
+        self.segment_route_line, = self.map_axes.plot([], [], '-', color='blue', lw=4, alpha=0.8)
+        self.start_marker, = self.map_axes.plot([], [], 'o', color='green', markersize=8)
+        self.end_marker, = self.map_axes.plot([], [], 's', color='black', markersize=7)
+        self.attribution = self.map_axes.text(0.99, 0.01, '', transform=self.map_axes.transAxes, ha='right', va='bottom', fontsize=6,
+                                              bbox=dict(facecolor='white', alpha=0.7, lw=0))
+
+    # Plots of the rows first to last of a session, with the segments [(label, first, last), ...] shaded
+    def render_plots(self, data, first, last, title, file_path, segments=()):
+        for artist in self.span_artists: # removed first : they would count in the limits of the new data
+            artist.remove()
+        self.span_artists = []
+        x = data.dt_values[first:last + 1]
+        n_pixels = self.hr_axes.bbox.width
+        for line, values in ((self.hr_line, data.hr), (self.alt_line, data.alt)):
+            y = values.to_numpy(dtype=np.float64)[first:last + 1]
+            decimator = M4Decimator(x, y) # a few points per pixel column, see noznum.decimation
+            index = decimator.indices(decimator.x[0], decimator.x[-1], n_pixels) if decimator.x.size else decimator.index
+            line.set_data(x[index], y[index])
+            line.axes.relim()
+            line.axes.autoscale_view()
+        for label, segment_first, segment_last in segments:
+            x_min, x_max = data.dt_values[segment_first], data.dt_values[segment_last]
+            for axes in (self.hr_axes, self.alt_axes):
+                self.span_artists.append(axes.axvspan(x_min, x_max, color='tab:green', alpha=0.15, zorder=0))
+            self.span_artists.append(self.hr_axes.text((x_min + x_max) / 2, 1.0, label, transform=self.hr_axes.get_xaxis_transform(),
+                                                       ha='center', va='bottom', fontsize='small'))
+        self.hr_axes.set_title(title, pad=15 if segments else 6)
+        self.plots.savefig(file_path, format=self.image_format)
+
+    # Static map of the route of a session, with the rows first to last highlighted if highlight is True
+    def render_map(self, data, first, last, file_path, highlight=False):
+        lat, lon = data.lat.to_numpy(dtype=np.float64), data.lon.to_numpy(dtype=np.float64)
+        shown = slice(first, last + 1) if highlight else slice(None)
+        valid = ~(np.isnan(lat[shown]) | np.isnan(lon[shown]))
+        if not valid.any():
+            return False
+
+        # highest zoom level where the shown part of the route fits in the figure
+        width, height = self.map.get_size_inches() * self.dpi
+        for zoom_level in range(MAP_ZOOM_RANGE[1], MAP_ZOOM_RANGE[0] - 1, -1):
+            x, y = mercator(lat[shown][valid], lon[shown][valid], zoom_level)
+            if (x.max() - x.min()) * TILE_SIZE <= 0.9 * width and (y.max() - y.min()) * TILE_SIZE <= 0.9 * height:
+                break
+        center_x, center_y = (x.min() + x.max()) / 2, (y.min() + y.max()) / 2
+        half_width, half_height = width / TILE_SIZE / 2, height / TILE_SIZE / 2
+        self.map_axes.set_xlim(center_x - half_width, center_x + half_width)
+        self.map_axes.set_ylim(center_y + half_height, center_y - half_height) # rows are counted from the north
+
+        # only the points of the route visible at this zoom level (see Data.route_indices)
+        indices = data.route_indices(zoom_level)
+        route_x, route_y = mercator(lat[indices], lon[indices], zoom_level)
+        self.route_line.set_data(route_x, route_y)
+        in_segment = (indices >= first) & (indices <= last) if highlight else np.zeros(indices.size, dtype=bool)
+        self.segment_route_line.set_data(route_x[in_segment], route_y[in_segment])
+        self.start_marker.set_data(route_x[:1], route_y[:1]) # the ends of the route are always kept
+        self.end_marker.set_data(route_x[-1:], route_y[-1:])
+        self.draw_tiles(zoom_level, center_x - half_width, center_x + half_width, center_y - half_height, center_y + half_height)
+        self.map.savefig(file_path, format=self.image_format)
+        return True
+
+    # Background of the static map : mosaic of the tiles covering [x_min, x_max] x [y_min, y_max] (tile units)
+    def draw_tiles(self, zoom_level, x_min, x_max, y_min, y_max):
+        if self.tile_provider is None:
+            self.tiles_image.set_visible(False)
+            self.attribution.set_text('')
+            return
+        n = 2**zoom_level
+        columns = range(max(int(np.floor(x_min)), 0), min(int(np.floor(x_max)), n - 1) + 1)
+        rows = range(max(int(np.floor(y_min)), 0), min(int(np.floor(y_max)), n - 1) + 1)
+        mosaic = np.ones((len(rows) * TILE_SIZE, len(columns) * TILE_SIZE, 3), dtype=np.float32)
+        for i, tile_y in enumerate(rows):
+            for j, tile_x in enumerate(columns):
+                try:
+                    tile_data = self.tile_provider.tile(zoom_level, tile_x, tile_y)
+                except Exception: # a missing tile leaves a blank square
+                    tile_data = None
+                if tile_data is None:
+                    continue
+                tile = matplotlib.image.imread(io.BytesIO(tile_data))
+                if tile.dtype == np.uint8:
+                    tile = tile / 255.0
+                tile = np.dstack([tile] * 3) if tile.ndim == 2 else tile[..., :3]
+                mosaic[i * TILE_SIZE:(i + 1) * TILE_SIZE, j * TILE_SIZE:(j + 1) * TILE_SIZE] = tile[:TILE_SIZE, :TILE_SIZE]
+        self.tiles_image.set_data(mosaic)
+        self.tiles_image.set_extent((columns[0], columns[-1] + 1, rows[-1] + 1, rows[0]))
+        self.tiles_image.set_visible(True)
+        self.attribution.set_text('© OpenStreetMap contributors')
+
+    # Interactive folium map of the session (see noznum.maps), with the rows first to last highlighted if highlight is True
+    def render_html_map(self, data, first, last, file_path, highlight=False):
+        import folium
+        from noznum.maps import GenerateMap
+        folium_map = GenerateMap(data)
+        if highlight:
+            segment = np.column_stack([data.lat.to_numpy()[first:last + 1], data.lon.to_numpy()[first:last + 1]])
+            segment = segment[~np.isnan(segment).any(axis=1)]
+            if len(segment):
+                folium.PolyLine(np.round(segment, 6).tolist(), color='blue', weight=7, opacity=0.8).add_to(folium_map)
+                folium_map.fit_bounds([segment.min(axis=0).tolist(), segment.max(axis=0).tolist()])
+        else:
+            folium_map.fit_bounds([[data.lat_min, data.lon_min], [data.lat_max, data.lon_max]])
+        folium_map.save(file_path)
+
+    # Plots and maps of a session and of its segments in report_dir, return the paths of the written files
+    def render_session(self, df, report_dir, title, segments=()):
+        os.makedirs(report_dir, exist_ok=True)
+        data = Data(df)
+        if data.df.empty:
+            return []
+        file_paths = []
+        parts = [('session', title, 0, len(data.df) - 1, False)]
+        parts += [(label, f'{title} - {label}', first, last, True) for label, first, last in segments]
+        for name, part_title, first, last, highlight in parts:
+            plots_path = os.path.join(report_dir, f'{name}.{self.image_format}')
+            self.render_plots(data, first, last, part_title, plots_path, segments=() if highlight else segments)
+            file_paths.append(plots_path)
+            map_path = os.path.join(report_dir, f'{name}_map.{self.image_format}')
+            if self.render_map(data, first, last, map_path, highlight=highlight):
+                file_paths.append(map_path)
+            if self.html_maps:
+                html_path = os.path.join(report_dir, f'{name}_map.html')
+                self.render_html_map(data, first, last, html_path, highlight=highlight)
+                file_paths.append(html_path)
+        return file_paths
+
+
+# Create the renderer of a worker process (ProcessPoolExecutor initializer)
+def init_worker(image_format, tiles, html_maps):
+    global RENDERER
+    tile_provider = TileProvider(TileStore()) if tiles else None
+    RENDERER = ReportRenderer(image_format=image_format, tile_provider=tile_provider, html_maps=html_maps)
+
+# Report of one parsed session (runs in a worker process)
+def process_report(parsed_path, file_format, report_dir, title, segments):
+    return RENDERER.render_session(read_df(parsed_path, file_format), report_dir, title, segments)
+
+
+# Render the report of every parsed session of parsed_dir in report_dir with `jobs` processes
+# segments : {parsed path: [(label, first, last), ...]} (see noznum.batch.find_segments). Return {relative path: files}, failed.
+def run_report(parsed_dir, report_dir, file_format='feather', image_format='png', jobs=None, tiles=False, html_maps=True,
+               segments=None, log=sys.stderr):
+    if html_maps and importlib.util.find_spec('folium') is None:
+        print('folium is not installed : the html maps are not written', file=log)
+        html_maps = False
+    parsed_files = find_parsed_files(parsed_dir, file_format)
+    total = len(parsed_files)
+    reports, failed = {}, []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(image_format, tiles, html_maps)) as executor:
+        futures = {}
+        for parsed_path in parsed_files:
+            relative_path = os.path.splitext(os.path.relpath(parsed_path, parsed_dir))[0]
+            session_segments = (segments or {}).get(parsed_path, [])
+            futures[executor.submit(process_report, parsed_path, file_format, os.path.join(report_dir, relative_path),
+                                    relative_path, session_segments)] = relative_path
+        for done, future in enumerate(as_completed(futures), start=1):
+            relative_path = futures[future]
+            try:
+                reports[relative_path] = future.result()
+            except Exception as error: # a broken session must not stop the whole report
+                failed.append((relative_path, error))
+                print(f'[{done}/{total}] FAILED {relative_path}: {error}', file=log)
+                continue
+            print(f'[{done}/{total}] {relative_path} ({len(reports[relative_path])} files, {time.perf_counter() - start:.1f}s)', file=log)
+    return dict(sorted(reports.items())), failed
+
+# Html page linking the files of every session of the report
+def write_index(report_dir, reports):
+    rows = []
+    for relative_path, file_paths in reports.items():
+        links = ' '.join(f'<a href="{html.escape(os.path.relpath(file_path, report_dir))}">{html.escape(os.path.basename(file_path))}</a>'
+                         for file_path in file_paths)
+        rows.append(f'<tr><td>{html.escape(relative_path)}</td><td>{links}</td></tr>')
+    index_path = os.path.join(report_dir, 'index.html')
+    with open(index_path, 'w') as f:
+        f.write('<html><head><meta charset="utf-8"><title>Noz\'Num report</title></head><body>\n'
+                '<table border="1" cellpadding="4"><tr><th>Session</th><th>Files</th></tr>\n' + '\n'.join(rows) + '\n</table></body></html>\n')
+    return index_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m noznum.report', description='Render the plots and maps of the sessions parsed by noznum.batch, without display.')
+    parser.add_argument('parsed_dir', help='output directory of noznum.batch (searched recursively)')
+    parser.add_argument('-o', '--report-dir', required=True, help='directory where the plots, the maps and index.html are written')
+    parser.add_argument('-f', '--format', choices=sorted(OUTPUT_EXTENSIONS), default='feather', help='format of the parsed files (default: feather)')
+    parser.add_argument('--image-format', choices=['png', 'svg'], default='png', help='format of the plots and static maps (default: png)')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes (default: number of CPUs)')
+    parser.add_argument('--no-html', action='store_true', help='do not write the interactive html maps (they need folium)')
+    parser.add_argument('--tiles', action='store_true', help='draw the static maps over the map tiles (tile cache, see noznum.tiles)')
+    add_segment_arguments(parser)
+    args = parser.parse_args(argv)
+    gates, polygon = segment_arguments(parser, args)
+
+    segments = None
+    if gates is not None or polygon is not None:
+        segments = find_segments(find_parsed_files(args.parsed_dir, args.format), args.format, gates=gates, polygon=polygon, label=args.label)
+    reports, failed = run_report(args.parsed_dir, args.report_dir, file_format=args.format, image_format=args.image_format, jobs=args.jobs,
+                                 tiles=args.tiles, html_maps=not args.no_html, segments=segments)
+    os.makedirs(args.report_dir, exist_ok=True)
+    index_path = write_index(args.report_dir, reports)
+    print(f'{len(reports)} sessions rendered, see {index_path}', file=sys.stderr)
+    if failed:
+        print(f'{len(failed)} sessions could not be rendered', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+'''
+Project : Noz'Num
+Description : Level of detail of the route drawn on the map (Douglas-Peucker simplification for every zoom level)
+'''
+import numpy as np
+
+
+# Zoom levels available in the application (see SliderWidget)
+ROUTE_ZOOM_LEVELS = range(3, 19)
+
+# Maximum distance (in screen pixels) between the simplified route and the real one
+ROUTE_PIXEL_TOLERANCE = 1.0
+
+
+# Size of a screen pixel, in degrees of latitude, at a given zoom level of a web mercator map (256 pixels tiles)
+def pixel_size(zoom_level, latitude):
+    return 360.0 * np.cos(np.radians(latitude)) / (256 * 2**zoom_level)
+
+
+# Douglas-Peucker importance of every point of a route
+# A point is kept by the Douglas-Peucker simplification at tolerance `tol` if and only if importance > tol, so the whole
+# pyramid of simplified routes comes from a single pass. The recursion is done level by level : all the segments of a level
+# are split at once with numpy. Segments whose points are all closer than min_tolerance are not split any further.
+def douglas_peucker_importance(x, y, min_tolerance=0.0):
+    n = len(x)
+    importance = np.zeros(n)
+    if n == 0:
+        return importance
+    importance[0] = importance[-1] = np.inf # the ends of the route are always kept
+
+    starts, ends = np.array([0]), np.array([n - 1])
+    caps = np.array([np.inf]) # a point can't be more important than the point that created its segment
+    while starts.size:
+        keep = ends - starts > 1
+        starts, ends, caps = starts[keep], ends[keep], caps[keep]
+        if not starts.size:
+            break
+
+        # interior points of every segment, and the segment they belong to
+        lengths = ends - starts - 1
+        segment = np.repeat(np.arange(starts.size), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        points = starts[segment] + 1 + offsets
+
+        # distance from each interior point to its segment [start, end]
+        ax, ay = x[starts][segment], y[starts][segment]
+        dx, dy = x[ends][segment] - ax, y[ends][segment] - ay
+        length2 = dx * dx + dy * dy
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = np.where(length2 > 0, ((x[points] - ax) * dx + (y[points] - ay) * dy) / length2, 0.0)
+        t = np.clip(t, 0.0, 1.0)
+        distance = np.hypot(x[points] - (ax + t * dx), y[points] - (ay + t * dy))
+
+        # farthest point of every segment
+        segment_start = np.cumsum(lengths) - lengths
+        dmax = np.maximum.reduceat(distance, segment_start)
+        is_max = distance == dmax[segment]
+        first_max = np.unique(segment[is_max], return_index=True)[1]
+        split = points[is_max][first_max]
+
+        split_importance = np.minimum(dmax, caps)
+        importance[split] = split_importance
+
+        # split the segments that are still too far from the route
+        go_on = dmax > min_tolerance
+        split, split_importance = split[go_on], split_importance[go_on]
+        starts, ends = np.concatenate([starts[go_on], split]), np.concatenate([split, ends[go_on]])
+        caps = np.concatenate([split_importance, split_importance])
+    return importance
+
+
+# Indices of the route points drawn at each zoom level, {zoom_level: indices}
+# Points without coordinates are skipped. Consecutive zoom levels keeping the same points share the same array.
+def route_pyramid(lat, lon, zoom_levels=ROUTE_ZOOM_LEVELS, pixel_tolerance=ROUTE_PIXEL_TOLERANCE):
+    lat, lon = np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+    valid = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+    if not valid.size:
+        return {zoom_level: valid for zoom_level in zoom_levels}
+
+    # local equirectangular projection, both axes in degrees of latitude
+    lat_mean = lat[valid].mean()
+    x, y = lon[valid] * np.cos(np.radians(lat_mean)), lat[valid]
+    tolerances = {zoom_level: pixel_tolerance * pixel_size(zoom_level, lat_mean) for zoom_level in zoom_levels}
+    importance = douglas_peucker_importance(x, y, min_tolerance=min(tolerances.values()))
+
+    pyramid = {}
+    previous = None
+    for zoom_level in sorted(zoom_levels):
+        indices = valid[importance > tolerances[zoom_level]]
+        if previous is not None and previous.size == indices.size:
+            indices = previous # levels only add points, the same size means the same points
+        pyramid[zoom_level] = previous = indices
+    return pyramid
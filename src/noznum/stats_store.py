@@ -0,0 +1,144 @@
+'''
+Project : Noz'Num
+Description : Statistics of the labelled segments, stored in a SQLite database (standard library, no server)
+'''
+import os
+import sqlite3
+import tempfile
+import numpy as np
+import pandas as pd
+
+
+# Columns of the statistics of a segment (same order as the stats.csv files written by the previous versions)
+STATS_COLUMNS = ['paricipant_number', 'dataset_number', 'label', 'avg_heart_rate', 'std_heart_rate', 'avg_altitude', 'std_altitude',
+                 'avg_speed', 'std_speed', 'route_duration', 'distance',
+                 'global_avg_heart_rate', 'global_std_heart_rate', 'global_avg_altitude', 'global_std_altitude',
+                 'global_avg_speed', 'global_std_speed', 'global_route_duration', 'global_distance']
+
+# Columns stored as text, the others are numbers
+STATS_TEXT_COLUMNS = ['paricipant_number', 'dataset_number', 'label', 'route_duration', 'global_route_duration']
+
+# How long a writer waits for another one to release the database, in seconds
+STATS_BUSY_TIMEOUT = 30
+
+
+# Statistics database. Every row is inserted in a transaction, so several processes (application, batch runs...) can write
+# to the same file without corrupting it. Rows are indexed by participant and by label.
+# export_csv() writes the table with the layout of the stats.csv files (index column, then STATS_COLUMNS).
+# legacy_csv_path : stats.csv file written by the previous versions, imported in the database once (see import_legacy_csv)
+class StatsStore():
+    def __init__(self, db_path, legacy_csv_path=None):
+        self.db_path = db_path
+        columns = ', '.join(f'{column} {"TEXT" if column in STATS_TEXT_COLUMNS else "REAL"}' for column in STATS_COLUMNS)
+        connection = self.connect()
+        try:
+            connection.execute('PRAGMA journal_mode=WAL') # readers don't block the writers
+            with connection:
+                connection.execute(f'CREATE TABLE IF NOT EXISTS stats (id INTEGER PRIMARY KEY AUTOINCREMENT, {columns})')
+                connection.execute('CREATE INDEX IF NOT EXISTS stats_participant ON stats (paricipant_number, dataset_number)')
+                connection.execute('CREATE INDEX IF NOT EXISTS stats_label ON stats (label)')
+                connection.execute('CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)')
+        finally:
+            connection.close()
+        if legacy_csv_path is not None:
+            self.import_legacy_csv(legacy_csv_path)
+
+    def connect(self):
+        return sqlite3.connect(self.db_path, timeout=STATS_BUSY_TIMEOUT)
+
+    # Insert the rows of a dataframe with the STATS_COLUMNS columns, all in one transaction
+    # With csv_file_path, the new rows are also appended to this csv file (layout of export_csv, the whole table is written if
+    # the file doesn't exist), while the database is locked : writers append their rows one after the other.
+    def insert(self, stats_df, csv_file_path=None):
+        rows = [tuple(to_sql_value(value) for value in row) for row in stats_df.reindex(columns=STATS_COLUMNS).itertuples(index=False)]
+        placeholders = ', '.join('?' * len(STATS_COLUMNS))
+        connection = self.connect()
+        try:
+            with connection:
+                connection.execute('BEGIN IMMEDIATE')
+                connection.executemany(f'INSERT INTO stats ({", ".join(STATS_COLUMNS)}) VALUES ({placeholders})', rows)
+                if csv_file_path is not None and os.path.isfile(csv_file_path):
+                    last_id = connection.execute('SELECT MAX(id) FROM stats').fetchone()[0]
+                    new_df = stats_df.reindex(columns=STATS_COLUMNS).set_axis(np.arange(last_id - len(rows), last_id)) # ids - 1
+                    with open(csv_file_path, 'a', newline='') as f:
+                        new_df.to_csv(f, header=False)
+                elif csv_file_path is not None:
+                    write_csv(read_stats(connection), csv_file_path)
+        finally:
+            connection.close()
+        return len(rows)
+
+    # Statistics of a participant and/or a label (all of them by default), in insertion order
+    def query(self, participant=None, label=None):
+        connection = self.connect()
+        try:
+            return read_stats(connection, participant=participant, label=label).reset_index(drop=True)
+        finally:
+            connection.close()
+
+    # Write the statistics (or those of a participant/label) to a csv file with the layout of the stats.csv files : an unnamed
+    # index column (row numbers) then the STATS_COLUMNS columns
+    def export_csv(self, csv_file_path, participant=None, label=None):
+        connection = self.connect()
+        try:
+            stats_df = read_stats(connection, participant=participant, label=label)
+        finally:
+            connection.close()
+        write_csv(stats_df, csv_file_path)
+
+    # Insert the rows of a stats.csv file written by the previous versions (with or without their index column)
+    def import_csv(self, csv_file_path):
+        stats_df = pd.read_csv(csv_file_path, dtype={column: str for column in STATS_TEXT_COLUMNS})
+        return self.insert(stats_df)
+
+    # Import the stats.csv file of the previous versions, once : a marker row of the metadata table is written in the same
+    # transaction, so two processes opening a new database together don't import it twice. Return the number of imported rows.
+    def import_legacy_csv(self, csv_file_path):
+        connection = self.connect()
+        try:
+            with connection:
+                connection.execute('BEGIN IMMEDIATE')
+                if connection.execute("SELECT 1 FROM metadata WHERE name = 'legacy_csv_imported'").fetchone() is not None:
+                    return 0
+                rows = []
+                # a database of a version without the marker already has the rows of the csv file
+                if os.path.isfile(csv_file_path) and connection.execute('SELECT 1 FROM stats').fetchone() is None:
+                    stats_df = pd.read_csv(csv_file_path, dtype={column: str for column in STATS_TEXT_COLUMNS})
+                    rows = [tuple(to_sql_value(value) for value in row) for row in stats_df.reindex(columns=STATS_COLUMNS).itertuples(index=False)]
+                    placeholders = ', '.join('?' * len(STATS_COLUMNS))
+                    connection.executemany(f'INSERT INTO stats ({", ".join(STATS_COLUMNS)}) VALUES ({placeholders})', rows)
+                connection.execute("INSERT INTO metadata VALUES ('legacy_csv_imported', ?)", (os.path.abspath(csv_file_path),))
+        finally:
+            connection.close()
+        return len(rows)
+
+
+# Statistics of a participant and/or a label (all of them by default), in insertion order, indexed by row number (id - 1)
+def read_stats(connection, participant=None, label=None):
+    conditions, parameters = [], []
+    if participant is not None:
+        conditions.append('paricipant_number = ?')
+        parameters.append(participant)
+    if label is not None:
+        conditions.append('label = ?')
+        parameters.append(label)
+    where = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+    stats_df = pd.read_sql_query(f'SELECT id, {", ".join(STATS_COLUMNS)} FROM stats{where} ORDER BY id', connection, params=parameters)
+    return stats_df.set_index(stats_df.pop('id') - 1).rename_axis(None)
+
+# Write statistics to a csv file, through a temporary file
+def write_csv(stats_df, csv_file_path):
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(csv_file_path))) # one per writer
+    try:
+        with os.fdopen(fd, 'w', newline='') as f:
+            stats_df.to_csv(f)
+        os.replace(tmp_path, csv_file_path) # atomic, a reader never sees a half written file
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+# Convert a dataframe value for sqlite3 (missing values are NULL, numpy scalars are not understood)
+def to_sql_value(value):
+    if pd.isna(value):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
@@ -0,0 +1,300 @@
+'''
+Project : Noz'Num
+Description : Local cache of the map tiles (and of the javascript/css files of the map page), so the map works offline
+
+The tiles are stored in an MBTiles file (SQLite, standard library) : tiles seen once are never downloaded again, and the
+tiles around a session can be downloaded in advance (seed). The map page gets them through the noznum:// url scheme
+served by the application (see TileSchemeHandler in noznum.gui), from the cache or from the tile server when they are missing.
+
+Usage : python -m noznum.tiles FILE [--zoom MIN MAX]   (download the tiles around the route of a session file)
+'''
+import os
+import re
+import math
+import time
+import sqlite3
+import argparse
+import urllib.parse
+import urllib.request
+
+
+##~##~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ TILE STORE ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# Tile cache file, its maximum size, and the tile server used when a tile is not cached
+DEFAULT_TILE_DB_PATH = os.environ.get('NOZNUM_TILE_DB', os.path.join(os.path.expanduser('~'), '.noznum', 'tiles.mbtiles'))
+DEFAULT_TILE_CACHE_MAX_BYTES = int(float(os.environ.get('NOZNUM_TILE_CACHE_MB', 512)) * 2**20)
+TILE_URL = os.environ.get('NOZNUM_TILE_URL', 'https://tile.openstreetmap.org/{z}/{x}/{y}.png')
+TILE_ATTRIBUTION = '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
+
+# NOZNUM_OFFLINE=1 : never download, only the cached tiles are shown
+OFFLINE = os.environ.get('NOZNUM_OFFLINE', '0') not in ('', '0')
+
+# The tile servers require an identified client (https://operations.osmfoundation.org/policies/tiles/)
+USER_AGENT = 'NozNum-Visualization-Tool (tile cache)'
+DOWNLOAD_TIMEOUT_S = 10
+
+# Url scheme of the tiles and of the files of the map page, served by the application
+TILE_SCHEME = 'noznum'
+LOCAL_TILE_URL = TILE_SCHEME + '://tiles/{z}/{x}/{y}.png'
+
+# Seeding limits : zoom levels around the default zoom of the map, and a maximum number of tiles per seed (fair use of the tile server)
+SEED_ZOOM_RANGE = (10, 16)
+SEED_MAX_TILES = 5000
+
+# The seed stops after this number of failed downloads in a row (no connection)
+SEED_MAX_FAILURES = 5
+
+# Evicted tiles are deleted by batches, down to this fraction of the maximum size (so an eviction isn't run on every new tile)
+EVICT_TARGET = 0.9
+
+
+# MBTiles file of map tiles (zoom_level, tile_column, tile_row in the TMS scheme : rows counted from the south)
+# Every tile remembers when it was last used : when the file grows over max_bytes, the least recently used tiles are deleted.
+# The size of the tiles is kept up to date in a `cache_size` table, in the transaction that adds or deletes the tiles.
+# The javascript and css files of the map page are kept in an `assets` table of the same file (they are never evicted).
+class TileStore():
+    def __init__(self, db_path=DEFAULT_TILE_DB_PATH, max_bytes=DEFAULT_TILE_CACHE_MAX_BYTES):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        connection = self.connect()
+        try:
+            connection.execute('PRAGMA journal_mode=WAL')
+            with connection:
+                connection.execute('CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)')
+                connection.execute('CREATE TABLE IF NOT EXISTS tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, '
+                                   'tile_data BLOB, size INTEGER, last_used REAL, PRIMARY KEY (zoom_level, tile_column, tile_row))')
+                connection.execute('CREATE INDEX IF NOT EXISTS tiles_last_used ON tiles (last_used)')
+                connection.execute('CREATE TABLE IF NOT EXISTS assets (url TEXT PRIMARY KEY, content_type TEXT, data BLOB)')
+                connection.execute('CREATE TABLE IF NOT EXISTS cache_size (total_bytes INTEGER)')
+                if connection.execute('SELECT 1 FROM cache_size').fetchone() is None: # new file, or written by an older version
+                    connection.execute('INSERT INTO cache_size SELECT COALESCE(SUM(size), 0) FROM tiles')
+                connection.executemany('INSERT OR IGNORE INTO metadata VALUES (?, ?)', [('name', 'noznum tile cache'), ('format', 'png'),
+                                                                                         ('type', 'baselayer'), ('attribution', TILE_ATTRIBUTION)])
+        finally:
+            connection.close()
+
+    def connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    # Tile z/x/y (xyz scheme, like the tile servers), None if it is not cached
+    def get(self, z, x, y):
+        connection = self.connect()
+        try:
+            with connection:
+                row = connection.execute('SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?',
+                                         (z, x, tms_row(z, y))).fetchone()
+                if row is not None:
+                    connection.execute('UPDATE tiles SET last_used = ? WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?',
+                                       (time.time(), z, x, tms_row(z, y)))
+        finally:
+            connection.close()
+        return None if row is None else bytes(row[0])
+
+    def __contains__(self, tile):
+        z, x, y = tile
+        connection = self.connect()
+        try:
+            return connection.execute('SELECT 1 FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?',
+                                      (z, x, tms_row(z, y))).fetchone() is not None
+        finally:
+            connection.close()
+
+    def put(self, z, x, y, tile_data):
+        connection = self.connect()
+        try:
+            with connection:
+                connection.execute('BEGIN IMMEDIATE') # the size of a replaced tile can't change before it is added
+                row = connection.execute('SELECT size FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?',
+                                         (z, x, tms_row(z, y))).fetchone()
+                connection.execute('INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?, ?, ?)',
+                                   (z, x, tms_row(z, y), tile_data, len(tile_data), time.time()))
+                connection.execute('UPDATE cache_size SET total_bytes = total_bytes + ?', (len(tile_data) - (row[0] if row else 0),))
+                total = connection.execute('SELECT total_bytes FROM cache_size').fetchone()[0]
+        finally:
+            connection.close()
+        if total > self.max_bytes:
+            self.evict()
+
+    # Size of the cached tiles in bytes
+    def total_bytes(self):
+        connection = self.connect()
+        try:
+            return connection.execute('SELECT total_bytes FROM cache_size').fetchone()[0]
+        finally:
+            connection.close()
+
+    # Delete the least recently used tiles until the cache is under EVICT_TARGET * max_bytes, return the number of deleted tiles
+    def evict(self):
+        connection = self.connect()
+        try:
+            with connection:
+                connection.execute('BEGIN IMMEDIATE')
+                total = connection.execute('SELECT total_bytes FROM cache_size').fetchone()[0]
+                excess = total - EVICT_TARGET * self.max_bytes
+                if excess <= 0:
+                    return 0
+                tiles, freed = [], 0
+                for z, column, row, size in connection.execute('SELECT zoom_level, tile_column, tile_row, size FROM tiles ORDER BY last_used'):
+                    if freed >= excess:
+                        break
+                    tiles.append((z, column, row))
+                    freed += size
+                connection.executemany('DELETE FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?', tiles)
+                connection.execute('UPDATE cache_size SET total_bytes = total_bytes - ?', (freed,))
+        finally:
+            connection.close()
+        return len(tiles)
+
+    # Cached file of the map page : (content type, data), None if it is not cached
+    def get_asset(self, url):
+        connection = self.connect()
+        try:
+            row = connection.execute('SELECT content_type, data FROM assets WHERE url = ?', (url,)).fetchone()
+        finally:
+            connection.close()
+        return None if row is None else (row[0], bytes(row[1]))
+
+    def put_asset(self, url, content_type, data):
+        connection = self.connect()
+        try:
+            with connection:
+                connection.execute('INSERT OR REPLACE INTO assets VALUES (?, ?, ?)', (url, content_type, data))
+        finally:
+            connection.close()
+
+
+# Row of a tile in the TMS scheme of the MBTiles files (the xyz scheme of the tile servers counts the rows from the north)
+def tms_row(z, y):
+    return (1 << z) - 1 - y
+
+# Download a url, return (content type, data)
+def download(url):
+    request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+    with urllib.request.urlopen(request, timeout=DOWNLOAD_TIMEOUT_S) as response:
+        return response.headers.get_content_type(), response.read()
+
+
+##~##~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ TILE PROVIDER ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# Tiles and page files from the cache, downloaded (and cached) when they are missing, unless offline
+class TileProvider():
+    def __init__(self, store, tile_url=TILE_URL, offline=OFFLINE):
+        self.store = store
+        self.tile_url = tile_url
+        self.offline = offline
+
+    # Png data of the tile z/x/y, None if it is not cached and can't be downloaded
+    def tile(self, z, x, y):
+        tile_data = self.store.get(z, x, y)
+        if tile_data is None and not self.offline:
+            tile_data = self.fetch(z, x, y)
+        return tile_data
+
+    # Download the tile z/x/y into the cache (even offline : used to seed the cache), None if it can't be downloaded
+    def fetch(self, z, x, y):
+        try:
+            _, tile_data = download(self.tile_url.format(z=z, x=x, y=y))
+        except OSError:
+            return None
+        self.store.put(z, x, y, tile_data)
+        return tile_data
+
+    # (content type, data) of a javascript/css file of the map page, None if it is not cached and can't be downloaded
+    def asset(self, url):
+        asset = self.store.get_asset(url)
+        if asset is None and not self.offline:
+            try:
+                asset = download(url)
+            except OSError:
+                return None
+            self.store.put_asset(url, *asset)
+        return asset
+
+    # Serve a noznum:// url : tile or page file, return (content type, data) or None
+    def serve(self, url):
+        parts = urllib.parse.urlsplit(url)
+        if parts.netloc == 'tiles':
+            match = re.fullmatch(r'/(\d+)/(\d+)/(\d+)\.png', parts.path)
+            if match is None:
+                return None
+            tile_data = self.tile(*(int(value) for value in match.groups()))
+            return None if tile_data is None else ('image/png', tile_data)
+        if parts.netloc == 'assets':
+            return self.asset(urllib.parse.parse_qs(parts.query).get('url', [''])[0])
+        return None
+
+
+# Html of a map page whose javascript and css files are served by the application (noznum://assets?url=...) instead of the
+# web, so the page works offline once they have been cached
+def localize_assets(html):
+    def local_url(match):
+        return f'{match.group(1)}="{TILE_SCHEME}://assets?url={urllib.parse.quote(match.group(2), safe="")}"'
+    return re.sub(r'(src|href)="(https?://[^"]+\.(?:js|css))"', local_url, html)
+
+
+##~##~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ SEEDING ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# Column and row (xyz scheme) of the tile containing a point at a zoom level
+def tile_of(lat, lon, z):
+    n = 1 << z
+    lat = min(max(lat, -85.0511), 85.0511) # limits of the web mercator projection
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+# Tiles (z, x, y) covering a bounding box for the zoom levels zoom_min to zoom_max
+def tiles_in_bounds(lat_min, lat_max, lon_min, lon_max, zoom_min, zoom_max):
+    for z in range(zoom_min, zoom_max + 1):
+        x_min, y_min = tile_of(lat_max, lon_min, z) # rows are counted from the north
+        x_max, y_max = tile_of(lat_min, lon_max, z)
+        for x in range(x_min, x_max + 1):
+            for y in range(y_min, y_max + 1):
+                yield z, x, y
+
+# Cache the tiles of the bounding box of a session (noznum.core.Data) that are not cached yet
+# progress(done, total) is called after each tile. Returns (downloaded tiles, tiles that could not be downloaded), the seed
+# stops after SEED_MAX_FAILURES failures in a row.
+# Raises ValueError if the box needs more than max_tiles tiles (reduce the zoom range).
+def seed(provider, data, zoom_min=SEED_ZOOM_RANGE[0], zoom_max=SEED_ZOOM_RANGE[1], max_tiles=SEED_MAX_TILES, progress=None):
+    tiles = [tile for tile in tiles_in_bounds(data.lat_min, data.lat_max, data.lon_min, data.lon_max, zoom_min, zoom_max)
+             if tile not in provider.store]
+    if len(tiles) > max_tiles:
+        raise ValueError(f'{len(tiles)} tiles to download for zoom levels {zoom_min} to {zoom_max} (at most {max_tiles})')
+    downloaded, failures = 0, 0
+    for done, (z, x, y) in enumerate(tiles, start=1):
+        if provider.fetch(z, x, y) is None:
+            failures += 1
+            if failures == SEED_MAX_FAILURES:
+                break
+        else:
+            downloaded += 1
+            failures = 0
+        if progress is not None:
+            progress(done, len(tiles))
+    return downloaded, done - downloaded if tiles else 0
+
+
+def main(argv=None):
+    from noznum.core import Data
+    from noznum.readers import read_session
+    parser = argparse.ArgumentParser(description='Download the map tiles around the route of a session, for offline use')
+    parser.add_argument('file', help='session file (.tcx, .gpx, .fit or .csv)')
+    parser.add_argument('--zoom', type=int, nargs=2, default=SEED_ZOOM_RANGE, metavar=('MIN', 'MAX'), help='zoom levels (default: %(default)s)')
+    parser.add_argument('--max-tiles', type=int, default=SEED_MAX_TILES, help='maximum number of tiles to download (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    provider = TileProvider(TileStore(), offline=False)
+    downloaded, failed = seed(provider, Data(read_session(args.file)), *args.zoom, max_tiles=args.max_tiles)
+    print(f'{downloaded} tiles downloaded, {failed} failed, cache : {provider.store.total_bytes() / 2**20:.1f} MB in {provider.store.db_path}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
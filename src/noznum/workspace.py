@@ -0,0 +1,109 @@
+'''
+Project : Noz'Num
+Description : Workspace of the sessions opened in the application, kept in memory within a memory budget
+'''
+import os
+import itertools
+from noznum.core import Data
+from noznum.geofence import SpatialIndex
+
+
+# How much memory the sessions of the workspace may use (the displayed sessions are always kept)
+DEFAULT_WORKSPACE_MAX_BYTES = int(float(os.environ.get('NOZNUM_WORKSPACE_MAX_MB', 256)) * 2**20)
+
+
+# A session of the workspace : a file, the reader used to parse it and its Data when it is in memory
+class Session():
+    def __init__(self, session_id, file_path, reader, label):
+        self.session_id = session_id
+        self.file_path = file_path
+        self.reader = reader
+        self.label = label
+        self.data = None # None when the session is evicted from memory
+        self.n_bytes = 0
+        self.visible = True # drawn over the active session
+        self.segments = [] # labelled segments (noznum.core.Segment), kept when the data are evicted
+        self.last_viewed = 0
+
+    @property
+    def loaded(self):
+        return self.data is not None
+
+
+# Sessions opened at the same time (several participants, repeated runs...)
+# The sessions share a memory budget : when it is exceeded, the least recently viewed sessions are dropped from memory and
+# read again from their on-disk form (the session cache, or the source file if the cache is disabled) when they are viewed again.
+class Workspace():
+    def __init__(self, session_cache, max_bytes=DEFAULT_WORKSPACE_MAX_BYTES):
+        self.session_cache = session_cache
+        self.max_bytes = max_bytes
+        self.sessions = {} # session_id -> Session, in opening order
+        self.view_counter = itertools.count(1)
+
+    def __iter__(self):
+        return iter(self.sessions.values())
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def __contains__(self, session_id):
+        return session_id in self.sessions
+
+    def __getitem__(self, session_id):
+        return self.sessions[session_id]
+
+    # Add the dataframe of a file to the workspace (or replace it if the file is already open) and return its session
+    def add(self, file_path, reader, df):
+        session_id = os.path.abspath(file_path)
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = Session(session_id, file_path, reader, os.path.basename(file_path))
+            self.sessions[session_id] = session
+        session.reader = reader
+        self.set_data(session, Data(df=df))
+        return session
+
+    def remove(self, session_id):
+        self.sessions.pop(session_id, None)
+
+    # Data of a session, read again from disk if it was evicted. Viewing a session makes it the most recently viewed.
+    def data(self, session_id):
+        session = self.sessions[session_id]
+        if not session.loaded:
+            self.set_data(session, Data(df=self.session_cache.load(session.file_path, session.reader)))
+        session.last_viewed = next(self.view_counter)
+        return session.data
+
+    def set_data(self, session, data):
+        session.data = data
+        session.n_bytes = data.memory_usage()
+        session.last_viewed = next(self.view_counter)
+
+    # Memory used by the sessions in memory, in bytes
+    def memory_usage(self):
+        return sum(session.n_bytes for session in self.sessions.values() if session.loaded)
+
+    # Drop the least recently viewed sessions from memory until the workspace fits in max_bytes
+    # The sessions in `keep` (the displayed ones) are never evicted. Return the evicted sessions.
+    def evict(self, keep=()):
+        evicted = []
+        total = self.memory_usage()
+        candidates = [session for session in self.sessions.values() if session.loaded and session.session_id not in keep]
+        for session in sorted(candidates, key=lambda session: session.last_viewed):
+            if total <= self.max_bytes:
+                break
+            total -= session.n_bytes
+            session.data = None
+            session.n_bytes = 0
+            evicted.append(session)
+        return evicted
+
+    # Spatial index (noznum.geofence) of the points of all the sessions, keyed by session id
+    # Evicted sessions are read again one after the other, and dropped again to stay within the memory budget.
+    def spatial_index(self, keep=()):
+        index = SpatialIndex()
+        for session in list(self.sessions.values()):
+            data = self.data(session.session_id)
+            index.add(session.session_id, data.lat.to_numpy(), data.lon.to_numpy())
+            self.evict(keep=keep)
+        return index
@@ -0,0 +1,12 @@
+'''
+Project : Noz'Num
+Description : Configuration of the tests : noznum is imported from src/, the synthetic sessions from benchmarks/
+
+Usage : python -m pytest tests
+'''
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
@@ -0,0 +1,37 @@
+'''
+Project : Noz'Num
+Description : Tests of the batch processing of a directory tree of session files (noznum.batch)
+'''
+import os
+import pandas as pd
+import pytest
+from noznum.batch import run_batch, find_parsed_files, read_df, main
+from synthetic import write_tcx, write_gpx, write_fit
+
+pytest.importorskip('pyarrow')
+
+
+# Sessions with the same name in different formats, in the same participant directory, are saved in different files
+def test_same_name_different_formats(tmp_path):
+    data_dir, output_dir = tmp_path / 'data', tmp_path / 'output'
+    os.makedirs(data_dir / 'p01')
+    write_tcx(str(data_dir / 'p01' / 'a.tcx'), 100)
+    write_gpx(str(data_dir / 'p01' / 'a.gpx'), 200)
+    write_fit(str(data_dir / 'p01' / 'a.fit'), 300)
+    stats_df, failed = run_batch(str(data_dir), str(output_dir), jobs=1)
+    assert not failed
+    assert list(stats_df['dataset_number']) == ['a.fit', 'a.gpx', 'a.tcx']
+    parsed_files = find_parsed_files(str(output_dir), 'feather')
+    assert [os.path.relpath(path, output_dir) for path in parsed_files] == [os.path.join('p01', name) for name in ['a.fit.feather', 'a.gpx.feather', 'a.tcx.feather']]
+    assert [len(read_df(path, 'feather')) for path in parsed_files] == [300, 200, 100]
+
+def test_main(tmp_path, capsys):
+    data_dir, output_dir = tmp_path / 'data', tmp_path / 'output'
+    os.makedirs(data_dir / 'p01')
+    os.makedirs(data_dir / 'p02')
+    write_tcx(str(data_dir / 'p01' / 'a.tcx'), 100)
+    write_tcx(str(data_dir / 'p02' / 'a.tcx'), 100, seed=1)
+    assert main([str(data_dir), '-o', str(output_dir), '--jobs', '1', '--format', 'csv']) == 0
+    stats_df = pd.read_csv(output_dir / 'global_stats.csv')
+    assert list(stats_df['paricipant_number']) == ['p01', 'p02']
+    assert os.path.isfile(output_dir / 'p02' / 'a.tcx.csv')
@@ -0,0 +1,116 @@
+'''
+Project : Noz'Num
+Description : Regression checks of the hot paths, runnable with pytest (see benchmarks/bench_suite.py for the full benchmarks)
+
+Times measured on a shared machine vary too much for absolute limits. These checks compare the time of every hot path on
+a session and on a session SCALE times larger : the paths are linear (or O(log n) per query), a path becoming quadratic
+is caught whatever the speed of the machine.
+With NOZNUM_BENCH_BASELINE=baseline.json (written by bench_suite.py on a reference commit), the benchmark suite is also run
+on the sizes of the baseline and every case slower than the baseline by more than NOZNUM_BENCH_THRESHOLD (0.2) fails.
+'''
+import os
+import gc
+import json
+import time
+import numpy as np
+import pytest
+from noznum.core import tcx_to_df, csv_to_df, Data
+from noznum.readers import gpx_to_df, fit_to_df
+from noznum.decimation import M4Decimator
+from noznum.geofence import SpatialIndex, Gate, gate_segments
+from synthetic import write_tcx, write_csv, write_gpx, write_fit
+import bench_suite
+
+
+# Sizes of the sessions compared, and the largest time ratio accepted for paths linear in the size of the session
+# (a quadratic path takes about SCALE**2 times longer)
+SMALL_SIZE = 4000
+SCALE = 8
+MAX_LINEAR_RATIO = SCALE * 2.5
+
+
+# Best time of function() in seconds
+def best_time(function, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+# Time ratio of a case built for the large and the small session : case(n_points) returns the function to time
+def scaling_ratio(case):
+    small, large = case(SMALL_SIZE), case(SMALL_SIZE * SCALE)
+    return best_time(large) / best_time(small)
+
+
+@pytest.fixture(scope='module')
+def sessions(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp('sessions')
+    paths = {}
+    for n_points in (SMALL_SIZE, SMALL_SIZE * SCALE):
+        for extension, write in (('tcx', write_tcx), ('csv', write_csv), ('gpx', write_gpx), ('fit', write_fit)):
+            paths[extension, n_points] = write(str(data_dir / f'{n_points}.{extension}'), n_points, missing_hr=0.1)
+    return paths
+
+
+@pytest.mark.parametrize('reader', [tcx_to_df, csv_to_df, gpx_to_df, fit_to_df], ids=lambda reader: reader.__name__)
+def test_readers_scale_linearly(sessions, reader):
+    assert scaling_ratio(lambda n_points: lambda: reader(sessions[reader.__name__[:3], n_points])) < MAX_LINEAR_RATIO
+
+def test_data_scales_linearly(sessions):
+    dfs = {n_points : tcx_to_df(sessions['tcx', n_points]) for n_points in (SMALL_SIZE, SMALL_SIZE * SCALE)}
+    assert scaling_ratio(lambda n_points: lambda: Data(dfs[n_points])) < MAX_LINEAR_RATIO
+
+# The statistics of a segment come from prefix sums : the time of 200 segments does not depend on the size of the session
+def test_segment_stats_do_not_scale(sessions):
+    def case(n_points):
+        data = Data(tcx_to_df(sessions['tcx', n_points]))
+        data.prefix_stats, data.global_stats # computed once per session
+        ranges = np.linspace(0, n_points - 51, 200).astype(int)
+        return lambda: [data.segment_stats(first, first + 50, 'label') for first in ranges]
+    # the slices of distances and times read by segment_stats still depend a little on the size of the session
+    assert scaling_ratio(case) < 4
+
+# The decimated plot of a session has a few points per pixel column whatever the size of the session
+def test_decimation_scales_linearly():
+    def case(n_points):
+        x = np.arange(n_points, dtype=np.float64)
+        decimator = M4Decimator(x, np.sin(x / 100))
+        return lambda: decimator.indices(x[0], x[-1], 1000)
+    assert scaling_ratio(case) < MAX_LINEAR_RATIO
+
+# Gate queries on the spatial index only test the points of the cells around the gates
+def test_gate_queries_do_not_scale():
+    def case(n_sessions):
+        rng = np.random.default_rng(0)
+        index = SpatialIndex()
+        for i in range(n_sessions // 100):
+            index.add(i, 48.39 + rng.uniform(-0.1, 0.1, 1000), -4.48 + rng.uniform(-0.1, 0.1, 1000))
+        index.build()
+        return lambda: gate_segments(index, Gate(48.39, -4.48), Gate(48.40, -4.47))
+    # 40 then 320 sessions : the points inside the gates grow with the number of sessions, the others are never tested.
+    # The query time stays about the same (ratio close to 1), a linear scan would give about SCALE.
+    assert scaling_ratio(case) < 4
+
+
+# Every case of the benchmark suite runs on a small session
+def test_bench_suite_runs(tmp_path):
+    with open(os.devnull, 'w') as log:
+        results = bench_suite.run_suite([1000], str(tmp_path), repeat=1, log=log)
+    cases = {row['case'] for row in results}
+    assert {'tcx_to_df', 'csv_to_df', 'gpx_to_df', 'fit_to_df', 'Data', 'compute_stats'} <= cases
+    assert all(row['seconds'] > 0 for row in results)
+
+# The benchmark suite against a baseline of a reference commit, when one is given
+@pytest.mark.skipif(not os.environ.get('NOZNUM_BENCH_BASELINE'), reason='no NOZNUM_BENCH_BASELINE json file')
+def test_no_regression_against_baseline(tmp_path):
+    with open(os.environ['NOZNUM_BENCH_BASELINE']) as f:
+        baseline = json.load(f)
+    sizes = sorted({row['n_points'] for row in baseline['results']})
+    with open(os.devnull, 'w') as log:
+        results = bench_suite.run_suite(sizes, str(tmp_path), repeat=3, log=log)
+    threshold = float(os.environ.get('NOZNUM_BENCH_THRESHOLD', 0.2))
+    regressions = [row[:5] for row in bench_suite.compare(results, baseline, threshold) if row[-1]]
+    assert not regressions
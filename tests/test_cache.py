@@ -0,0 +1,47 @@
+'''
+Project : Noz'Num
+Description : Tests of the on-disk cache of the parsed sessions (noznum.cache)
+'''
+import os
+import shutil
+import pytest
+from noznum.cache import SessionCache
+from noznum.core import tcx_to_df
+from synthetic import write_tcx
+
+pytest.importorskip('pyarrow')
+
+
+# Two identical files in two participant directories keep their own file and directory names
+def test_identical_files_of_two_participants(tmp_path):
+    cache = SessionCache(str(tmp_path / 'cache'))
+    os.makedirs(tmp_path / 'p01')
+    os.makedirs(tmp_path / 'p02')
+    write_tcx(str(tmp_path / 'p01' / 'a.tcx'), 50)
+    shutil.copyfile(tmp_path / 'p01' / 'a.tcx', tmp_path / 'p02' / 'a.tcx')
+
+    first = cache.load(str(tmp_path / 'p01' / 'a.tcx'), tcx_to_df)
+    second = cache.load(str(tmp_path / 'p02' / 'a.tcx'), tcx_to_df)
+    assert first['dir_name'].iloc[0] == 'p01'
+    assert second['dir_name'].iloc[0] == 'p02'
+    # and again from the cache entries
+    assert cache.load(str(tmp_path / 'p01' / 'a.tcx'), tcx_to_df)['dir_name'].iloc[0] == 'p01'
+    assert cache.load(str(tmp_path / 'p02' / 'a.tcx'), tcx_to_df)['dir_name'].iloc[0] == 'p02'
+
+
+# A cached session is the parsed one, no temporary file is left and deleted sources are removed from the index
+def test_entries_and_index(tmp_path):
+    cache = SessionCache(str(tmp_path / 'cache'))
+    file_path = str(tmp_path / 'a.tcx')
+    write_tcx(file_path, 50)
+    parsed = tcx_to_df(file_path)
+    assert cache.load(file_path, tcx_to_df).equals(parsed)
+    assert cache.load(file_path, tcx_to_df).equals(parsed)
+    assert not [name for name in os.listdir(cache.cache_dir) if name.endswith('.tmp')]
+    assert os.path.abspath(file_path) in cache.read_index()
+
+    os.remove(file_path)
+    other_path = str(tmp_path / 'b.tcx')
+    write_tcx(other_path, 30, seed=1)
+    cache.load(other_path, tcx_to_df)
+    assert list(cache.read_index()) == [os.path.abspath(other_path)]
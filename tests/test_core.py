@@ -0,0 +1,105 @@
+'''
+Project : Noz'Num
+Description : Tests of the data layer (noznum.core) : timestamps, sessions and statistics of their segments
+'''
+import numpy as np
+import pandas as pd
+import pytest
+from noznum import core
+from noznum.core import PrefixStats, Data, tcx_to_df, csv_to_df, compute_stats, decode_timestamps
+from synthetic import write_tcx, write_csv, MIDNIGHT_START
+
+
+##~##~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ SEGMENT STATISTICS ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# Heart rate like values with NaN gaps : a single NaN, a run of NaN and an all-NaN range at the end
+def values_with_gaps(n=1000, seed=0):
+    values = 140 + 20 * np.random.default_rng(seed).standard_normal(n)
+    values[5] = np.nan
+    values[100:160] = np.nan
+    values[-20:] = np.nan
+    return pd.Series(values)
+
+def assert_mean_std(prefix, series, first, last):
+    mean, std = prefix.mean_std(first, last)
+    expected = series.iloc[first:last + 1]
+    np.testing.assert_allclose([mean, std], [expected.mean(), expected.std()], rtol=1e-9, atol=1e-9, equal_nan=True)
+
+@pytest.mark.parametrize('first, last', [
+    (0, 999), (0, 0), (3, 3), (5, 5), (100, 159), (980, 999), # whole series, single points, single NaN, all NaN ranges
+    (4, 6), (99, 101), (90, 170), (158, 161), (0, 980), (500, 999), # ranges containing NaN
+    (200, 201), (10, 99), (161, 979), # ranges without NaN
+])
+def test_prefix_stats_ranges(first, last):
+    series = values_with_gaps()
+    assert_mean_std(PrefixStats(series), series, first, last)
+
+def test_prefix_stats_every_range():
+    series = values_with_gaps(n=60, seed=1)
+    series[20:30] = np.nan
+    prefix = PrefixStats(series)
+    for first in range(series.size):
+        for last in range(first, series.size):
+            assert_mean_std(prefix, series, first, last)
+
+def test_prefix_stats_all_nan():
+    series = pd.Series(np.full(10, np.nan))
+    prefix = PrefixStats(series)
+    assert np.isnan(prefix.mean_std(0, 9)).all()
+    assert np.isnan(prefix.mean_std(4, 4)).all()
+
+# Values far from 0 with a small spread : the sums of squares are centered, the standard deviation keeps its precision
+def test_prefix_stats_precision():
+    series = pd.Series(1e6 + np.random.default_rng(2).standard_normal(100000) * 1e-3)
+    assert_mean_std(PrefixStats(series), series, 1000, 90000)
+
+# The statistics of a segment from the prefix sums are the ones of compute_stats
+# (a single point segment has no speed : 0 / 0)
+@pytest.mark.filterwarnings('ignore:invalid value encountered')
+def test_segment_stats_match_compute_stats(tmp_path):
+    df = tcx_to_df(write_tcx(str(tmp_path / 'a.tcx'), 2000, missing_hr=0.3))
+    data = Data(df)
+    for first, last in [(0, 1999), (10, 500), (1200, 1200), (700, 701)]:
+        segment_df = data.df.iloc[first:last + 1]
+        speed = (segment_df['distance'].max() - segment_df['distance'].min()) / (segment_df['time_in_seconds'].max() - segment_df['time_in_seconds'].min())
+        expected = compute_stats(segment_df.assign(speed=speed), 'label', data.file_name.iloc[0], data.dir_name.iloc[0], data.df)
+        stats = data.segment_stats(first, last, 'label')
+        for column in ['avg_heart_rate', 'std_heart_rate', 'avg_altitude', 'std_altitude', 'global_avg_heart_rate', 'global_std_heart_rate']:
+            np.testing.assert_allclose(stats[column], expected[column], rtol=1e-5, equal_nan=True)
+
+
+##~##~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ TIMESTAMPS ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# The timestamps of a file are decoded once, by the reader
+@pytest.mark.parametrize('write, reader', [(write_tcx, tcx_to_df), (write_csv, csv_to_df)], ids=['tcx', 'csv'])
+def test_timestamps_decoded_once(tmp_path, monkeypatch, write, reader):
+    path = write(str(tmp_path / f'a.{reader.__name__[:3]}'), 100)
+    calls = []
+    def counted(time_strings):
+        calls.append(len(time_strings))
+        return decode_timestamps(time_strings)
+    monkeypatch.setattr(core, 'decode_timestamps', counted)
+    Data(reader(path))
+    assert calls == [100]
+
+# Sessions crossing midnight : the time from the start keeps increasing, like the epoch times
+def test_time_after_midnight(tmp_path):
+    df = tcx_to_df(write_tcx(str(tmp_path / 'a.tcx'), 4000, start=MIDNIGHT_START))
+    data = Data(df)
+    epoch = decode_timestamps(df['time'])[1]
+    np.testing.assert_allclose(data.dt_values, epoch - epoch[0], atol=1e-6)
+    assert data.dt_order is None
+
+# Csv files saved by older versions hold the time of day in time_in_seconds (back to 0 at midnight)
+def test_old_csv_after_midnight(tmp_path):
+    path = str(tmp_path / 'a.csv')
+    write_csv(path, 4000, start=MIDNIGHT_START)
+    old = pd.read_csv(path)
+    old['time_in_seconds'] = old['time_in_seconds'] % 86400
+    old.to_csv(path, index=False)
+    data = Data(csv_to_df(path))
+    np.testing.assert_allclose(data.dt_values, np.arange(4000), atol=1e-6)
@@ -0,0 +1,116 @@
+'''
+Project : Noz'Num
+Description : Tests of the smoothing of the series (noznum.filters) : resampling, gap filling, filters and short series
+'''
+import numpy as np
+import pandas as pd
+import pytest
+from noznum.filters import FilterSettings, FILTER_METHODS, window_samples, resample, fill_gaps, rolling_median, \
+    exponential_moving_average, savitzky_golay, smooth
+
+
+def test_window_samples():
+    assert window_samples(15.0, 1.0) == 15
+    assert window_samples(10.0, 1.0) == 11 # odd, centered
+    assert window_samples(0.1, 1.0) == 1
+
+
+##~##~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ RESAMPLING ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# Irregular samples are interpolated on the grid, samples without time or value are skipped
+def test_resample_irregular():
+    t = np.array([0.0, 0.5, 2.0, np.nan, 3.0, 4.0])
+    y = np.array([0.0, 1.0, 4.0, 100.0, np.nan, 8.0])
+    grid, values = resample(t, y, 1.0, 10.0)
+    np.testing.assert_array_equal(grid, [0, 1, 2, 3, 4])
+    np.testing.assert_allclose(values, [0, 2, 4, 6, 8])
+
+# Short gaps are interpolated, the grid points inside long gaps stay missing
+def test_resample_long_gap():
+    t = np.array([0.0, 1.0, 2.0, 5.0, 6.0, 30.0, 31.0])
+    y = t * 2
+    grid, values = resample(t, y, 1.0, 10.0)
+    assert grid.size == 32
+    np.testing.assert_allclose(values[:7], grid[:7] * 2) # gap of 3 s : filled
+    assert np.isnan(values[7:30]).all() # gap of 24 s : left empty
+    np.testing.assert_allclose(values[30:], [60, 62])
+
+@pytest.mark.parametrize('n', [0, 1, 2])
+def test_resample_short_series(n):
+    t, y = np.arange(n, dtype=np.float64) * 3, np.arange(n, dtype=np.float64)
+    grid, values = resample(t, y, 1.0, 10.0)
+    assert grid.size == (0, 1, 4)[n]
+    if n:
+        assert grid[0] == 0 and values[0] == 0 and values[-1] == n - 1
+
+def test_fill_gaps():
+    y = np.array([1.0, np.nan, 3.0, np.nan, np.nan, np.nan, 7.0, np.nan])
+    np.testing.assert_allclose(fill_gaps(y, 2), [1, 2, 3, np.nan, np.nan, np.nan, 7, np.nan])
+    np.testing.assert_allclose(fill_gaps(y, 3), [1, 2, 3, 4, 5, 6, 7, np.nan]) # never extrapolated
+
+
+##~##~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ FILTERS ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+def test_rolling_median_removes_spikes():
+    y = np.full(50, 100.0)
+    y[[10, 30]] = 250.0
+    np.testing.assert_allclose(rolling_median(y, 5), 100.0)
+
+def test_exponential_moving_average():
+    y = np.array([0.0, 10.0, 10.0, 10.0])
+    np.testing.assert_allclose(exponential_moving_average(y, 3), pd.Series(y).ewm(span=3).mean())
+    assert exponential_moving_average(np.full(20, 7.0), 5)[-1] == pytest.approx(7.0)
+
+# A polynomial of degree polyorder is kept as it is, missing values stay missing
+def test_savitzky_golay():
+    x = np.arange(60, dtype=np.float64)
+    y = 0.5 * x**2 - 3 * x + 1
+    smoothed = savitzky_golay(y, 7, 2)
+    np.testing.assert_allclose(smoothed[3:-3], y[3:-3], atol=1e-8)
+    y[20] = np.nan
+    assert np.isnan(savitzky_golay(y, 7, 2)[20])
+    assert np.isnan(savitzky_golay(np.full(5, np.nan), 7, 2)).all()
+
+# Every method reduces the noise of a noisy signal and keeps the length and the missing samples of a long gap
+@pytest.mark.parametrize('method', [method for method in FILTER_METHODS if method != 'none'])
+def test_smooth_methods(method):
+    t = np.arange(600, dtype=np.float64)
+    truth = 140 + 20 * np.sin(t / 60)
+    y = truth + np.random.default_rng(0).normal(0, 5, t.size)
+    t = np.delete(t, np.arange(300, 360)) # gap of 60 s
+    truth, y = np.delete(truth, np.arange(300, 360)), np.delete(y, np.arange(300, 360))
+    smoothed = smooth(t, y, FilterSettings(method, 15.0, 1.0, 10.0, 2))
+    assert smoothed.size == t.size
+    assert np.sqrt(np.mean((smoothed - truth)**2)) < np.sqrt(np.mean((y - truth)**2)) / 2
+    assert not np.isnan(smoothed).any() # samples are on both sides of the gap, not inside
+
+def test_smooth_none():
+    t, y = np.arange(10, dtype=np.float64), np.arange(10, dtype=np.float64)**2
+    assert smooth(t, y, FilterSettings('none', resample_s=None)) is not None
+    np.testing.assert_allclose(smooth(t, y, FilterSettings('none', resample_s=None)), y)
+    np.testing.assert_allclose(smooth(t, y, FilterSettings('none')), y) # resampled on the sample times
+
+# Series without time, with no sample, one sample or two samples
+@pytest.mark.parametrize('method', list(FILTER_METHODS))
+@pytest.mark.parametrize('resample_s', [1.0, None])
+@pytest.mark.parametrize('n', [0, 1, 2])
+def test_smooth_short_series(method, resample_s, n):
+    t, y = np.arange(n, dtype=np.float64) * 2, np.arange(n, dtype=np.float64) + 100
+    smoothed = smooth(t, y, FilterSettings(method, 15.0, resample_s, 10.0, 2))
+    assert smoothed.size == n
+    if n:
+        assert smoothed[0] == pytest.approx(100, abs=1)
+
+# A series with one value (heart rate sensor on for one sample) : the other samples stay missing
+@pytest.mark.parametrize('method', list(FILTER_METHODS))
+def test_smooth_single_value(method):
+    y = np.full(100, np.nan)
+    y[40] = 120.0
+    smoothed = smooth(np.arange(100, dtype=np.float64), y, FilterSettings(method, 15.0, 1.0, 10.0, 2))
+    assert smoothed[40] == pytest.approx(120.0)
+    assert np.isnan(np.delete(smoothed, 40)).all()
+    assert np.isnan(smooth(np.arange(100, dtype=np.float64), np.full(100, np.nan), FilterSettings(method))).all()
@@ -0,0 +1,172 @@
+'''
+Project : Noz'Num
+Description : Tests of the spatial index and of the extraction of the segments between gates or inside a polygon (noznum.geofence)
+'''
+import json
+import numpy as np
+from noznum.geofence import SpatialIndex, Gate, gate_segments, polygon_segments, load_polygon
+from noznum.metrics import EARTH_RADIUS
+
+
+# Sessions are drawn on a local plane around this point, in meters (x to the east, y to the north)
+ORIGIN = (48.39, -4.48)
+
+def to_degrees(x, y):
+    lat = ORIGIN[0] + np.degrees(np.asarray(y, dtype=np.float64) / EARTH_RADIUS)
+    lon = ORIGIN[1] + np.degrees(np.asarray(x, dtype=np.float64) / (EARTH_RADIUS * np.cos(np.radians(ORIGIN[0]))))
+    return lat, lon
+
+def gate(x, y, radius=25.0):
+    lat, lon = to_degrees(x, y)
+    return Gate(float(lat), float(lon), radius)
+
+# Points every `step` meters along a polyline [(x, y), ...]
+def path(*corners, step=5.0):
+    x, y = [], []
+    for (x_1, y_1), (x_2, y_2) in zip(corners[:-1], corners[1:]):
+        n = max(int(round(np.hypot(x_2 - x_1, y_2 - y_1) / step)), 1)
+        x.extend(np.linspace(x_1, x_2, n, endpoint=False))
+        y.extend(np.linspace(y_1, y_2, n, endpoint=False))
+    x.append(corners[-1][0])
+    y.append(corners[-1][1])
+    return np.array(x), np.array(y)
+
+def index_of(**sessions):
+    index = SpatialIndex()
+    for key, (x, y) in sessions.items():
+        index.add(key, *to_degrees(x, y))
+    return index
+
+
+##~##~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ SPATIAL INDEX ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# The grid gives the same points as a test of every point, points without coordinates are never found
+def test_index_matches_brute_force():
+    rng = np.random.default_rng(0)
+    sessions = {f's{i}' : (rng.uniform(-2000, 2000, 3000), rng.uniform(-2000, 2000, 3000)) for i in range(4)}
+    sessions['s0'][0][::7] = np.nan
+    index = index_of(**sessions)
+    x = np.concatenate([session[0] for session in sessions.values()])
+    y = np.concatenate([session[1] for session in sessions.values()])
+
+    ids, distance = index.within_gate(gate(100, -300, radius=150))
+    with np.errstate(invalid='ignore'):
+        expected = np.flatnonzero(np.hypot(x - 100, y + 300) <= 150)
+    np.testing.assert_array_equal(ids, expected)
+    np.testing.assert_allclose(distance, np.hypot(x[ids] - 100, y[ids] + 300), atol=0.5)
+
+    corners = np.array([(-500, -500), (800, -200), (300, 900), (-600, 400)], dtype=np.float64)
+    inside = np.zeros(x.size, dtype=bool)
+    for (x_1, y_1), (x_2, y_2) in zip(corners, np.roll(corners, -1, axis=0)):
+        with np.errstate(invalid='ignore'):
+            inside ^= ((y_1 > y) != (y_2 > y)) & (x < x_1 + (y - y_1) * (x_2 - x_1) / (y_2 - y_1))
+    polygon = list(zip(*to_degrees(corners[:, 0], corners[:, 1])))
+    np.testing.assert_array_equal(index.within_polygon(polygon), np.flatnonzero(inside))
+
+    sessions_of, rows = index.locate(np.array([0, 2999, 3000, 11999]))
+    assert list(sessions_of) == [0, 0, 1, 3] and list(rows) == [0, 2999, 0, 2999]
+
+def test_empty_index():
+    index = SpatialIndex()
+    assert gate_segments(index, gate(0, 0), gate(500, 0)) == {}
+    assert polygon_segments(index, [to_degrees(0, 0), to_degrees(0, 100), to_degrees(100, 0)]) == {}
+
+
+##~##~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ GATE SEGMENTS ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# A segment goes from the start gate to the end gate : the reverse direction is not a segment
+def test_gate_direction():
+    forward = path((-100, 0), (600, 0))
+    index = index_of(forward=forward, backward=(forward[0][::-1], forward[1][::-1]))
+    segments = gate_segments(index, gate(0, 0), gate(500, 0))
+    assert segments == {'forward' : [(20, 120)]} # the points closest to the gate centers
+    assert forward[0][20] == 0 and forward[0][120] == 500
+
+# Sessions starting or ending inside a gate
+def test_gate_at_the_ends_of_a_session():
+    index = index_of(exact=path((0, 0), (500, 0)), inside=path((10, 0), (490, 0)))
+    assert gate_segments(index, gate(0, 0), gate(500, 0)) == {'exact' : [(0, 100)], 'inside' : [(0, 96)]}
+
+# No segment without a passage through the end gate after the start gate, and never across two sessions
+def test_unclosed_segments():
+    index = index_of(stops=path((-100, 0), (300, 0)), never_starts=path((200, 0), (600, 0)))
+    assert gate_segments(index, gate(0, 0), gate(500, 0)) == {}
+
+# Several passages through the start gate before the end gate : the segment starts at the last one
+def test_last_start_passage():
+    x, y = path((-100, 0), (100, 0), (100, 200), (0, 200), (0, 0), (600, 0))
+    index = index_of(detour=(x, y))
+    (first, last), = gate_segments(index, gate(0, 0), gate(500, 0))['detour']
+    assert (x[first], y[first]) == (0, 0) and first > 100
+    assert (x[last], y[last]) == (500, 0)
+
+# The same gate as start and end : the laps of a loop, one segment per lap
+def test_laps():
+    angles = np.linspace(0, 3 * 2 * np.pi, 3 * 250 + 1)
+    x, y = 200 * np.sin(angles), 200 - 200 * np.cos(angles)
+    index = index_of(loop=(x, y))
+    assert gate_segments(index, gate(0, 0), gate(0, 0))['loop'] == [(0, 250), (250, 500), (500, 750)]
+
+# GPS noise in a gate : the segment starts at the closest point left, points without coordinates are skipped
+def test_gate_with_noise():
+    x, y = path((-100, 0), (600, 0))
+    y[18:21] = 40 # 3 points (x = -10 to 0) out of the start gate
+    x[119] = np.nan
+    index = index_of(noisy=(x, y))
+    assert gate_segments(index, gate(0, 0), gate(500, 0)) == {'noisy' : [(21, 120)]}
+
+
+##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ POLYGON SEGMENTS ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# Square of 200 meters, its sides between the points of the paths
+SQUARE = [to_degrees(x, y) for x, y in [(2.5, 2.5), (2.5, 202.5), (202.5, 202.5), (202.5, 2.5)]]
+
+def in_square(x, y):
+    return (x > 2.5) & (x < 202.5) & (y > 2.5) & (y < 202.5)
+
+# A session entering and leaving the polygon several times : one segment per passage
+def test_polygon_entered_several_times():
+    x, y = path((-100, 50), (300, 50), (300, 150), (-100, 150), (-100, 250), (100, 250), (100, -100))
+    index = index_of(zigzag=(x, y), outside=path((-100, -50), (300, -50)))
+    segments = polygon_segments(index, SQUARE)
+    assert list(segments) == ['zigzag']
+    inside = in_square(x, y)
+    expected, first = [], None
+    for row in range(x.size):
+        if inside[row] and first is None:
+            first = row
+        elif not inside[row] and first is not None:
+            expected.append((first, row - 1))
+            first = None
+    assert len(expected) == 3
+    assert segments['zigzag'] == expected
+
+# GPS noise : a short excursion out of the polygon does not split its passage
+def test_polygon_passage_with_a_gap():
+    x, y = path((-100, 100), (300, 100))
+    y[40:43] = 300 # 3 points out of the square
+    x[50] = np.nan
+    index = index_of(noisy=(x, y))
+    assert polygon_segments(index, SQUARE) == {'noisy' : [(21, 60)]}
+    assert polygon_segments(index, SQUARE, max_gap=1) == {'noisy' : [(21, 39), (43, 49), (51, 60)]}
+
+# Passages shorter than min_points are dropped
+def test_polygon_min_points():
+    index = index_of(corner=path((-20, 195), (20, 195), step=10.0)) # 2 points inside
+    assert polygon_segments(index, SQUARE) == {'corner' : [(3, 4)]}
+    assert polygon_segments(index, SQUARE, min_points=3) == {}
+
+
+def test_load_polygon(tmp_path):
+    assert load_polygon('48.1,-4.1;48.2,-4.2; 48.3,-4.1') == [(48.1, -4.1), (48.2, -4.2), (48.3, -4.1)]
+    feature = {'type' : 'FeatureCollection', 'features' : [{'type' : 'Feature', 'properties' : {}, 'geometry' : {
+        'type' : 'Polygon', 'coordinates' : [[[-4.1, 48.1], [-4.2, 48.2], [-4.1, 48.3], [-4.1, 48.1]]]}}]}
+    path_ = tmp_path / 'area.geojson'
+    path_.write_text(json.dumps(feature))
+    assert load_polygon(str(path_)) == [(48.1, -4.1), (48.2, -4.2), (48.3, -4.1), (48.1, -4.1)]
@@ -0,0 +1,29 @@
+'''
+Project : Noz'Num
+Description : Tests of the javascript interface of the map page (noznum.maps)
+'''
+import numpy as np
+import pytest
+from noznum.core import Data, tcx_to_df
+from noznum.maps import GenerateMap, ZOOM_MESSAGE, zoom_from_message, move_marker_script
+from synthetic import write_tcx
+
+
+# The page reports the zoom level after every zoom done on the map
+def test_page_reports_zoom(tmp_path):
+    data = Data(tcx_to_df(write_tcx(str(tmp_path / 'a.tcx'), 200)))
+    html = GenerateMap(data, zoom_level=13).get_root().render()
+    assert "noznum.map.on('zoomend'" in html
+    assert f"console.log('{ZOOM_MESSAGE}' + noznum.map.getZoom())" in html
+
+def test_zoom_from_message():
+    assert zoom_from_message(ZOOM_MESSAGE + '15') == 15
+    assert zoom_from_message(ZOOM_MESSAGE + '14.0') == 14
+    assert zoom_from_message(ZOOM_MESSAGE + 'NaN!') is None
+    assert zoom_from_message('Uncaught TypeError') is None
+
+def test_move_marker_script():
+    assert move_marker_script(48.5, -4.25) == 'noznum.moveMarker(48.5, -4.25);'
+    for lat, lon in [(np.nan, -4.25), (48.5, np.inf)]:
+        with pytest.raises(ValueError):
+            move_marker_script(lat, lon)
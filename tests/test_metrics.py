@@ -0,0 +1,47 @@
+'''
+Project : Noz'Num
+Description : Tests of the metrics derived from the samples (noznum.metrics)
+'''
+import numpy as np
+from noznum.metrics import haversine, cumulative_distance, rate, heart_rate_zones, derived_metrics, EARTH_RADIUS
+
+
+# A degree of latitude, and a degree of longitude on the equator, is 1/360 of the circumference
+def test_haversine():
+    degree = 2 * np.pi * EARTH_RADIUS / 360
+    np.testing.assert_allclose(haversine(0, 0, 1, 0), degree)
+    np.testing.assert_allclose(haversine(0, 0, 0, 1), degree)
+    np.testing.assert_allclose(haversine(60, 0, 60, 1), degree / 2, rtol=1e-4) # cos(60°) on a parallel, for a short arc
+    np.testing.assert_allclose(haversine(0, 0, 0, 180), np.pi * EARTH_RADIUS) # antipodes
+    np.testing.assert_allclose(haversine([48.0, 48.0], [-4.0, -4.0], [48.0, 48.001], [-4.0, -4.0]), [0.0, degree / 1000])
+
+# The samples without coordinates keep the distance of the previous fix
+def test_cumulative_distance():
+    lat = np.array([np.nan, 0.0, 0.001, np.nan, 0.002])
+    lon = np.zeros(5)
+    step = haversine(0, 0, 0.001, 0)
+    np.testing.assert_allclose(cumulative_distance(lat, lon), [np.nan, 0.0, step, step, 2 * step])
+
+def test_rate():
+    t = np.array([0.0, 1.0, 3.0, 3.0, 4.0])
+    values = np.array([0.0, 2.0, 6.0, 7.0, np.nan])
+    np.testing.assert_allclose(rate(values, t), [np.nan, 2.0, 2.0, np.nan, np.nan]) # the time doesn't increase, no value
+
+# Zones are the fractions of the maximum heart rate : below 50 %, 50-60 %, ... , 90 % and above
+def test_heart_rate_zones():
+    hr = np.array([80, 100, 119, 120, 150, 170, 180, 200, np.nan])
+    np.testing.assert_array_equal(heart_rate_zones(hr, max_heart_rate=200), [0, 1, 1, 2, 3, 4, 5, 5, np.nan])
+    np.testing.assert_array_equal(heart_rate_zones(hr)[-2:], [5, np.nan]) # the session's maximum by default
+    assert np.isnan(heart_rate_zones([np.nan, np.nan])).all()
+
+# Constant speed on a flat route : the speeds are the speed, the grade is 0
+def test_derived_metrics():
+    t = np.arange(60, dtype=np.float64)
+    lat = t * 0.00002 # ~2.2 m/s
+    metrics = derived_metrics(t, lat, np.zeros(60), np.full(60, 10.0), np.full(60, 150.0))
+    speed = haversine(0, 0, 0.00002, 0)
+    np.testing.assert_allclose(metrics['speed'][1:], speed, rtol=1e-5)
+    np.testing.assert_allclose(metrics['smooth_speed'], speed, rtol=1e-5)
+    np.testing.assert_allclose(metrics['pace'], 1000 / 60 / speed, rtol=1e-5)
+    np.testing.assert_allclose(metrics['grade'][10:-10], 0.0)
+    assert all(values.dtype == np.float32 for values in metrics.values())
@@ -0,0 +1,57 @@
+'''
+Project : Noz'Num
+Description : Tests of the frames of the session replay (noznum.playback)
+'''
+import numpy as np
+from noznum.core import Data, tcx_to_df
+from noznum.playback import PlaybackFrames
+from synthetic import write_tcx
+
+
+# Session of 11 samples, one per second
+def session(tmp_path, shuffle=False, missing_fix=()):
+    df = tcx_to_df(write_tcx(str(tmp_path / 'a.tcx'), 11))
+    df.loc[list(missing_fix), ['latitude', 'longitude']] = np.nan
+    if shuffle:
+        df = df.iloc[np.random.default_rng(0).permutation(len(df))].reset_index(drop=True)
+    return df, Data(df=df)
+
+def test_frame_times(tmp_path):
+    df, data = session(tmp_path)
+    frames = PlaybackFrames(data, speed=2, fps=4) # half a second per frame
+    assert len(frames) == 21
+    np.testing.assert_allclose(frames.times, np.arange(21) * 0.5)
+    frames = PlaybackFrames(data, speed=3, fps=1)
+    np.testing.assert_allclose(frames.times, [0, 3, 6, 9, 10]) # the last frame shows the end of the session
+
+# The plot cursors are put on the closest sample (the earlier one on a tie)
+def test_positions(tmp_path):
+    df, data = session(tmp_path)
+    frames = PlaybackFrames(data, speed=1, fps=4)
+    np.testing.assert_array_equal(frames.positions[:8], [0, 0, 0, 1, 1, 1, 1, 2])
+    assert frames.positions[-1] == 10
+
+# The rows of an unsorted session are found through its time order
+def test_positions_unsorted(tmp_path):
+    df, data = session(tmp_path, shuffle=True)
+    assert data.dt_order is not None
+    frames = PlaybackFrames(data, speed=1, fps=1)
+    np.testing.assert_allclose(data.dt_values[frames.positions], frames.times)
+
+# The marker is interpolated between the samples, the samples without position fix are skipped
+def test_marker_interpolation(tmp_path):
+    df, data = session(tmp_path, missing_fix=[3])
+    frames = PlaybackFrames(data, speed=1, fps=2)
+    lat = df['latitude'].to_numpy()
+    np.testing.assert_allclose(frames.lat[::2][[0, 5, 10]], lat[[0, 5, 10]])
+    np.testing.assert_allclose(frames.lat[5], lat[2] + (lat[4] - lat[2]) * 0.25) # time 2.5
+    np.testing.assert_allclose(frames.lat[6], (lat[2] + lat[4]) / 2) # time 3 : no fix, halfway between 2 and 4
+    assert not np.isnan(frames.lon).any()
+
+def test_frame_at(tmp_path):
+    df, data = session(tmp_path)
+    frames = PlaybackFrames(data, speed=3, fps=1)
+    assert frames.frame_at(4.4) == 1
+    assert frames.frame_at(-5) == 0
+    assert frames.frame_at(100) == len(frames) - 1
+    assert frames.frame_at(frames.times[3]) == 3
@@ -0,0 +1,155 @@
+'''
+Project : Noz'Num
+Description : Tests of the session readers (noznum.readers) : gpx, binary fit and the registry of the readers
+'''
+import struct
+import numpy as np
+import pytest
+from noznum.core import tcx_to_df, csv_to_df
+from noznum.readers import gpx_to_df, fit_to_df, reader_for, read_session, register_reader, READERS, FIT_EPOCH
+from synthetic import write_tcx, write_gpx, write_fit, fit_crc
+
+
+##~##~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ TCX READER ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# The trackpoints of all the laps are read, in order
+def test_tcx_laps(tmp_path):
+    single = tcx_to_df(write_tcx(str(tmp_path / 'single.tcx'), 300))
+    df = tcx_to_df(write_tcx(str(tmp_path / 'laps.tcx'), 300, laps=3))
+    assert len(df) == 300
+    assert df['time_in_seconds'].is_monotonic_increasing and df['time_in_seconds'].diff().iloc[1:].gt(0).all()
+    assert df['time'].iloc[-1] == single['time'].iloc[-1] # the last lap is read, not only the first one
+    for column in ['latitude', 'longitude', 'heart_rate', 'time_in_seconds']:
+        np.testing.assert_allclose(df[column], single[column])
+
+
+##~##~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ GPX READER ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# GPX 1.1 file with a metadata time, a waypoint before and after the track, and a track point without elevation
+GPX_WITH_WAYPOINTS = '''<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="test" xmlns="http://www.topografix.com/GPX/1/1"
+     xmlns:gpxtpx="http://www.garmin.com/xmlschemas/TrackPointExtension/v1">
+  <metadata><time>2023-03-01T08:00:00Z</time></metadata>
+  <wpt lat="48.0" lon="-4.0"><ele>999</ele><time>2023-03-01T09:00:00Z</time></wpt>
+  <trk>
+    <trkseg>
+      <trkpt lat="48.39" lon="-4.48">
+        <time>2023-03-10T10:00:00Z</time>
+        <extensions><gpxtpx:TrackPointExtension><gpxtpx:hr>120</gpxtpx:hr></gpxtpx:TrackPointExtension></extensions>
+      </trkpt>
+      <trkpt lat="48.391" lon="-4.481"><ele>12.5</ele><time>2023-03-10T10:00:01Z</time></trkpt>
+    </trkseg>
+  </trk>
+  <wpt lat="48.5" lon="-4.5"><ele>888</ele><time>2023-03-01T11:00:00Z</time></wpt>
+</gpx>
+'''
+
+# Metadata and waypoints are not track points : their time and elevation are not read
+def test_gpx_metadata_and_waypoints(tmp_path):
+    path = tmp_path / 'waypoints.gpx'
+    path.write_text(GPX_WITH_WAYPOINTS)
+    df = gpx_to_df(str(path))
+    assert len(df) == 2
+    assert list(df['time']) == ['2023-03-10T10:00:00Z', '2023-03-10T10:00:01Z']
+    assert np.isnan(df['altitude'].iloc[0]) and df['altitude'].iloc[1] == 12.5
+    assert df['heart_rate'].iloc[0] == 120 and np.isnan(df['heart_rate'].iloc[1])
+    assert list(df['latitude']) == [48.39, 48.391]
+
+# A gpx session has the same values as the tcx file of the same session
+def test_gpx_matches_tcx(tmp_path):
+    tcx = tcx_to_df(write_tcx(str(tmp_path / 'a.tcx'), 200, missing_hr=0.2))
+    gpx = gpx_to_df(write_gpx(str(tmp_path / 'a.gpx'), 200, missing_hr=0.2))
+    for column in ['latitude', 'longitude', 'altitude', 'heart_rate', 'time_in_seconds']:
+        np.testing.assert_allclose(gpx[column], tcx[column], atol=1e-6)
+
+
+##~##~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ FIT READER ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+# FIT timestamp of 2023-03-10 09:00:00 UTC
+FIT_START = 1678438800 - FIT_EPOCH
+
+def semicircles(degrees):
+    return round(degrees * 2**31 / 180)
+
+# FIT file of three records :
+# - record 1 : big endian definition with developer fields (2 bytes skipped), altitude (scale 5, offset 500)
+# - record 2 : compressed timestamp header (+3 s, definition without timestamp), heart rate missing (0xFF)
+# - record 3 : enhanced altitude and no heart rate field
+# and an activity message giving the local time (UTC + 1 hour)
+def fit_bytes():
+    messages = [
+        struct.pack('>BBBHB', 0x60, 0, 1, 20, 5) + bytes([253, 4, 0x86, 0, 4, 0x85, 1, 4, 0x85, 2, 2, 0x84, 3, 1, 0x02])
+        + bytes([1, 0, 2, 0]), # one developer field of 2 bytes
+        struct.pack('>BIiiHB', 0x00, FIT_START, semicircles(48.39), semicircles(-4.48), (12 + 500) * 5, 130) + b'\xAA\xBB',
+        struct.pack('<BBBHB', 0x43, 0, 0, 20, 4) + bytes([0, 4, 0x85, 1, 4, 0x85, 2, 2, 0x84, 3, 1, 0x02]),
+        struct.pack('<BiiHB', 0x80 | (3 << 5) | ((FIT_START + 3) & 0x1F), semicircles(48.3901), semicircles(-4.4801), (13 + 500) * 5, 0xFF),
+        struct.pack('<BBBHB', 0x41, 0, 0, 20, 4) + bytes([253, 4, 0x86, 0, 4, 0x85, 1, 4, 0x85, 78, 4, 0x86]),
+        struct.pack('<BIiiI', 0x01, FIT_START + 10, semicircles(48.3902), semicircles(-4.4802), (14 + 500) * 5),
+        struct.pack('<BBBHB', 0x42, 0, 0, 34, 2) + bytes([253, 4, 0x86, 5, 4, 0x86]),
+        struct.pack('<BII', 0x02, FIT_START + 11, FIT_START + 11 + 3600),
+    ]
+    data = b''.join(messages)
+    header = struct.pack('<BBHI4s', 14, 0x20, 2132, len(data), b'.FIT')
+    header += struct.pack('<H', fit_crc(header))
+    return header + data + struct.pack('<H', fit_crc(header + data))
+
+def test_fit_records(tmp_path):
+    path = tmp_path / 'records.fit'
+    path.write_bytes(fit_bytes())
+    df = fit_to_df(str(path))
+    assert len(df) == 3
+    np.testing.assert_allclose(df['latitude'], [48.39, 48.3901, 48.3902], atol=1e-7)
+    np.testing.assert_allclose(df['longitude'], [-4.48, -4.4801, -4.4802], atol=1e-7)
+    np.testing.assert_allclose(df['altitude'], [12, 13, 14])
+    assert df['heart_rate'].iloc[0] == 130 and df['heart_rate'].isna().sum() == 2
+    assert list(df['time']) == ['2023-03-10T10:00:00.000+01:00', '2023-03-10T10:00:03.000+01:00', '2023-03-10T10:00:10.000+01:00']
+    np.testing.assert_allclose(df['time_in_seconds'], [36000, 36003, 36010])
+    assert df['distance'].iloc[0] == 0 and df['distance'].is_monotonic_increasing # computed from the coordinates
+
+# A fit session has the same values as the tcx file of the same session
+def test_fit_matches_tcx(tmp_path):
+    tcx = tcx_to_df(write_tcx(str(tmp_path / 'a.tcx'), 200, missing_hr=0.2))
+    fit = fit_to_df(write_fit(str(tmp_path / 'a.fit'), 200, missing_hr=0.2))
+    for column in ['latitude', 'longitude', 'heart_rate', 'time_in_seconds']:
+        np.testing.assert_allclose(fit[column], tcx[column], atol=1e-6)
+    np.testing.assert_allclose(fit['altitude'], tcx['altitude'], atol=0.2)
+
+def test_not_a_fit_file(tmp_path):
+    path = tmp_path / 'broken.fit'
+    path.write_bytes(b'\x0e\x20' + b'\x00' * 10)
+    with pytest.raises(ValueError):
+        fit_to_df(str(path))
+
+
+##~##~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+#~##~~ READER REGISTRY ~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+##~##~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##~~~~~~~~~~~~~~~~~~~~~~~~~~##~##
+
+def test_reader_for_extension():
+    assert reader_for('p01/a.tcx') is tcx_to_df
+    assert reader_for('p01/a.GPX') is gpx_to_df
+    assert reader_for('p01/a.Fit') is fit_to_df
+    assert reader_for('p01/a.csv') is csv_to_df
+    with pytest.raises(ValueError):
+        reader_for('p01/a.kml')
+    with pytest.raises(ValueError):
+        reader_for('p01/noextension')
+
+def test_register_reader(monkeypatch):
+    monkeypatch.setitem(READERS, '.kml', None)
+    def kml_to_df(file_path, progress=None):
+        return file_path
+    register_reader('.KML', kml_to_df)
+    assert reader_for('a.kml') is kml_to_df
+    assert read_session('a.kml') == 'a.kml'
+
+def test_read_session_dispatch(tmp_path):
+    for write, reader in ((write_tcx, tcx_to_df), (write_gpx, gpx_to_df), (write_fit, fit_to_df)):
+        path = write(str(tmp_path / f'a.{reader.__name__[:3]}'), 20)
+        assert read_session(path).equals(reader(path))
@@ -0,0 +1,78 @@
+'''
+Project : Noz'Num
+Description : Tests of the headless reports of the parsed sessions (noznum.report)
+'''
+import io
+import os
+import numpy as np
+import pytest
+from noznum.batch import run_batch
+from noznum.core import tcx_to_df
+from noznum.report import ReportRenderer, run_report, write_index
+from synthetic import write_tcx
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def is_png(file_path):
+    with open(file_path, 'rb') as f:
+        return f.read(8) == PNG_SIGNATURE
+
+# Plots and maps of the session and of each segment
+def test_render_session(tmp_path):
+    pytest.importorskip('folium')
+    df = tcx_to_df(write_tcx(str(tmp_path / 'a.tcx'), 500))
+    renderer = ReportRenderer()
+    file_paths = renderer.render_session(df, str(tmp_path / 'report'), 'p01/a', segments=[('climb', 100, 200)])
+    assert [os.path.basename(path) for path in file_paths] == ['session.png', 'session_map.png', 'session_map.html',
+                                                               'climb.png', 'climb_map.png', 'climb_map.html']
+    assert all(is_png(path) for path in file_paths if path.endswith('.png'))
+    with open(tmp_path / 'report' / 'session_map.html') as f:
+        assert '"color": "blue"' not in f.read()
+    with open(tmp_path / 'report' / 'climb_map.html') as f:
+        assert '"color": "blue"' in f.read() # highlighted segment
+
+# The figures are reused : the segments of the previous session are not drawn again
+def test_render_session_reuses_figures(tmp_path):
+    df = tcx_to_df(write_tcx(str(tmp_path / 'a.tcx'), 500))
+    renderer = ReportRenderer(html_maps=False)
+    renderer.render_session(df, str(tmp_path / 'first'), 'first', segments=[('climb', 100, 200), ('descent', 300, 400)])
+    file_paths = renderer.render_session(df, str(tmp_path / 'second'), 'second', segments=[('climb', 10, 20)])
+    assert len(file_paths) == 4
+    assert len(renderer.hr_axes.patches) == len(renderer.hr_axes.texts) == 0 # segment page : no shaded segment
+    assert renderer.hr_axes.get_title() == 'second - climb'
+
+# Sessions without coordinates have plots but no map, empty sessions have no file
+def test_render_session_without_route(tmp_path):
+    df = tcx_to_df(write_tcx(str(tmp_path / 'a.tcx'), 100))
+    df[['latitude', 'longitude']] = np.nan
+    renderer = ReportRenderer(html_maps=False)
+    file_paths = renderer.render_session(df, str(tmp_path / 'report'), 'a')
+    assert [os.path.basename(path) for path in file_paths] == ['session.png']
+    assert renderer.render_session(df.iloc[:0], str(tmp_path / 'empty'), 'empty') == []
+
+# Every parsed session is rendered in the worker processes, a broken one is reported without stopping the others
+def test_run_report(tmp_path):
+    data_dir, output_dir, report_dir = tmp_path / 'data', tmp_path / 'output', tmp_path / 'report'
+    os.makedirs(data_dir / 'p01')
+    write_tcx(str(data_dir / 'p01' / 'a.tcx'), 300)
+    write_tcx(str(data_dir / 'p01' / 'b.tcx'), 300, seed=1)
+    run_batch(str(data_dir), str(output_dir), jobs=1, file_format='csv', log=io.StringIO())
+    with open(output_dir / 'p01' / 'broken.tcx.csv', 'w') as f:
+        f.write('not,a,session\n1,2,3\n')
+    reports, failed = run_report(str(output_dir), str(report_dir), file_format='csv', jobs=1, html_maps=False,
+                                 segments={str(output_dir / 'p01' / 'a.tcx.csv'): [('climb', 50, 100)]}, log=io.StringIO())
+    relative_path = os.path.join('p01', 'a.tcx')
+    assert list(reports) == [relative_path, os.path.join('p01', 'b.tcx')]
+    assert [os.path.basename(path) for path in reports[relative_path]] == ['session.png', 'session_map.png', 'climb.png', 'climb_map.png']
+    assert all(os.path.dirname(path) == str(report_dir / relative_path) for path in reports[relative_path])
+    assert [path for path, error in failed] == [os.path.join('p01', 'broken.tcx')]
+
+# The index links the files of every session, relative to the report directory
+def test_write_index(tmp_path):
+    report_dir = str(tmp_path)
+    reports = {'p01/a&b': [os.path.join(report_dir, 'p01', 'a&b', 'session.png')]}
+    with open(write_index(report_dir, reports)) as f:
+        index = f.read()
+    assert '<td>p01/a&amp;b</td>' in index
+    assert '<a href="p01/a&amp;b/session.png">session.png</a>' in index
@@ -0,0 +1,107 @@
+'''
+Project : Noz'Num
+Description : Tests of the statistics database and of the stats.csv files (noznum.stats_store, noznum.core.save_stats)
+'''
+import os
+import multiprocessing
+import numpy as np
+import pandas as pd
+from noznum import stats_store
+from noznum.stats_store import StatsStore, STATS_COLUMNS
+from noznum.core import Data, Segment, tcx_to_df, export_segments, save_stats
+from synthetic import write_tcx
+
+
+def session(tmp_path):
+    os.makedirs(tmp_path / 'p01', exist_ok=True)
+    return Data(tcx_to_df(write_tcx(str(tmp_path / 'p01' / 'a.tcx'), 500)))
+
+# stats.csv keeps the layout written by the first versions : an unnamed index column, then the STATS_COLUMNS
+def test_stats_csv_layout(tmp_path):
+    data = session(tmp_path)
+    csv_file_path = str(tmp_path / 'stats.csv')
+    save_stats(csv_file_path, data.segment_stats(10, 100, 'first'))
+    save_stats(csv_file_path, data.segment_stats(200, 300, 'second'))
+    with open(csv_file_path) as f:
+        header = f.readline().rstrip('\n').split(',')
+    assert header == [''] + STATS_COLUMNS
+    stats_df = pd.read_csv(csv_file_path, index_col=0)
+    assert list(stats_df['label']) == ['first', 'second']
+    assert list(stats_df.index) == [0, 1]
+
+# A stats.csv file written by the first versions (appended rows, index column) is imported in the new database once
+def test_import_old_stats_csv(tmp_path):
+    data = session(tmp_path)
+    csv_file_path = str(tmp_path / 'stats.csv')
+    old = data.segment_stats(10, 100, 'old')
+    old.to_csv(csv_file_path, mode='w', header=True)
+    old.to_csv(csv_file_path, mode='a', header=False)
+    save_stats(csv_file_path, data.segment_stats(200, 300, 'new'))
+    stats_df = pd.read_csv(csv_file_path, index_col=0)
+    assert list(stats_df['label']) == ['old', 'old', 'new']
+    np.testing.assert_allclose(stats_df['avg_heart_rate'].iloc[0], old['avg_heart_rate'].iloc[0])
+    assert len(StatsStore(str(tmp_path / 'stats.sqlite')).query(label='old')) == 2
+
+# A save appends its rows to stats.csv, the whole table is only written when the file doesn't exist
+def test_save_appends_new_rows(tmp_path, monkeypatch):
+    data = session(tmp_path)
+    csv_file_path = str(tmp_path / 'stats.csv')
+    save_stats(csv_file_path, data.segment_stats(10, 100, 'first'))
+    written = []
+    monkeypatch.setattr(stats_store, 'write_csv', lambda *args: written.append(args))
+    save_stats(csv_file_path, data.segment_stats(200, 300, 'second'))
+    save_stats(csv_file_path, data.segment_stats(310, 400, 'third'))
+    assert written == []
+    stats_df = pd.read_csv(csv_file_path, index_col=0)
+    assert list(stats_df['label']) == ['first', 'second', 'third']
+    assert list(stats_df.index) == [0, 1, 2]
+
+# The legacy stats.csv is imported once, even by a database of a version without the marker row
+def test_import_legacy_csv_once(tmp_path):
+    data = session(tmp_path)
+    csv_file_path = str(tmp_path / 'stats.csv')
+    db_path = str(tmp_path / 'stats.sqlite')
+    data.segment_stats(10, 100, 'old').to_csv(csv_file_path)
+    store = StatsStore(db_path, legacy_csv_path=csv_file_path)
+    assert store.import_legacy_csv(csv_file_path) == 0
+    assert len(StatsStore(db_path, legacy_csv_path=csv_file_path).query()) == 1
+
+    db_path = str(tmp_path / 'unmarked.sqlite')
+    StatsStore(db_path).insert(data.segment_stats(10, 100, 'old'))
+    assert StatsStore(db_path).import_legacy_csv(csv_file_path) == 0
+    assert len(StatsStore(db_path).query()) == 1
+
+def save_in_process(csv_file_path, tcx_file_path, label):
+    save_stats(csv_file_path, Data(tcx_to_df(tcx_file_path)).segment_stats(10, 100, label))
+
+# Processes saving together in a new database import the legacy stats.csv once and append all their rows
+def test_concurrent_saves(tmp_path):
+    data = session(tmp_path)
+    csv_file_path = str(tmp_path / 'stats.csv')
+    data.segment_stats(10, 100, 'old').to_csv(csv_file_path)
+    processes = [multiprocessing.Process(target=save_in_process, args=(csv_file_path, str(tmp_path / 'p01' / 'a.tcx'), f'new{i}'))
+                 for i in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert all(process.exitcode == 0 for process in processes)
+    stats_df = pd.read_csv(csv_file_path, index_col=0)
+    assert list(stats_df['label']).count('old') == 1
+    assert sorted(stats_df['label'][1:]) == [f'new{i}' for i in range(4)]
+    assert len(StatsStore(str(tmp_path / 'stats.sqlite')).query()) == 5
+
+# Segments with the same label are saved in different files
+def test_export_segments_same_label(tmp_path):
+    data = session(tmp_path)
+    output_dir = tmp_path / 'out'
+    os.makedirs(output_dir)
+    segments = [Segment('climb', 10, 100), Segment('climb', 200, 300), Segment('descent', 310, 400), Segment('climb', 410, 450)]
+    file_paths = export_segments(data, segments, str(output_dir), str(output_dir / 'stats.csv'))
+    assert [os.path.basename(path) for path in file_paths] == ['climb.csv', 'climb_2.csv', 'descent.csv', 'climb_3.csv']
+    for path, segment in zip(file_paths, segments):
+        segment_df = pd.read_csv(path, index_col=0)
+        assert len(segment_df) == segment.last - segment.first + 1
+        assert segment_df['file_name'].iloc[0] == os.path.basename(path)
+        assert segment_df['label'].iloc[0] == segment.label
+    assert list(pd.read_csv(output_dir / 'stats.csv', index_col=0)['label']) == ['climb', 'climb', 'descent', 'climb']
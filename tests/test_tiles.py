@@ -0,0 +1,62 @@
+'''
+Project : Noz'Num
+Description : Tests of the local cache of the map tiles (noznum.tiles)
+'''
+import sqlite3
+from noznum.tiles import TileStore, EVICT_TARGET
+
+
+def stored_size(store):
+    connection = sqlite3.connect(store.db_path)
+    try:
+        return connection.execute('SELECT COALESCE(SUM(size), 0) FROM tiles').fetchone()[0]
+    finally:
+        connection.close()
+
+def test_put_get(tmp_path):
+    store = TileStore(str(tmp_path / 'tiles.mbtiles'))
+    store.put(12, 2000, 1400, b'png')
+    assert store.get(12, 2000, 1400) == b'png'
+    assert (12, 2000, 1400) in store and (12, 2000, 1401) not in store
+    assert store.get(12, 2000, 1401) is None
+
+# The running size follows the added, replaced and evicted tiles
+def test_total_bytes(tmp_path):
+    store = TileStore(str(tmp_path / 'tiles.mbtiles'), max_bytes=10000)
+    for x in range(30):
+        store.put(14, x, 0, b'a' * 100)
+    assert store.total_bytes() == stored_size(store) == 3000
+    store.put(14, 0, 0, b'b' * 400) # replaced
+    assert store.total_bytes() == stored_size(store) == 3300
+    for x in range(30, 120):
+        store.put(14, x, 0, b'c' * 100)
+    assert store.total_bytes() == stored_size(store) <= 10000
+    assert store.total_bytes() >= EVICT_TARGET * 10000 - 400
+    assert store.get(14, 0, 0) is None # least recently used, evicted
+    assert store.get(14, 119, 0) == b'c' * 100
+
+# Adding a tile doesn't sum the sizes of all the tiles (seeding would be quadratic)
+def test_put_does_not_scan_the_tiles(tmp_path, monkeypatch):
+    store = TileStore(str(tmp_path / 'tiles.mbtiles'))
+    statements = []
+    connect = store.connect
+    def traced_connect():
+        connection = connect()
+        connection.set_trace_callback(statements.append)
+        return connection
+    monkeypatch.setattr(store, 'connect', traced_connect)
+    for x in range(10):
+        store.put(14, x, 0, b'png')
+    assert statements and not [statement for statement in statements if 'SUM(' in statement.upper()]
+
+# A cache file written before the running size existed gets it from its tiles
+def test_older_cache_file(tmp_path):
+    db_path = str(tmp_path / 'tiles.mbtiles')
+    store = TileStore(db_path)
+    store.put(14, 1, 0, b'a' * 100)
+    store.put(14, 2, 0, b'a' * 50)
+    connection = sqlite3.connect(db_path)
+    with connection:
+        connection.execute('DROP TABLE cache_size')
+    connection.close()
+    assert TileStore(db_path).total_bytes() == 150
@@ -0,0 +1,76 @@
+'''
+Project : Noz'Num
+Description : Tests of the workspace of the opened sessions and of its memory budget (noznum.workspace)
+'''
+import os
+import numpy as np
+import pytest
+from noznum.cache import SessionCache
+from noznum.core import tcx_to_df
+from noznum.workspace import Workspace
+from synthetic import write_tcx
+
+pytest.importorskip('pyarrow')
+
+
+# tcx_to_df counting the files it parses
+def counting_reader(calls):
+    def read_tcx(file_path):
+        calls.append(os.path.basename(file_path))
+        return tcx_to_df(file_path)
+    return read_tcx
+
+# Workspace of n sessions of 1000 points, its budget holds `fits` of them
+def open_sessions(tmp_path, n, fits, calls):
+    reader = counting_reader(calls)
+    workspace = Workspace(SessionCache(str(tmp_path / 'cache')))
+    for i in range(n):
+        file_path = write_tcx(str(tmp_path / f's{i}.tcx'), 1000, seed=i)
+        workspace.add(file_path, reader, workspace.session_cache.load(file_path, reader))
+    session_bytes = max(session.n_bytes for session in workspace)
+    workspace.max_bytes = int(session_bytes * (fits + 0.5))
+    return workspace, session_bytes
+
+def session_id(tmp_path, i):
+    return os.path.abspath(str(tmp_path / f's{i}.tcx'))
+
+# The least recently viewed sessions are evicted first, the displayed ones never
+def test_evict_least_recently_viewed(tmp_path):
+    workspace, session_bytes = open_sessions(tmp_path, 5, 2, [])
+    workspace.data(session_id(tmp_path, 0)) # viewed again : s1 is now the oldest
+    evicted = workspace.evict(keep=[session_id(tmp_path, 1)])
+    assert [session.label for session in evicted] == ['s2.tcx', 's3.tcx', 's4.tcx']
+    assert workspace.memory_usage() <= workspace.max_bytes
+    assert workspace[session_id(tmp_path, 1)].loaded and workspace[session_id(tmp_path, 0)].loaded
+    assert [session.label for session in workspace if session.loaded] == ['s0.tcx', 's1.tcx']
+
+# An evicted session is read again from the session cache, not parsed again
+def test_reload_from_cache(tmp_path):
+    calls = []
+    workspace, session_bytes = open_sessions(tmp_path, 3, 1, calls)
+    before = workspace.data(session_id(tmp_path, 0)).df.copy()
+    workspace.evict(keep=[session_id(tmp_path, 2)])
+    assert not workspace[session_id(tmp_path, 0)].loaded
+    assert calls == ['s0.tcx', 's1.tcx', 's2.tcx']
+    data = workspace.data(session_id(tmp_path, 0))
+    assert calls == ['s0.tcx', 's1.tcx', 's2.tcx']
+    assert workspace[session_id(tmp_path, 0)].loaded and workspace[session_id(tmp_path, 0)].n_bytes > 0
+    np.testing.assert_allclose(data.lat.to_numpy(), before['latitude'].to_numpy())
+
+# Building the spatial index of all the sessions reads the evicted ones one after the other, within the budget
+def test_spatial_index_within_budget(tmp_path, monkeypatch):
+    workspace, session_bytes = open_sessions(tmp_path, 6, 2, [])
+    kept = session_id(tmp_path, 5)
+    workspace.evict(keep=[kept])
+    usages = []
+    evict = workspace.evict
+    def recording_evict(keep=()):
+        usages.append(workspace.memory_usage()) # before eviction : the budget and the session just read
+        return evict(keep=keep)
+    monkeypatch.setattr(workspace, 'evict', recording_evict)
+    index = workspace.spatial_index(keep=[kept])
+    assert index.keys == [session.session_id for session in workspace]
+    assert index.offsets[-1] == 6 * 1000
+    assert max(usages) <= workspace.max_bytes + session_bytes
+    assert workspace.memory_usage() <= workspace.max_bytes
+    assert workspace[kept].loaded